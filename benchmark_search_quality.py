@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Search quality and latency benchmark of VectorStore on a synthetic clinic corpus."""
+
+import argparse
+import hashlib
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import config
+from chromadb.api.types import EmbeddingFunction
+from services.embedding_cache import EmbeddingCache, embedding_model_id
+from services.vector_store import VectorStore
+
+# Each condition is described in the visit with different words than the query asking for it
+CONDITIONS = {
+    "hypertension": {
+        "complaint": "J'ai souvent mal à la tête le matin avec des vertiges, la pharmacienne a trouvé 16/10.",
+        "diagnosis": "Hypertension artérielle essentielle",
+        "medication": "Amlodipine 5 mg une fois par jour",
+        "recommendation": "Réduire le sel et marcher trente minutes par jour.",
+        "query": "tension artérielle trop élevée",
+    },
+    "diabetes": {
+        "complaint": "J'ai tout le temps soif, je me lève la nuit pour uriner et je suis fatigué.",
+        "diagnosis": "Diabète de type 2 (E11.9)",
+        "medication": "Metformine 850 mg matin et soir",
+        "recommendation": "Contrôler la glycémie et limiter les sucres rapides.",
+        "query": "glycémie élevée et soif excessive",
+    },
+    "asthma": {
+        "complaint": "Je siffle quand je respire et je manque d'air quand je monte les escaliers.",
+        "diagnosis": "Asthme allergique",
+        "medication": "Salbutamol en inhalation à la demande",
+        "recommendation": "Éviter les acariens et aérer la chambre.",
+        "query": "essoufflement et respiration sifflante",
+    },
+    "migraine": {
+        "complaint": "J'ai des crises de douleur d'un seul côté de la tête, la lumière me gêne beaucoup.",
+        "diagnosis": "Migraine sans aura",
+        "medication": "Sumatriptan 50 mg au début de la crise",
+        "recommendation": "Tenir un carnet des crises et dormir à heures régulières.",
+        "query": "céphalées unilatérales avec photophobie",
+    },
+    "low_back_pain": {
+        "complaint": "J'ai une douleur dans le bas du dos qui descend dans la jambe droite.",
+        "diagnosis": "Lombosciatique droite",
+        "medication": "Ibuprofène 400 mg trois fois par jour pendant cinq jours",
+        "recommendation": "Kinésithérapie et éviter de porter des charges lourdes.",
+        "query": "mal au dos irradiant vers la jambe",
+    },
+    "reflux": {
+        "complaint": "J'ai des brûlures qui remontent derrière le sternum après les repas.",
+        "diagnosis": "Reflux gastro-œsophagien",
+        "medication": "Oméprazole 20 mg avant le petit déjeuner",
+        "recommendation": "Surélever la tête du lit et éviter les repas tardifs.",
+        "query": "brûlures d'estomac et remontées acides",
+    },
+    "depression": {
+        "complaint": "Je n'ai plus goût à rien, je pleure souvent et je dors mal depuis des semaines.",
+        "diagnosis": "Épisode dépressif modéré",
+        "medication": "Sertraline 50 mg le matin",
+        "recommendation": "Suivi psychologique hebdomadaire.",
+        "query": "tristesse et perte d'intérêt",
+    },
+    "hypothyroidism": {
+        "complaint": "J'ai pris du poids, j'ai toujours froid et je me sens ralenti.",
+        "diagnosis": "Hypothyroïdie",
+        "medication": "Lévothyroxine 75 µg à jeun",
+        "recommendation": "Contrôle de la TSH dans six semaines.",
+        "query": "thyroïde insuffisante fatigue et prise de poids",
+    },
+    "eczema": {
+        "complaint": "J'ai des plaques rouges qui grattent sur les coudes et derrière les genoux.",
+        "diagnosis": "Dermatite atopique",
+        "medication": "Crème de corticoïde deux fois par jour",
+        "recommendation": "Hydrater la peau avec un émollient quotidien.",
+        "query": "démangeaisons et lésions cutanées",
+    },
+    "tonsillitis": {
+        "complaint": "J'ai très mal à la gorge, j'ai du mal à avaler et j'ai de la fièvre.",
+        "diagnosis": "Angine bactérienne",
+        "medication": "Amoxicilline 1 g deux fois par jour pendant six jours",
+        "recommendation": "Boire beaucoup et revenir si la fièvre persiste.",
+        "query": "gorge douloureuse avec fièvre",
+    },
+    "knee_osteoarthritis": {
+        "complaint": "Mon genou gauche craque et me fait mal quand je marche longtemps.",
+        "diagnosis": "Gonarthrose gauche",
+        "medication": "Paracétamol 1 g si douleur",
+        "recommendation": "Perte de poids et renforcement musculaire.",
+        "query": "douleur articulaire du genou à la marche",
+    },
+    "insomnia": {
+        "complaint": "Je n'arrive pas à m'endormir avant trois heures du matin.",
+        "diagnosis": "Insomnie d'endormissement",
+        "medication": "Mélatonine 2 mg le soir",
+        "recommendation": "Pas d'écran une heure avant le coucher.",
+        "query": "troubles du sommeil",
+    },
+}
+
+# Context that distinguishes visits of the same condition: (visit wording, query wording)
+EVENTS = [
+    ("Tout a commencé au retour d'un voyage au Maroc.", "après un séjour au Maroc"),
+    ("Ça a démarré après la naissance de mon deuxième enfant.", "depuis son accouchement"),
+    ("C'est apparu quand j'ai changé de travail pour des horaires de nuit.", "travail de nuit"),
+    ("Les symptômes ont débuté après ma chute à vélo.", "accident de vélo"),
+    ("C'est arrivé pendant le ramadan.", "pendant le jeûne"),
+    ("Ça a commencé depuis notre déménagement à la montagne.", "installation en altitude"),
+    ("Depuis le décès de mon père, ça ne va pas.", "après un deuil"),
+    ("C'est depuis que j'ai arrêté de fumer.", "sevrage tabagique"),
+    ("Ça a commencé quand j'ai repris la course à pied.", "reprise du sport"),
+    ("C'est apparu après la vaccination contre la grippe.", "suite au vaccin"),
+]
+
+FILLER = [
+    "Bonjour docteur, merci de me recevoir.",
+    "Asseyez-vous, comment allez-vous depuis la dernière fois ?",
+    "Je vais vous examiner, allongez-vous s'il vous plaît.",
+    "Vous avez bien pris vos rendez-vous chez le laboratoire ?",
+    "Ma femme m'a dit de venir vous voir.",
+    "Est-ce que vous avez des allergies connues ?",
+    "Je vous fais une ordonnance pour la pharmacie.",
+    "On se revoit dans un mois pour faire le point.",
+    "Vous pouvez vous rhabiller.",
+    "Avez-vous des questions ?",
+    "Je travaille beaucoup en ce moment, c'est difficile.",
+    "Mes enfants vont bien, merci.",
+]
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Offline bag-of-words embedding (lexical baseline, no model download)."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.strip(".,;:!?()'\"").encode("utf-8")).hexdigest(), 16) % self.dim] += 1.0
+            vectors.append(vector / (np.linalg.norm(vector) or 1.0))
+        return vectors
+
+    @staticmethod
+    def name():
+        return "hashing-bow"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config_dict):
+        return HashingEmbeddingFunction(config_dict.get("dim", 384))
+
+
+def generate_corpus(n_patients, visits_per_patient, filler_sentences, seed=0):
+    """Visits with known condition/event labels, plus labelled global and patient-scoped queries."""
+    rng = random.Random(seed)
+    conversations = []
+    labels = {}  # visit_id -> (patient_id, condition, event index)
+    visit_id = 0
+    for patient_id in range(1, n_patients + 1):
+        # A patient is followed for a few chronic conditions
+        patient_conditions = rng.sample(sorted(CONDITIONS), k=min(3, len(CONDITIONS)))
+        visit_date = datetime(2023, 1, 1) + timedelta(days=rng.randint(0, 60))
+        for _ in range(visits_per_patient):
+            visit_id += 1
+            condition_key = rng.choice(patient_conditions)
+            condition = CONDITIONS[condition_key]
+            event = rng.randrange(len(EVENTS))
+            sentences = rng.sample(FILLER, k=min(filler_sentences, len(FILLER)))
+            middle = len(sentences) // 2
+            transcription = " ".join(
+                sentences[:middle]
+                + [EVENTS[event][0], condition["complaint"]]
+                + sentences[middle:]
+                + [f"Je pense qu'il s'agit de: {condition['diagnosis']}.", f"Je vous prescris {condition['medication']}."]
+            )
+            conversations.append({
+                "visit_id": visit_id,
+                "patient_id": patient_id,
+                "transcription": transcription,
+                "summary": f"Diagnostic: {condition['diagnosis']}. Traitement: {condition['medication']}. "
+                           f"{condition['recommendation']}",
+                "metadata": {"visit_type": "consultation", "visit_date": visit_date.isoformat()}
+            })
+            labels[visit_id] = (patient_id, condition_key, event)
+            visit_date += timedelta(days=rng.randint(20, 90))
+
+    queries = []
+    pairs = sorted({(c, e) for _, c, e in labels.values()})
+    for condition_key, event in rng.sample(pairs, k=min(len(pairs), 100)):
+        queries.append({
+            "scope": "global",
+            "query": f"{CONDITIONS[condition_key]['query']} {EVENTS[event][1]}",
+            "patient_id": None,
+            "relevant": sorted(v for v, (_, c, e) in labels.items() if c == condition_key and e == event)
+        })
+    for visit in rng.sample(conversations, k=min(len(conversations), 100)):
+        patient_id, condition_key, _ = labels[visit["visit_id"]]
+        queries.append({
+            "scope": "patient",
+            "query": CONDITIONS[condition_key]["query"],
+            "patient_id": patient_id,
+            "relevant": sorted(v for v, (p, c, _) in labels.items() if p == patient_id and c == condition_key)
+        })
+    return conversations, queries
+
+
+def directory_size_mb(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file()) / 1e6
+
+
+def run_configuration(backend, chunk_tokens, embedding_function, conversations, queries, k):
+    workdir = Path(tempfile.mkdtemp(prefix="search_bench_"))
+    saved = (config.VECTOR_INDEX_INT8, config.TRANSCRIPT_CHUNK_TOKENS, config.TRANSCRIPT_CHUNK_OVERLAP)
+    try:
+        config.VECTOR_INDEX_INT8 = backend == "numpy-int8"
+        config.TRANSCRIPT_CHUNK_TOKENS = chunk_tokens
+        config.TRANSCRIPT_CHUNK_OVERLAP = min(saved[2], chunk_tokens // 2)
+
+        # Fresh embedding cache: build time includes embedding every document once
+        cache = EmbeddingCache(workdir / "embedding_cache.db", embedding_model_id(embedding_function))
+        vector_store = VectorStore(
+            embedding_function=embedding_function,
+            embedding_cache=cache,
+            backend="numpy" if backend.startswith("numpy") else backend,
+            persist_path=workdir / "index"
+        )
+
+        started = time.perf_counter()
+        vector_store.add_conversations(conversations)
+        build_s = time.perf_counter() - started
+
+        metrics = {}
+        for scope in ("global", "patient"):
+            recalls, reciprocal_ranks, latencies = [], [], []
+            for query in (q for q in queries if q["scope"] == scope):
+                started = time.perf_counter()
+                results = vector_store.search_conversations(query["query"], query["patient_id"], n_results=k)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+                retrieved = [int(r["metadata"]["visit_id"]) for r in results]
+                relevant = set(query["relevant"])
+                recalls.append(len(relevant.intersection(retrieved)) / min(k, len(relevant)))
+                rank = next((i + 1 for i, visit_id in enumerate(retrieved) if visit_id in relevant), None)
+                reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+            metrics[scope] = {
+                "queries": len(latencies),
+                f"recall@{k}": round(float(np.mean(recalls)), 4) if recalls else None,
+                "mrr": round(float(np.mean(reciprocal_ranks)), 4) if reciprocal_ranks else None,
+                "p50_ms": round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+                "p95_ms": round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+            }
+
+        return {
+            "backend": backend,
+            "chunk_tokens": chunk_tokens,
+            "embedding": embedding_model_id(embedding_function),
+            "vectors": vector_store.conversations_collection.count(),
+            "build_s": round(build_s, 3),
+            "disk_mb": round(directory_size_mb(workdir / "index"), 2),
+            **metrics
+        }
+    finally:
+        config.VECTOR_INDEX_INT8, config.TRANSCRIPT_CHUNK_TOKENS, config.TRANSCRIPT_CHUNK_OVERLAP = saved
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--visits", type=int, default=8, help="Visits per patient")
+    parser.add_argument("--filler", type=int, default=8, help="Small-talk sentences per transcript")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--backends", default="chroma,numpy,numpy-int8")
+    parser.add_argument("--chunk-tokens", default=str(config.TRANSCRIPT_CHUNK_TOKENS), help="Comma-separated chunk sizes")
+    parser.add_argument("--embedding", choices=["default", "hashing"], default="default",
+                        help="default: the app's embedding model; hashing: offline lexical baseline")
+    parser.add_argument("--output", help="JSON results file (default: data/benchmarks/search_quality_<timestamp>.json)")
+    args = parser.parse_args()
+
+    output = Path(args.output) if args.output else (
+        config.DATA_DIR / "benchmarks" / f"search_quality_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    print("🔬 Generating synthetic clinic corpus...")
+    conversations, queries = generate_corpus(args.patients, args.visits, args.filler)
+    print(f"   {args.patients} patients, {len(conversations)} visits, {len(queries)} labelled queries\n")
+
+    embedding_function = HashingEmbeddingFunction() if args.embedding == "hashing" else None
+    if embedding_function is None:
+        from chromadb.utils import embedding_functions
+        embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+    runs = []
+    for backend in args.backends.split(","):
+        for chunk_tokens in [int(c) for c in args.chunk_tokens.split(",")]:
+            print(f"⏱️  {backend}, chunks of {chunk_tokens} tokens...")
+            run = run_configuration(backend, chunk_tokens, embedding_function, conversations, queries, args.k)
+            runs.append(run)
+            for scope in ("global", "patient"):
+                m = run[scope]
+                print(f"   {scope:<8} recall@{args.k}={m[f'recall@{args.k}']:.3f} mrr={m['mrr']:.3f} "
+                      f"p50={m['p50_ms']:.1f}ms p95={m['p95_ms']:.1f}ms")
+            print(f"   build {run['build_s']:.2f}s, {run['vectors']} vectors, {run['disk_mb']:.1f} MB")
+
+    report = {
+        "benchmark": "search_quality",
+        "commit": git_commit(),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "parameters": vars(args),
+        "runs": runs
+    }
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\n✅ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
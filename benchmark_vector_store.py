@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Benchmark the Chroma and NumPy vector backends on synthetic embeddings."""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import chromadb
+from chromadb.config import Settings
+from services.numpy_index import NumpyIndexClient
+from services.patient_partitions import PatientPartitions
+
+
+def make_corpus(size, dim, n_patients, seed=0):
+    """Clustered unit vectors (one topic centre per patient) with patient metadata."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_patients, dim)).astype(np.float32)
+    patients = rng.integers(0, n_patients, size=size)
+    vectors = centres[patients] + 0.8 * rng.normal(size=(size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadatas = [{"patient_id": int(p) + 1, "note_type": ("diagnosis", "recommendations")[i % 2]}
+                 for i, p in enumerate(patients)]
+    return vectors, metadatas
+
+
+def open_client(backend, path):
+    if backend.startswith("chroma"):
+        return chromadb.PersistentClient(path=str(path), settings=Settings(anonymized_telemetry=False))
+    return NumpyIndexClient(path, quantize=(backend == "numpy-int8"))
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def bench_backend(backend, vectors, metadatas, queries, query_patients, k, batch_size):
+    path = Path(tempfile.mkdtemp(prefix=f"bench_{backend}_"))
+    try:
+        client = open_client(backend, path)
+        collection = client.get_or_create_collection("bench", embedding_function=None)
+
+        started = time.perf_counter()
+        for start in range(0, len(vectors), batch_size):
+            end = start + batch_size
+            collection.upsert(
+                ids=[f"doc_{i}" for i in range(start, min(end, len(vectors)))],
+                embeddings=vectors[start:end].tolist(),
+                documents=[f"document {i}" for i in range(start, min(end, len(vectors)))],
+                metadatas=metadatas[start:end]
+            )
+        build_s = time.perf_counter() - started
+        del collection, client
+
+        # Cold open: what the app pays at startup
+        started = time.perf_counter()
+        client = open_client(backend, path)
+        collection = client.get_or_create_collection("bench", embedding_function=None)
+        collection.count()
+        open_ms = (time.perf_counter() - started) * 1000
+
+        # "chroma-partitioned": patient-scoped queries go through VectorStore's exact per-patient partitions
+        partitions = PatientPartitions() if backend == "chroma-partitioned" else None
+
+        results = {}
+        for scope in ("global", "patient"):
+            latencies = []
+            hits = []
+            for query, patient_id in zip(queries, query_patients):
+                where = {"patient_id": int(patient_id)} if scope == "patient" else None
+                started = time.perf_counter()
+                if partitions is not None and where:
+                    result = partitions.query(collection, [query.tolist()], k, where)
+                else:
+                    result = collection.query(query_embeddings=[query.tolist()], n_results=k, where=where)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits.append([int(doc_id.split("_")[1]) for doc_id in result["ids"][0]])
+            results[scope] = {"p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95), "hits": hits}
+
+        disk_mb = sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1e6
+        return {"build_s": build_s, "open_ms": open_ms, "disk_mb": disk_mb, **results}
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def exact_top_k(vectors, patient_ids, queries, query_patients, k, scoped):
+    truth = []
+    for query, patient_id in zip(queries, query_patients):
+        rows = np.flatnonzero(patient_ids == patient_id) if scoped else np.arange(len(vectors))
+        similarities = vectors[rows] @ query
+        truth.append(set(rows[np.argsort(-similarities)[:k]].tolist()))
+    return truth
+
+
+def recall(hits, truth):
+    return float(np.mean([len(set(h) & t) / max(1, len(t)) for h, t in zip(hits, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,30000", help="Comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (MiniLM: 384)")
+    parser.add_argument("--patients", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--backends", default="chroma,chroma-partitioned,numpy,numpy-int8")
+    args = parser.parse_args()
+
+    print("🧪 Vector backend benchmark\n")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        vectors, metadatas = make_corpus(size, args.dim, args.patients)
+        patient_ids = np.array([m["patient_id"] for m in metadatas])
+        rng = np.random.default_rng(1)
+        picks = rng.integers(0, size, size=args.queries)
+        queries = vectors[picks] + 0.3 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        query_patients = patient_ids[picks]
+        truth = {
+            "global": exact_top_k(vectors, patient_ids, queries, query_patients, args.k, False),
+            "patient": exact_top_k(vectors, patient_ids, queries, query_patients, args.k, True),
+        }
+
+        print(f"📦 {size} vectors, dim {args.dim}, {args.patients} patients")
+        print(f"{'backend':<20}{'build s':>9}{'open ms':>9}{'disk MB':>9}"
+              f"{'glob p50':>10}{'glob p95':>10}{'glob R@k':>10}{'pat p50':>9}{'pat p95':>9}{'pat R@k':>9}")
+        for backend in args.backends.split(","):
+            r = bench_backend(backend, vectors, metadatas, queries, query_patients, args.k, args.batch_size)
+            print(f"{backend:<20}{r['build_s']:>9.2f}{r['open_ms']:>9.1f}{r['disk_mb']:>9.1f}"
+                  f"{r['global']['p50_ms']:>10.2f}{r['global']['p95_ms']:>10.2f}{recall(r['global']['hits'], truth['global']):>10.3f}"
+                  f"{r['patient']['p50_ms']:>9.2f}{r['patient']['p95_ms']:>9.2f}{recall(r['patient']['hits'], truth['patient']):>9.3f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,46 @@ CONVERSATIONS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Database
 DATABASE_PATH = DATA_DIR / "patients.db"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")  # WAL: readers are never blocked by a writer
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # Writers wait for the lock this long
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # Page cache per connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))  # Connections kept open (one per concurrent Streamlit session)
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "16"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "2000"))  # Rows per transaction in bulk imports
+PATIENT_PICKER_PAGE_SIZE = int(os.getenv("PATIENT_PICKER_PAGE_SIZE", "50"))  # Patients per page in the UI patient picker
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))  # Cached patient reads in DatabaseManager, 0 to disable
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))  # Seconds; bounds staleness for writes from other processes
 CHROMADB_PATH = DATA_DIR / "chromadb"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # chroma or numpy (in-process memory-mapped index)
+VECTOR_INDEX_PATH = DATA_DIR / "vector_index"  # Used by the numpy backend
+VECTOR_INDEX_INT8 = os.getenv("VECTOR_INDEX_INT8", "false").lower() == "true"  # int8-quantized vectors (numpy backend)
+PATIENT_PARTITION_CACHE_SIZE = int(os.getenv("PATIENT_PARTITION_CACHE_SIZE", "256"))  # Patients searched by exact brute force (chroma backend), 0 to disable
+PATIENT_PARTITION_TTL = float(os.getenv("PATIENT_PARTITION_TTL", "30"))  # Seconds; picks up vector writes from other processes
+VECTOR_LAZY_OPEN = os.getenv("VECTOR_LAZY_OPEN", "true").lower() == "true"  # Open the index on first query, not at app start
+VECTOR_SNAPSHOT_DIR = DATA_DIR / "vector_snapshots"
+VECTOR_SNAPSHOT_KEEP = int(os.getenv("VECTOR_SNAPSHOT_KEEP", "5"))
+VECTOR_BATCH_SIZE = int(os.getenv("VECTOR_BATCH_SIZE", "64"))  # Documents embedded per model call
+TRANSCRIPT_CHUNK_TOKENS = int(os.getenv("TRANSCRIPT_CHUNK_TOKENS", "200"))  # Indexed transcript window size
+TRANSCRIPT_CHUNK_OVERLAP = int(os.getenv("TRANSCRIPT_CHUNK_OVERLAP", "40"))
+EMBEDDING_CACHE_PATH = DATA_DIR / "embedding_cache.db"
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))  # Hot vectors kept in RAM
 
 # Ollama Configuration
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:latest")  # Using latest which is 8B
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))  # Concurrent generations the Ollama server accepts
+
+# Chat Configuration
+CHAT_MEMORY_MODE = os.getenv("CHAT_MEMORY_MODE", "window")  # window (last 10 messages) or rolling (summary + last exchange)
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "250"))
+CHAT_INTENT_ROUTER = os.getenv("CHAT_INTENT_ROUTER", "true").lower() == "true"  # Answer structured questions without the LLM
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "600"))  # Retrieved passages per prompt
+CHAT_ANSWER_CACHE_SIZE = int(os.getenv("CHAT_ANSWER_CACHE_SIZE", "500"))  # Cached suggested-question answers, 0 to disable
+CHAT_HISTORY_MAX_CONVERSATIONS = int(os.getenv("CHAT_HISTORY_MAX_CONVERSATIONS", "500"))  # Conversations (session, patient) kept in memory
 
 # Whisper Configuration
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")  # base, small, medium, large-v2
@@ -1,6 +1,7 @@
 """Database package."""
 from database.db_manager import DatabaseManager, db_manager
-from database.schema import Patient, Visit, Medication, TestResult, PatternAnalysis
+from database.schema import Patient, Visit, Medication, TestResult, PatternAnalysis, VectorSyncState, LabValue
+from database.read_models import PatientRecord, VisitRecord, MedicationRecord, TestResultRecord
 
 __all__ = [
     "DatabaseManager",
@@ -10,5 +11,11 @@ __all__ = [
     "Medication",
     "TestResult",
     "PatternAnalysis",
+    "VectorSyncState",
+    "LabValue",
+    "PatientRecord",
+    "VisitRecord",
+    "MedicationRecord",
+    "TestResultRecord",
 ]
 
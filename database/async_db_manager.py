@@ -0,0 +1,289 @@
+"""Async database manager (aiosqlite) mirroring DatabaseManager."""
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Union
+import config
+from database.schema import Base, Patient, Visit, Medication, TestResult, LabValue, VectorSyncState
+from database.fts import create_fts, rebuild_fts, search_fts
+from database.migrations import upgrade_schema_on_connection
+from database.engine import get_async_engine
+from database.queries import (
+    patient_list_statement, patient_page_statement, visit_page_statement, split_page, visit_text_sizes_statement,
+    patient_statement, all_patients_statement, patient_visits_statement, visit_statement,
+    patient_medications_statement, patient_test_results_statement, PATIENT_PAGE_CURSOR
+)
+from database.read_models import ReadModel, PatientRecord, VisitRecord, MedicationRecord, TestResultRecord
+from database.lab_values import extract_lab_values, backfill_lab_values, lab_series, lab_analytes
+
+
+class AsyncDatabaseManager:
+    """
+    Async counterpart of DatabaseManager, for code that overlaps database
+    access with Ollama or Whisper I/O.
+    
+    Methods take the same arguments and return the same values as their
+    DatabaseManager equivalents (read models, detached ORM objects for
+    created rows, or dictionaries).
+    Connections come from the shared async engine of the running event loop,
+    so managers can be created freely, e.g. one per request.
+    """
+    
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or str(config.DATABASE_PATH)
+        self.fts_enabled = None  # Known after initialize()
+    
+    @property
+    def engine(self):
+        """Shared async engine for this database on the running event loop."""
+        return get_async_engine(self.db_path)
+    
+    async def initialize(self):
+        """Create missing tables, columns, indexes and the full-text index (like DatabaseManager's startup)."""
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.run_sync(upgrade_schema_on_connection)
+            self.fts_enabled = await connection.run_sync(create_fts)
+            if (await connection.execute(select(LabValue.id).limit(1))).first() is None:
+                await connection.run_sync(backfill_lab_values)
+    
+    @asynccontextmanager
+    async def get_session(self) -> AsyncIterator[AsyncSession]:
+        """Async context manager for database sessions."""
+        session = async_sessionmaker(self.engine, expire_on_commit=False)()
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+    
+    async def _add(self, instance):
+        """Insert an ORM object and return it detached with its generated values loaded."""
+        async with self.get_session() as session:
+            session.add(instance)
+            await session.flush()
+            await session.refresh(instance)
+            session.expunge(instance)
+        return instance
+    
+    async def _records(self, record_class, statement) -> List[ReadModel]:
+        """Run a read-model SELECT and build its records (no ORM session involved)."""
+        async with self.engine.connect() as connection:
+            return record_class.from_rows(await connection.execute(statement))
+    
+    async def create_patient(self, patient_data: dict) -> Patient:
+        """Create a new patient record."""
+        return await self._add(Patient(**patient_data))
+    
+    async def get_patient(self, patient_id: int = None, patient_code: str = None) -> Optional[PatientRecord]:
+        """Retrieve a patient by ID or patient code."""
+        statement = patient_statement(patient_id, patient_code)
+        if statement is None:
+            return None
+        patients = await self._records(PatientRecord, statement)
+        return patients[0] if patients else None
+    
+    async def get_patient_visits(self, patient_id: int, limit: int = None,
+                                 load_text: Union[bool, Iterable[str]] = False) -> List[VisitRecord]:
+        """Get all visits for a patient, ordered by date; see DatabaseManager.get_patient_visits."""
+        return await self._records(VisitRecord, patient_visits_statement(patient_id, limit, load_text))
+    
+    async def get_visit_text_sizes(self, patient_id: int) -> List[tuple]:
+        """Get (visit id, length of each text column) for a patient's visits; see DatabaseManager."""
+        async with self.get_session() as session:
+            return [tuple(row) for row in (await session.execute(visit_text_sizes_statement(patient_id))).all()]
+    
+    async def get_patient_medications(self, patient_id: int, active_only: bool = True) -> List[MedicationRecord]:
+        """Get medications for a patient."""
+        return await self._records(MedicationRecord, patient_medications_statement(patient_id, active_only))
+    
+    async def get_patient_test_results(self, patient_id: int, test_type: str = None) -> List[TestResultRecord]:
+        """Get test results for a patient."""
+        return await self._records(TestResultRecord, patient_test_results_statement(patient_id, test_type))
+    
+    async def create_visit(self, visit_data: dict) -> Visit:
+        """Create a new visit record."""
+        return await self._add(Visit(**visit_data))
+    
+    async def update_visit(self, visit_id: int, update_data: dict):
+        """Update a visit record."""
+        async with self.get_session() as session:
+            visit = await session.get(Visit, visit_id)
+            if visit:
+                for key, value in update_data.items():
+                    setattr(visit, key, value)
+                await session.flush()
+    
+    async def get_visit(self, visit_id: int) -> Optional[VisitRecord]:
+        """Get a visit by ID."""
+        visits = await self._records(VisitRecord, visit_statement(visit_id))
+        return visits[0] if visits else None
+    
+    async def add_medication(self, medication_data: dict) -> Medication:
+        """Add a medication record."""
+        return await self._add(Medication(**medication_data))
+    
+    async def get_all_patients(self) -> List[PatientRecord]:
+        """Get all patients."""
+        return await self._records(PatientRecord, all_patients_statement())
+    
+    async def count_patients(self) -> int:
+        """Get the number of patients."""
+        async with self.get_session() as session:
+            return await session.scalar(select(func.count(Patient.id)))
+    
+    async def get_patient_list(
+        self,
+        sort_by: str = "last_visit",
+        descending: bool = True,
+        limit: int = None,
+        offset: int = 0
+    ) -> List[Dict]:
+        """Get patient list rows with their activity summary; see DatabaseManager.get_patient_list."""
+        async with self.get_session() as session:
+            rows = (await session.execute(patient_list_statement(sort_by, descending, limit, offset))).all()
+            return [row._asdict() for row in rows]
+    
+    async def list_patients(
+        self,
+        search: str = None,
+        last_visit_from: datetime = None,
+        last_visit_to: datetime = None,
+        limit: int = 50,
+        cursor: tuple = None
+    ) -> Dict:
+        """Get one page of patients in name order; see DatabaseManager.list_patients."""
+        statement = patient_page_statement(search, last_visit_from, last_visit_to, limit, cursor)
+        async with self.get_session() as session:
+            rows = (await session.execute(statement)).all()
+            return split_page(rows, limit, PATIENT_PAGE_CURSOR)
+    
+    async def list_visits(
+        self,
+        patient_id: int = None,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        visit_type: str = None,
+        limit: int = 50,
+        cursor: tuple = None
+    ) -> Dict:
+        """Get one page of visits, newest first; see DatabaseManager.list_visits."""
+        statement = visit_page_statement(patient_id, date_from, date_to, visit_type, limit, cursor)
+        async with self.get_session() as session:
+            rows = (await session.execute(statement)).all()
+            return split_page(rows, limit, ("visit_date", "id"))
+    
+    async def add_test_result(self, test_data: dict) -> TestResult:
+        """Add a test result, with its lab values in the same transaction."""
+        test_result = TestResult(**test_data)
+        async with self.get_session() as session:
+            session.add(test_result)
+            await session.flush()
+            session.add_all(LabValue(**row) for row in extract_lab_values(
+                test_result.results_data, test_result.patient_id, test_result.id,
+                test_result.test_name, test_result.test_date
+            ))
+            await session.flush()
+            await session.refresh(test_result)
+            session.expunge(test_result)
+        return test_result
+    
+    async def backfill_lab_values(self) -> int:
+        """Extract the lab values of test results that have none yet; returns the number inserted."""
+        async with self.engine.begin() as connection:
+            return await connection.run_sync(backfill_lab_values)
+    
+    async def get_lab_series(
+        self,
+        patient_id: int,
+        analytes: Optional[Iterable[str]] = None,
+        start: datetime = None,
+        end: datetime = None
+    ) -> Dict[str, Dict]:
+        """Get a patient's lab values as NumPy time series per analyte; see DatabaseManager.get_lab_series."""
+        async with self.engine.connect() as connection:
+            return await connection.run_sync(lab_series, patient_id, analytes, start, end)
+    
+    async def get_lab_analytes(self, patient_id: int) -> List[Dict]:
+        """Get the analytes measured for a patient: [{'analyte', 'count', 'last_measured_at'}]."""
+        async with self.engine.connect() as connection:
+            return await connection.run_sync(lab_analytes, patient_id)
+    
+    async def iter_visits_for_indexing(self, visit_ids: List[int] = None, batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Stream the indexed fields of visits (all by default), without loading ORM objects."""
+        statement = select(
+            Visit.id, Visit.patient_id, Visit.visit_date, Visit.visit_type,
+            Visit.transcription, Visit.summary, Visit.topics_discussed,
+            Visit.diagnosis, Visit.recommendations
+        )
+        if visit_ids is not None:
+            statement = statement.where(Visit.id.in_(visit_ids))
+        statement = statement.order_by(Visit.id).execution_options(yield_per=batch_size)
+        async with self.get_session() as session:
+            result = await session.stream(statement)
+            async for row in result:
+                yield row._asdict()
+    
+    async def get_vector_sync_state(self) -> Dict[int, str]:
+        """Get visit_id -> content hash of what the vector store currently holds."""
+        async with self.get_session() as session:
+            rows = await session.execute(select(VectorSyncState.visit_id, VectorSyncState.content_hash))
+            return dict(rows.all())
+    
+    async def save_vector_sync_state(self, states: List[Dict]):
+        """Record visits ({'visit_id', 'patient_id', 'content_hash'}) as synced."""
+        async with self.get_session() as session:
+            for state in states:
+                await session.merge(VectorSyncState(**state))
+    
+    async def get_vector_sync_rows(self) -> List[Dict]:
+        """Get the full sync state ({'visit_id', 'patient_id', 'content_hash'} rows)."""
+        async with self.get_session() as session:
+            rows = await session.execute(
+                select(VectorSyncState.visit_id, VectorSyncState.patient_id, VectorSyncState.content_hash)
+            )
+            return [row._asdict() for row in rows.all()]
+    
+    async def replace_vector_sync_state(self, states: List[Dict]):
+        """Replace the whole sync state, e.g. after restoring a vector store snapshot."""
+        async with self.get_session() as session:
+            await session.execute(delete(VectorSyncState))
+            if states:
+                await session.execute(VectorSyncState.__table__.insert(), states)
+    
+    async def delete_vector_sync_state(self, visit_ids: List[int]):
+        """Forget the sync state of visits removed from the vector store."""
+        if not visit_ids:
+            return
+        async with self.get_session() as session:
+            await session.execute(delete(VectorSyncState).where(VectorSyncState.visit_id.in_(visit_ids)))
+    
+    async def search_text(
+        self,
+        query: str,
+        patient_id: Optional[int] = None,
+        sources: Optional[List[str]] = None,
+        limit: int = 20,
+        prefix: bool = True
+    ) -> List[Dict]:
+        """Keyword search over visits, medications and test results; see DatabaseManager.search_text."""
+        if self.fts_enabled is None:
+            await self.initialize()
+        if not self.fts_enabled:
+            return []
+        async with self.engine.connect() as connection:
+            return await connection.run_sync(
+                search_fts, query, patient_id=patient_id, sources=sources, limit=limit, prefix=prefix
+            )
+    
+    async def rebuild_text_index(self):
+        """Re-index all records for keyword search."""
+        if self.fts_enabled is None:
+            await self.initialize()
+        if self.fts_enabled:
+            async with self.engine.begin() as connection:
+                await connection.run_sync(rebuild_fts)
@@ -0,0 +1,247 @@
+"""Bulk import of patients, visits, medications and test results (e.g. legacy EMR migration)."""
+import argparse
+import csv
+import json
+import time
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, or_, select
+from database.schema import Patient
+
+TRUE_VALUES = {"1", "true", "yes", "oui", "vrai"}
+FALSE_VALUES = {"0", "false", "no", "non", "faux", ""}
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the rest of the batch goes on."""
+
+
+def _coerce(column, value):
+    """Convert CSV/JSON values (ISO date strings, "oui", "12.5", JSON text) to the column's Python type."""
+    if value is None:
+        return None
+    column_type = column.type
+    if isinstance(column_type, JSON):
+        # CSV cells hold JSON text; stored as is it would become a JSON string literal
+        if not isinstance(value, str):
+            return value
+        try:
+            return json.loads(value)
+        except ValueError:
+            raise RowError(f"{column.name}: invalid JSON '{value}'")
+    if isinstance(column_type, DateTime):
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        if isinstance(value, str):
+            if not value.strip():
+                return None
+            try:
+                return datetime.fromisoformat(value.strip())
+            except ValueError:
+                raise RowError(f"{column.name}: invalid date '{value}'")
+        raise RowError(f"{column.name}: invalid date '{value}'")
+    if isinstance(column_type, Boolean):
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise RowError(f"{column.name}: invalid boolean '{value}'")
+    if isinstance(column_type, (Integer, Float)):
+        if isinstance(value, str) and not value.strip():
+            return None
+        try:
+            return int(value) if isinstance(column_type, Integer) else float(value)
+        except (TypeError, ValueError):
+            raise RowError(f"{column.name}: invalid number '{value}'")
+    return value
+
+
+class BulkImporter:
+    """
+    Inserts rows of one table with executemany, one transaction per chunk.
+
+    Rows are validated and converted before insertion, so a bad row is
+    reported (with its position in the input) instead of aborting the
+    batch. Patient references are either the integer key (an int
+    `patient_id`) or the patient code (`patient_code`, or a string
+    `patient_id`, as read from CSV); they are resolved with one query per
+    chunk.
+    """
+
+    def __init__(self, engine, model, chunk_size: int = 1000):
+        self.engine = engine
+        self.table = model.__table__
+        self.chunk_size = chunk_size
+        self.columns = {c.name: c for c in self.table.columns if not c.primary_key}
+        self.required = [
+            c.name for c in self.columns.values()
+            if not c.nullable and c.default is None and c.server_default is None
+        ]
+        self.is_patient_table = model is Patient
+        self._patient_keys = {}  # patient code or integer key -> integer key
+
+    def _resolve_patients(self, connection, rows: List[Tuple[int, Dict]]):
+        """Look up the patient references of a chunk not seen in earlier chunks."""
+        references = {row.get("patient_code", row.get("patient_id")) for _, row in rows} - set(self._patient_keys)
+        codes = {reference for reference in references if isinstance(reference, str)}
+        keys = {reference for reference in references if isinstance(reference, int)}
+        if not codes and not keys:
+            return
+        found = connection.execute(
+            select(Patient.id, Patient.patient_id).where(or_(Patient.patient_id.in_(codes), Patient.id.in_(keys)))
+        ).all()
+        for key, code in found:
+            if key in keys:
+                self._patient_keys[key] = key
+            if code in codes:
+                self._patient_keys[code] = key
+        for reference in codes | keys:
+            self._patient_keys.setdefault(reference, None)
+
+    def _prepare(self, row: Dict) -> Dict:
+        """Validate one input row and return the values to insert."""
+        row = dict(row)
+        if not self.is_patient_table:
+            reference = row.pop("patient_code", row.get("patient_id"))
+            if reference is None:
+                raise RowError("patient_id: missing")
+            key = self._patient_keys.get(reference) if isinstance(reference, (str, int)) else None
+            if key is None:
+                raise RowError(f"patient_id: unknown patient '{reference}'")
+            row["patient_id"] = key
+
+        unknown = set(row) - set(self.columns)
+        if unknown:
+            raise RowError(f"unknown columns: {', '.join(sorted(unknown))}")
+        values = {name: _coerce(self.columns[name], value) for name, value in row.items()}
+        missing = [name for name in self.required if values.get(name) in (None, "")]
+        if missing:
+            raise RowError(f"missing required columns: {', '.join(missing)}")
+        return values
+
+    def _check_new_codes(self, connection, prepared: List[Tuple[int, Dict]], errors: List[Dict]) -> List[Tuple[int, Dict]]:
+        """Reject patient codes already in the database or repeated in the input."""
+        codes = [values["patient_id"] for _, values in prepared]
+        existing = set(connection.execute(select(Patient.patient_id).where(Patient.patient_id.in_(codes))).scalars())
+        accepted = []
+        for index, values in prepared:
+            code = values["patient_id"]
+            if code in existing:
+                errors.append({"row": index, "error": f"patient_id: '{code}' already exists"})
+            else:
+                existing.add(code)
+                accepted.append((index, values))
+        return accepted
+
+    def _insert_chunk(self, chunk: List[Tuple[int, Dict]], report: Dict):
+        with self.engine.begin() as connection:
+            if not self.is_patient_table:
+                self._resolve_patients(connection, chunk)
+            prepared = []
+            for index, row in chunk:
+                try:
+                    prepared.append((index, self._prepare(row)))
+                except RowError as e:
+                    report["errors"].append({"row": index, "error": str(e)})
+            if self.is_patient_table and prepared:
+                prepared = self._check_new_codes(connection, prepared, report["errors"])
+            if not prepared:
+                return
+            # executemany needs the same keys in every row; grouping by key set (rather than
+            # filling gaps with None) lets column defaults apply to the absent columns
+            groups = {}
+            for index, values in prepared:
+                groups.setdefault(tuple(sorted(values)), []).append(values)
+            try:
+                for parameters in groups.values():
+                    connection.execute(self.table.insert(), parameters)
+                report["inserted"] += len(prepared)
+                return
+            except Exception:
+                connection.rollback()
+
+        # A constraint failed inside the chunk: insert its rows one by one to isolate the bad ones
+        with self.engine.begin() as connection:
+            for index, values in prepared:
+                try:
+                    connection.execute(self.table.insert(), values)
+                    report["inserted"] += 1
+                except Exception as e:
+                    report["errors"].append({"row": index, "error": str(getattr(e, "orig", e))})
+
+    def run(self, rows: Iterable[Dict]) -> Dict:
+        """
+        Import all rows.
+
+        Returns:
+            {'inserted', 'failed', 'errors': [{'row': index in the input, 'error'}], 'seconds', 'rows_per_second'}
+        """
+        report = {"inserted": 0, "errors": []}
+        started = time.perf_counter()
+        numbered = enumerate(rows)
+        while True:
+            chunk = list(islice(numbered, self.chunk_size))
+            if not chunk:
+                break
+            self._insert_chunk(chunk, report)
+        seconds = time.perf_counter() - started
+        report["errors"].sort(key=lambda error: error["row"])
+        report["failed"] = len(report["errors"])
+        report["seconds"] = round(seconds, 3)
+        report["rows_per_second"] = round((report["inserted"] + report["failed"]) / seconds) if seconds else 0
+        return report
+
+
+def read_records(path: Path) -> Iterator[Dict]:
+    """Stream records from a .jsonl/.ndjson, .json (list) or .csv file."""
+    suffix = path.suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+    elif suffix == ".csv":
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for record in csv.DictReader(f):
+                # Empty CSV cells are missing values
+                yield {key: value for key, value in record.items() if value != ""}
+    else:
+        raise ValueError(f"Unsupported file type: {path.suffix}")
+
+
+if __name__ == "__main__":
+    from database import db_manager
+
+    parser = argparse.ArgumentParser(description="Import en masse de dossiers (migration depuis un autre logiciel)")
+    parser.add_argument("kind", choices=["patients", "visits", "medications", "test_results"])
+    parser.add_argument("path", type=Path, help="Fichier .jsonl, .json ou .csv")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args()
+
+    importers = {
+        "patients": db_manager.bulk_create_patients,
+        "visits": db_manager.bulk_create_visits,
+        "medications": db_manager.bulk_add_medications,
+        "test_results": db_manager.bulk_add_test_results,
+    }
+    print(f"📥 Import de {args.path}...")
+    result = importers[args.kind](read_records(args.path), chunk_size=args.chunk_size)
+    print(f"✅ {result['inserted']} lignes importées en {result['seconds']}s ({result['rows_per_second']} lignes/s)")
+    if result["errors"]:
+        print(f"⚠️  {result['failed']} lignes rejetées:")
+        for error in result["errors"][:20]:
+            print(f"   ligne {error['row'] + 1}: {error['error']}")
+        if result["failed"] > 20:
+            print(f"   ... et {result['failed'] - 20} autres")
+    if args.kind == "visits" and result["inserted"]:
+        print("ℹ️  Lancez `python -m services.index_sync` pour indexer les nouvelles consultations")
@@ -1,10 +1,23 @@
 """Database manager for SQLite operations."""
-from sqlalchemy import create_engine
+from sqlalchemy import func, select
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
-from typing import Generator
+from datetime import datetime
+from typing import Generator, Dict, Iterable, Iterator, List, Optional, Union
 import config
-from database.schema import Base, Patient, Visit, Medication, TestResult, PatternAnalysis
+from database.schema import Base, Patient, Visit, Medication, TestResult, LabValue, PatternAnalysis, VectorSyncState
+from database.fts import create_fts, rebuild_fts, search_fts
+from database.migrations import upgrade_schema
+from database.engine import create_sqlite_engine
+from database.queries import (
+    patient_list_statement, patient_page_statement, visit_page_statement, split_page, visit_text_sizes_statement,
+    patient_statement, all_patients_statement, patient_visits_statement, visit_statement,
+    patient_medications_statement, patient_test_results_statement, PATIENT_PAGE_CURSOR
+)
+from database.read_models import ReadModel, PatientRecord, VisitRecord, MedicationRecord, TestResultRecord
+from database.bulk_import import BulkImporter
+from database.query_cache import QueryCache, MISSING, invalidate_on_commit
+from database.lab_values import extract_lab_values, backfill_lab_values, lab_series, lab_analytes
 
 
 class DatabaseManager:
@@ -12,13 +25,33 @@ class DatabaseManager:
     
     def __init__(self, db_path: str = None):
         self.db_path = db_path or str(config.DATABASE_PATH)
-        self.engine = create_engine(f"sqlite:///{self.db_path}", echo=False)
+        self.engine = create_sqlite_engine(self.db_path)
         self.SessionLocal = sessionmaker(bind=self.engine)
+        # Read-through cache of the per-patient getters, invalidated by committed writes
+        self.query_cache = None
+        if config.QUERY_CACHE_SIZE > 0:
+            self.query_cache = QueryCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+            invalidate_on_commit(self.SessionLocal, self.query_cache)
         self._initialize_db()
     
     def _initialize_db(self):
         """Create all tables if they don't exist."""
         Base.metadata.create_all(self.engine)
+        # Existing installs: add columns and indexes declared after their tables were created
+        created = upgrade_schema(self.engine)
+        if created:
+            print(f"Upgraded database schema: {', '.join(created)}")
+        # Full-text index kept in sync with visits/medications/test_results by triggers
+        with self.engine.begin() as connection:
+            self.fts_enabled = create_fts(connection)
+        if not self.fts_enabled:
+            print("Warning: SQLite was built without FTS5, keyword search is disabled")
+        # Existing installs: extract the lab values of results stored before the lab_values table
+        with self.engine.begin() as connection:
+            if connection.execute(select(LabValue.id).limit(1)).first() is None:
+                extracted = backfill_lab_values(connection)
+                if extracted:
+                    print(f"Extracted {extracted} lab values from existing test results")
     
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
@@ -51,73 +84,88 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def get_patient(self, patient_id: int = None, patient_code: str = None) -> Patient:
+    def _records(self, record_class, statement) -> List[ReadModel]:
+        """Run a read-model SELECT and build its records (no ORM session involved)."""
+        with self.engine.connect() as connection:
+            return record_class.from_rows(connection.execute(statement))
+    
+    def _cached(self, key: tuple, tags: List[tuple], load):
+        """Return `load()` through the query cache; lists are copied so callers may modify them."""
+        if self.query_cache is None:
+            return load()
+        value = self.query_cache.get(key)
+        if value is MISSING:
+            generation = self.query_cache.generation
+            value = load()
+            self.query_cache.put(key, value, tags, generation)
+        return list(value) if isinstance(value, list) else value
+    
+    def get_cache_stats(self) -> Dict:
+        """Get the query cache size and hit/miss counters (empty when the cache is disabled)."""
+        return self.query_cache.get_stats() if self.query_cache else {}
+    
+    def clear_cache(self):
+        """Drop every cached read, e.g. after writing to the database outside this manager."""
+        if self.query_cache:
+            self.query_cache.clear()
+    
+    def get_patient(self, patient_id: int = None, patient_code: str = None) -> Optional[PatientRecord]:
         """Retrieve a patient by ID or patient code."""
-        session = self.SessionLocal()
-        try:
-            if patient_id:
-                patient = session.query(Patient).filter(Patient.id == patient_id).first()
-            elif patient_code:
-                patient = session.query(Patient).filter(Patient.patient_id == patient_code).first()
-            else:
-                return None
-            
-            if patient:
-                # Access all attributes while session is open
-                _ = patient.id, patient.patient_id, patient.first_name, patient.last_name
-                session.expunge(patient)
-            
-            return patient
-        finally:
-            session.close()
+        statement = patient_statement(patient_id, patient_code)
+        if statement is None:
+            return None
+        
+        def load():
+            patients = self._records(PatientRecord, statement)
+            return patients[0] if patients else None
+        
+        tags = [("patient", patient_id)] if patient_id else [("patient_code", patient_code)]
+        return self._cached(("patient", patient_id, patient_code), tags, load)
     
-    def get_patient_visits(self, patient_id: int, limit: int = None) -> list:
-        """Get all visits for a patient, ordered by date."""
-        session = self.SessionLocal()
-        try:
-            query = session.query(Visit).filter(Visit.patient_id == patient_id).order_by(Visit.visit_date.desc())
-            if limit:
-                query = query.limit(limit)
-            visits = query.all()
-            # Expunge all visits
-            for visit in visits:
-                _ = visit.id, visit.patient_id, visit.visit_date
-                session.expunge(visit)
-            return visits
-        finally:
-            session.close()
+    def get_patient_visits(self, patient_id: int, limit: int = None,
+                           load_text: Union[bool, Iterable[str]] = False) -> List[VisitRecord]:
+        """
+        Get all visits for a patient, ordered by date.
+        
+        The free-text columns ('transcription', 'summary', 'cleaned_summary', 'notes')
+        are not loaded by default; reading one raises AttributeError.
+        
+        Args:
+            patient_id: Patient database ID
+            limit: Maximum number of visits (most recent first)
+            load_text: True to load every text column, or the names of those to load
+        """
+        if not isinstance(load_text, bool):
+            load_text = tuple(load_text)
+        return self._cached(
+            ("visits", patient_id, limit, load_text), [("visits", patient_id)],
+            lambda: self._records(VisitRecord, patient_visits_statement(patient_id, limit, load_text))
+        )
     
-    def get_patient_medications(self, patient_id: int, active_only: bool = True) -> list:
+    def get_visit_text_sizes(self, patient_id: int) -> List[tuple]:
+        """
+        Get (visit id, length of each text column, content hash) for a patient's visits, in id order.
+        
+        A cheap fingerprint of the patient's visit text, e.g. to tell whether an index
+        built from it is still current without transferring the text: the hash also
+        catches edits that keep every length ("5 mg" -> "7 mg").
+        """
+        with self.get_session() as session:
+            return [tuple(row) for row in session.execute(visit_text_sizes_statement(patient_id)).all()]
+    
+    def get_patient_medications(self, patient_id: int, active_only: bool = True) -> List[MedicationRecord]:
         """Get medications for a patient."""
-        session = self.SessionLocal()
-        try:
-            query = session.query(Medication).filter(Medication.patient_id == patient_id)
-            if active_only:
-                query = query.filter(Medication.is_active == True)
-            medications = query.order_by(Medication.start_date.desc()).all()
-            # Expunge all medications
-            for med in medications:
-                _ = med.id, med.medication_name, med.dosage
-                session.expunge(med)
-            return medications
-        finally:
-            session.close()
+        return self._cached(
+            ("medications", patient_id, active_only), [("medications", patient_id)],
+            lambda: self._records(MedicationRecord, patient_medications_statement(patient_id, active_only))
+        )
     
-    def get_patient_test_results(self, patient_id: int, test_type: str = None) -> list:
+    def get_patient_test_results(self, patient_id: int, test_type: str = None) -> List[TestResultRecord]:
         """Get test results for a patient."""
-        session = self.SessionLocal()
-        try:
-            query = session.query(TestResult).filter(TestResult.patient_id == patient_id)
-            if test_type:
-                query = query.filter(TestResult.test_type == test_type)
-            test_results = query.order_by(TestResult.test_date.desc()).all()
-            # Expunge all test results
-            for test in test_results:
-                _ = test.id, test.test_name, test.test_type
-                session.expunge(test)
-            return test_results
-        finally:
-            session.close()
+        return self._cached(
+            ("test_results", patient_id, test_type), [("test_results", patient_id)],
+            lambda: self._records(TestResultRecord, patient_test_results_statement(patient_id, test_type))
+        )
     
     def create_visit(self, visit_data: dict) -> Visit:
         """Create a new visit record."""
@@ -146,18 +194,10 @@ class DatabaseManager:
                     setattr(visit, key, value)
                 session.flush()
     
-    def get_visit(self, visit_id: int) -> Visit:
+    def get_visit(self, visit_id: int) -> Optional[VisitRecord]:
         """Get a visit by ID."""
-        session = self.SessionLocal()
-        try:
-            visit = session.query(Visit).filter(Visit.id == visit_id).first()
-            if visit:
-                # Access key attributes while session is open
-                _ = visit.id, visit.patient_id, visit.visit_date
-                session.expunge(visit)
-            return visit
-        finally:
-            session.close()
+        visits = self._records(VisitRecord, visit_statement(visit_id))
+        return visits[0] if visits else None
     
     def add_medication(self, medication_data: dict) -> Medication:
         """Add a medication record."""
@@ -177,18 +217,98 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def get_all_patients(self) -> list:
+    def get_all_patients(self) -> List[PatientRecord]:
         """Get all patients."""
-        session = self.SessionLocal()
-        try:
-            patients = session.query(Patient).all()
-            # Expunge all patients and access their attributes
-            for patient in patients:
-                _ = patient.id, patient.patient_id, patient.first_name, patient.last_name, patient.date_of_birth, patient.phone
-                session.expunge(patient)
-            return patients
-        finally:
-            session.close()
+        return self._records(PatientRecord, all_patients_statement())
+    
+    def count_patients(self) -> int:
+        """Get the number of patients."""
+        with self.get_session() as session:
+            return session.query(func.count(Patient.id)).scalar()
+    
+    def get_patient_list(
+        self,
+        sort_by: str = "last_visit",
+        descending: bool = True,
+        limit: int = None,
+        offset: int = 0
+    ) -> List[Dict]:
+        """
+        Get patient list rows with their activity summary in a single query.
+        
+        Args:
+            sort_by: 'last_visit', 'name', 'created_at', 'visit_count' or 'last_test'
+            descending: Sort order (patients without the sorted value come last)
+            limit: Maximum number of rows
+            offset: Rows to skip
+        
+        Returns:
+            Dictionaries with the patient columns shown in lists ('id', 'patient_id',
+            'first_name', 'last_name', 'date_of_birth', 'phone', 'created_at') plus
+            'visit_count', 'last_visit_date', 'active_medication_count' and 'last_test_date'
+        """
+        with self.get_session() as session:
+            rows = session.execute(patient_list_statement(sort_by, descending, limit, offset)).all()
+            return [row._asdict() for row in rows]
+    
+    def list_patients(
+        self,
+        search: str = None,
+        last_visit_from: datetime = None,
+        last_visit_to: datetime = None,
+        limit: int = 50,
+        cursor: tuple = None
+    ) -> Dict:
+        """
+        Get one page of patients in name order, filtered in the database.
+        
+        Pages are read with a keyset cursor instead of OFFSET, so every page
+        costs the same whatever the clinic size.
+        
+        Args:
+            search: Words that must each start the last name, first name or patient code
+                (case- and accent-insensitive, "dup jea" finds Jean Dupont, "elo" Élodie)
+            last_visit_from: Only patients whose last visit is on or after this date
+            last_visit_to: Only patients whose last visit is on or before this date
+            limit: Page size
+            cursor: 'next_cursor' of the previous page (None for the first page)
+        
+        Returns:
+            {'items': [{'id', 'patient_id', 'first_name', 'last_name', 'date_of_birth',
+            'last_visit_date', 'last_name_key', 'first_name_key'}], 'next_cursor': cursor of the
+            next page or None}
+        """
+        statement = patient_page_statement(search, last_visit_from, last_visit_to, limit, cursor)
+        with self.get_session() as session:
+            return split_page(session.execute(statement).all(), limit, PATIENT_PAGE_CURSOR)
+    
+    def list_visits(
+        self,
+        patient_id: int = None,
+        date_from: datetime = None,
+        date_to: datetime = None,
+        visit_type: str = None,
+        limit: int = 50,
+        cursor: tuple = None
+    ) -> Dict:
+        """
+        Get one page of visits, newest first, with keyset pagination.
+        
+        Args:
+            patient_id: Optional filter by patient
+            date_from: Only visits on or after this date
+            date_to: Only visits on or before this date
+            visit_type: Optional filter by visit type
+            limit: Page size
+            cursor: 'next_cursor' of the previous page (None for the first page)
+        
+        Returns:
+            {'items': [{'id', 'patient_id', 'visit_date', 'visit_type', 'chief_complaint',
+            'diagnosis'}], 'next_cursor': cursor of the next page or None}
+        """
+        statement = visit_page_statement(patient_id, date_from, date_to, visit_type, limit, cursor)
+        with self.get_session() as session:
+            return split_page(session.execute(statement).all(), limit, ("visit_date", "id"))
     
     def add_test_result(self, test_data: dict) -> TestResult:
         """Add a test result."""
@@ -196,6 +316,12 @@ class DatabaseManager:
         try:
             test_result = TestResult(**test_data)
             session.add(test_result)
+            session.flush()
+            # Lab values are written in the same transaction as their test result
+            session.add_all(LabValue(**row) for row in extract_lab_values(
+                test_result.results_data, test_result.patient_id, test_result.id,
+                test_result.test_name, test_result.test_date
+            ))
             session.commit()
             session.refresh(test_result)
             # Access key attributes while session is open
@@ -208,7 +334,174 @@ class DatabaseManager:
         finally:
             session.close()
 
+    
+    def _bulk_insert(self, model, rows: Iterable[Dict], chunk_size: int = None) -> Dict:
+        try:
+            return BulkImporter(self.engine, model, chunk_size or config.BULK_IMPORT_CHUNK_SIZE).run(rows)
+        finally:
+            # Core inserts bypass the session events that invalidate the cache
+            self.clear_cache()
+    
+    def bulk_create_patients(self, rows: Iterable[Dict], chunk_size: int = None) -> Dict:
+        """
+        Insert many patients (dicts with Patient columns) in chunked transactions.
+        
+        Args:
+            rows: Iterable or stream of patient dicts; dates may be ISO strings
+            chunk_size: Rows per transaction (default: config.BULK_IMPORT_CHUNK_SIZE)
+        
+        Returns:
+            Report with 'inserted', 'failed', 'errors' ([{'row': position in rows, 'error'}]),
+            'seconds' and 'rows_per_second'. Invalid rows and existing patient codes are
+            reported without stopping the import.
+        """
+        return self._bulk_insert(Patient, rows, chunk_size)
+    
+    def bulk_create_visits(self, rows: Iterable[Dict], chunk_size: int = None) -> Dict:
+        """
+        Insert many visits; same report as bulk_create_patients.
+        
+        The patient is given by 'patient_id' (integer key) or by its code ('patient_code',
+        or a string 'patient_id'). Imported visits reach the vector store at the next
+        IndexSync.sync().
+        """
+        return self._bulk_insert(Visit, rows, chunk_size)
+    
+    def bulk_add_medications(self, rows: Iterable[Dict], chunk_size: int = None) -> Dict:
+        """Insert many medications; patients are referenced as in bulk_create_visits."""
+        return self._bulk_insert(Medication, rows, chunk_size)
+    
+    def bulk_add_test_results(self, rows: Iterable[Dict], chunk_size: int = None) -> Dict:
+        """
+        Insert many test results; patients are referenced as in bulk_create_visits.
+        
+        Their lab values are extracted once the import is done; the report
+        gains 'lab_values', the number of values extracted.
+        """
+        with self.engine.connect() as connection:
+            previous_max = connection.execute(select(func.max(TestResult.id))).scalar() or 0
+        report = self._bulk_insert(TestResult, rows, chunk_size)
+        with self.engine.begin() as connection:
+            report["lab_values"] = backfill_lab_values(connection, min_test_result_id=previous_max + 1)
+        return report
+    
+    def backfill_lab_values(self) -> int:
+        """Extract the lab values of test results that have none yet; returns the number inserted."""
+        with self.engine.begin() as connection:
+            return backfill_lab_values(connection)
+    
+    def get_lab_series(
+        self,
+        patient_id: int,
+        analytes: Optional[Iterable[str]] = None,
+        start: datetime = None,
+        end: datetime = None
+    ) -> Dict[str, Dict]:
+        """
+        Get a patient's lab values as time series, one per analyte.
+        
+        Args:
+            patient_id: Patient database ID
+            analytes: Analyte names to return (default: all)
+            start: Earliest measurement date (inclusive)
+            end: Latest measurement date (inclusive)
+        
+        Returns:
+            {analyte: {'dates': datetime64 array, 'values', 'ref_low', 'ref_high': float64
+            arrays (NaN when missing or non-numeric), 'flags': array of 'low'/'high'/'normal'/'',
+            'unit': str}}, measurements in date order
+        """
+        with self.engine.connect() as connection:
+            return lab_series(connection, patient_id, analytes, start, end)
+    
+    def get_lab_analytes(self, patient_id: int) -> List[Dict]:
+        """Get the analytes measured for a patient: [{'analyte', 'count', 'last_measured_at'}]."""
+        with self.engine.connect() as connection:
+            return lab_analytes(connection, patient_id)
+    
+    def iter_visits_for_indexing(self, visit_ids: List[int] = None, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream the indexed fields of visits (all by default), without loading ORM objects."""
+        session = self.SessionLocal()
+        try:
+            query = session.query(
+                Visit.id, Visit.patient_id, Visit.visit_date, Visit.visit_type,
+                Visit.transcription, Visit.summary, Visit.topics_discussed,
+                Visit.diagnosis, Visit.recommendations
+            )
+            if visit_ids is not None:
+                query = query.filter(Visit.id.in_(visit_ids))
+            query = query.order_by(Visit.id).yield_per(batch_size)
+            for row in query:
+                yield row._asdict()
+        finally:
+            session.close()
+    
+    def get_vector_sync_state(self) -> Dict[int, str]:
+        """Get visit_id -> content hash of what the vector store currently holds."""
+        with self.get_session() as session:
+            return dict(session.query(VectorSyncState.visit_id, VectorSyncState.content_hash).all())
+    
+    def save_vector_sync_state(self, states: List[Dict]):
+        """Record visits ({'visit_id', 'patient_id', 'content_hash'}) as synced."""
+        with self.get_session() as session:
+            for state in states:
+                session.merge(VectorSyncState(**state))
+    
+    def get_vector_sync_rows(self) -> List[Dict]:
+        """Get the full sync state ({'visit_id', 'patient_id', 'content_hash'} rows)."""
+        with self.get_session() as session:
+            rows = session.query(VectorSyncState.visit_id, VectorSyncState.patient_id, VectorSyncState.content_hash).all()
+            return [row._asdict() for row in rows]
+    
+    def replace_vector_sync_state(self, states: List[Dict]):
+        """Replace the whole sync state, e.g. after restoring a vector store snapshot."""
+        with self.get_session() as session:
+            session.query(VectorSyncState).delete(synchronize_session=False)
+            session.bulk_insert_mappings(VectorSyncState, states)
+    
+    def delete_vector_sync_state(self, visit_ids: List[int]):
+        """Forget the sync state of visits removed from the vector store."""
+        if not visit_ids:
+            return
+        with self.get_session() as session:
+            session.query(VectorSyncState).filter(
+                VectorSyncState.visit_id.in_(visit_ids)
+            ).delete(synchronize_session=False)
+
+    
+    def search_text(
+        self,
+        query: str,
+        patient_id: Optional[int] = None,
+        sources: Optional[List[str]] = None,
+        limit: int = 20,
+        prefix: bool = True
+    ) -> List[Dict]:
+        """
+        Keyword search over visits, medications and test results.
+        
+        Args:
+            query: Words to find (all must match); "quoted text" is matched as a phrase
+            patient_id: Optional filter by patient
+            sources: Optional subset of 'visit', 'medication', 'test_result'
+            limit: Maximum number of results
+            prefix: Match words by prefix ('metfor' finds 'metformine')
+        
+        Returns:
+            Results ordered by BM25 relevance with 'source', 'source_id', 'patient_id',
+            'date', 'title', 'snippet' (matches in **bold**) and 'score'
+        """
+        if not self.fts_enabled:
+            return []
+        with self.engine.connect() as connection:
+            return search_fts(connection, query, patient_id=patient_id, sources=sources, limit=limit, prefix=prefix)
+    
+    def rebuild_text_index(self):
+        """Re-index all records for keyword search (e.g. after bulk edits made with triggers disabled)."""
+        if self.fts_enabled:
+            with self.engine.begin() as connection:
+                rebuild_fts(connection)
+
 
 # Global instance
 db_manager = DatabaseManager()
-
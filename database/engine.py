@@ -0,0 +1,102 @@
+"""SQLite engine setup shared by the sync and async database managers."""
+import asyncio
+import hashlib
+import weakref
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+import config
+
+# event loop -> {db_path: AsyncEngine}; pooled aiosqlite connections must stay on the loop that opened them
+_async_engines = weakref.WeakKeyDictionary()
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """
+    Tune every new SQLite connection.
+
+    WAL lets readers run while a writer commits (rollback journaling blocks
+    them); synchronous=NORMAL is durable in WAL mode except for the last
+    transactions on power loss; busy_timeout makes writers wait for the lock
+    instead of failing with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}")
+        # Negative cache_size is in KiB
+        cursor.execute(f"PRAGMA cache_size={-int(config.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def content_hash(*values) -> int:
+    """64-bit hash of text values (NULL and '' differ), as the SQL function content_hash(...)."""
+    digest = hashlib.blake2b(digest_size=8)
+    for value in values:
+        digest.update(b"\x00" if value is None else b"\x01" + str(value).encode("utf-8") + b"\x1f")
+    return int.from_bytes(digest.digest(), "big", signed=True)
+
+
+def register_sqlite_functions(dbapi_connection, connection_record=None):
+    """Register the SQL functions the queries use on every new connection."""
+    dbapi_connection.create_function("content_hash", -1, content_hash, deterministic=True)
+
+
+def create_sqlite_engine(db_path: str):
+    """Create the pooled, tuned engine used by DatabaseManager."""
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        echo=False,
+        # Streamlit runs each session in its own thread: pooled connections move between threads
+        connect_args={"check_same_thread": False, "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        poolclass=QueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT
+    )
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(engine, "connect", register_sqlite_functions)
+    return engine
+
+
+def create_async_sqlite_engine(db_path: str):
+    """Create an aiosqlite engine with the same pragmas and pool sizing as the sync engine."""
+    # Imported here: sqlalchemy.ext.asyncio needs greenlet, which the sync app does not
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        echo=False,
+        connect_args={"timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT
+    )
+    event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+    event.listen(engine.sync_engine, "connect", register_sqlite_functions)
+    return engine
+
+
+def get_async_engine(db_path: str = None):
+    """
+    Get the shared async engine for a database on the running event loop.
+
+    One engine (and connection pool) per loop and database file: callers on the
+    same loop share connections, and a new loop (e.g. each `asyncio.run`) never
+    reuses connections bound to a closed one.
+    """
+    db_path = db_path or str(config.DATABASE_PATH)
+    engines = _async_engines.setdefault(asyncio.get_running_loop(), {})
+    if db_path not in engines:
+        engines[db_path] = create_async_sqlite_engine(db_path)
+    return engines[db_path]
+
+
+async def dispose_async_engines():
+    """Close the pooled connections of the shared async engines on the running loop."""
+    engines = _async_engines.pop(asyncio.get_running_loop(), {})
+    for engine in engines.values():
+        await engine.dispose()
@@ -0,0 +1,174 @@
+"""SQLite FTS5 full-text index over visits, medications and test results."""
+import re
+from typing import List, Optional
+
+# One FTS row per source row. The FTS rowid encodes the source row
+# (source_id * FTS_SOURCES + code) so triggers delete by rowid, not by scanning.
+# patient_key holds an indexed token ('p42') so that patient-scoped searches
+# intersect posting lists instead of filtering every match afterwards.
+FTS_TABLE = "search_index"
+FTS_SOURCES = 4
+SOURCE_CODES = {"visit": 1, "medication": 2, "test_result": 3}
+
+# title: short high-signal fields (weighted higher by bm25), body: long free text
+SOURCE_QUERIES = {
+    "visit": {
+        "table": "visits",
+        "title": "coalesce({r}.chief_complaint, '') || ' ' || coalesce({r}.diagnosis, '')",
+        "body": "coalesce({r}.summary, '') || ' ' || coalesce({r}.cleaned_summary, '') || ' ' || "
+                "coalesce({r}.recommendations, '') || ' ' || coalesce({r}.notes, '') || ' ' || "
+                "coalesce({r}.transcription, '')",
+        "date": "{r}.visit_date",
+    },
+    "medication": {
+        "table": "medications",
+        "title": "{r}.medication_name",
+        "body": "coalesce({r}.dosage, '') || ' ' || coalesce({r}.frequency, '') || ' ' || coalesce({r}.notes, '')",
+        "date": "{r}.start_date",
+    },
+    "test_result": {
+        "table": "test_results",
+        "title": "{r}.test_name || ' ' || coalesce({r}.test_type, '')",
+        "body": "coalesce({r}.interpretation, '') || ' ' || coalesce({r}.notes, '') || ' ' || "
+                "coalesce(CAST({r}.results_data AS TEXT), '')",
+        "date": "{r}.test_date",
+    },
+}
+
+
+def _row_values(source: str, alias: str) -> str:
+    spec = SOURCE_QUERIES[source]
+    return ", ".join([
+        f"{alias}.id * {FTS_SOURCES} + {SOURCE_CODES[source]}",
+        f"'{source}'",
+        f"{alias}.id",
+        f"{alias}.patient_id",
+        spec["date"].format(r=alias),
+        f"'p' || {alias}.patient_id",
+        spec["title"].format(r=alias),
+        spec["body"].format(r=alias),
+    ])
+
+
+def fts_available(connection) -> bool:
+    """Check that the SQLite library was compiled with FTS5."""
+    options = [row[0] for row in connection.exec_driver_sql("PRAGMA compile_options").fetchall()]
+    return "ENABLE_FTS5" in options
+
+
+def create_fts(connection) -> bool:
+    """
+    Create the FTS table and its sync triggers if missing, indexing existing rows on creation.
+
+    Returns:
+        True when the index is available
+    """
+    if not fts_available(connection):
+        return False
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+    if not exists:
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "source UNINDEXED, source_id UNINDEXED, patient_id UNINDEXED, date UNINDEXED, patient_key, title, body, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    for source, spec in SOURCE_QUERIES.items():
+        table = spec["table"]
+        insert = (f"INSERT INTO {FTS_TABLE} (rowid, source, source_id, patient_id, date, patient_key, title, body) "
+                  f"VALUES ({_row_values(source, 'new')})")
+        delete = f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id * {FTS_SOURCES} + {SOURCE_CODES[source]}"
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN {insert}; END"
+        )
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN {delete}; END"
+        )
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN {delete}; {insert}; END"
+        )
+
+    if not exists:
+        rebuild_fts(connection)
+    return True
+
+
+def rebuild_fts(connection):
+    """Re-index every visit, medication and test result from scratch."""
+    connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+    for source, spec in SOURCE_QUERIES.items():
+        connection.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE} (rowid, source, source_id, patient_id, date, patient_key, title, body) "
+            f"SELECT {_row_values(source, 'r')} FROM {spec['table']} AS r"
+        )
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def build_match_query(text: str, prefix: bool = True) -> Optional[str]:
+    """
+    Turn user input into a safe FTS5 MATCH expression.
+
+    "Quoted text" stays a phrase; other words are ANDed, each as a prefix
+    query when `prefix` is set (so 'metfor' finds 'metformine'). FTS5
+    operators typed by the user are treated as plain words.
+
+    Returns:
+        The MATCH expression, or None when the input has no searchable term
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if phrase:
+            tokens = re.findall(r"\w+", phrase)
+            if tokens:
+                terms.append('"' + " ".join(tokens) + '"')
+            continue
+        tokens = re.findall(r"\w+", word)
+        if not tokens:
+            continue
+        # "E11.9" or "T4-libre" become the phrase of their parts
+        term = '"' + " ".join(tokens) + '"'
+        terms.append(term + "*" if prefix else term)
+    return " ".join(terms) if terms else None
+
+
+def search_fts(connection, text: str, patient_id: Optional[int] = None, sources: Optional[List[str]] = None,
+               limit: int = 20, prefix: bool = True) -> List[dict]:
+    """Run a ranked full-text query; see DatabaseManager.search_text."""
+    match = build_match_query(text, prefix)
+    if not match:
+        return []
+    match = f"{{title body}} : ({match})"
+    if patient_id is not None:
+        match += f" AND patient_key : p{int(patient_id)}"
+
+    sql = (f"SELECT source, source_id, patient_id, date, "
+           f"snippet({FTS_TABLE}, 6, '**', '**', '…', 16) AS body_snippet, "
+           f"snippet({FTS_TABLE}, 5, '**', '**', '…', 12) AS title_snippet, "
+           f"bm25({FTS_TABLE}, 0, 0, 0, 0, 0, 4.0, 1.0) AS bm25_score "
+           f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?")
+    params = [match]
+    if sources:
+        sql += f" AND source IN ({','.join('?' * len(sources))})"
+        params.extend(sources)
+    sql += " ORDER BY bm25_score LIMIT ?"
+    params.append(limit)
+
+    results = []
+    for source, source_id, row_patient_id, date, body_snippet, title_snippet, score in \
+            connection.exec_driver_sql(sql, tuple(params)).fetchall():
+        # Show the field where the terms matched
+        body_snippet, title_snippet = body_snippet.strip(), title_snippet.strip()
+        snippet = body_snippet if "**" in body_snippet or "**" not in title_snippet else title_snippet
+        results.append({
+            "source": source,
+            "source_id": source_id,
+            "patient_id": row_patient_id,
+            "date": date,
+            "title": title_snippet,
+            "snippet": snippet or title_snippet,
+            "score": -score
+        })
+    return results
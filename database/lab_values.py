@@ -0,0 +1,158 @@
+"""Normalized lab values: extraction from TestResult.results_data and NumPy trend series."""
+import re
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from sqlalchemy import func, select
+from database.schema import LabValue, TestResult
+
+FLAG_ALIASES = {
+    "h": "high", "high": "high", "haut": "high", "élevé": "high", "eleve": "high",
+    "l": "low", "low": "low", "bas": "low",
+    "n": "normal", "normal": "normal",
+}
+# Leading number only: censored results ("< 5") stay non-numeric, units may follow ("6,1 %")
+NUMBER = re.compile(r"\s*([-+]?\d+(?:[.,]\d+)?)")
+
+
+def _to_float(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = NUMBER.match(value)
+        if match:
+            return float(match.group(1).replace(",", "."))
+    return None
+
+
+def extract_lab_values(results_data, patient_id: int, test_result_id: int, test_name: str,
+                       measured_at: datetime) -> List[Dict]:
+    """
+    Turn a lab report's JSON into lab_values rows.
+
+    Values are read from 'values' (parser output) or 'results' (normalized
+    reports), either as plain numbers or as {'value', 'unit', 'flag'} dicts;
+    units and ranges come from 'reference_ranges' ({'min', 'max', 'unit'}).
+    The flag is the reported one when present, otherwise computed from the range.
+
+    Returns:
+        Row dictionaries for the LabValue table (empty for non-lab results such as DICOM)
+    """
+    if not isinstance(results_data, dict):
+        return []
+    values = results_data.get("values") or results_data.get("results")
+    if not isinstance(values, dict):
+        return []
+    ranges = results_data.get("reference_ranges") or {}
+
+    rows = []
+    for analyte, reported in values.items():
+        reported_flag = unit = None
+        if isinstance(reported, dict):
+            unit = reported.get("unit")
+            reported_flag = reported.get("flag")
+            reported = reported.get("value")
+        if reported is None:
+            continue
+        reference = ranges.get(analyte) if isinstance(ranges, dict) else None
+        reference = reference if isinstance(reference, dict) else {}
+        value = _to_float(reported)
+        ref_low, ref_high = _to_float(reference.get("min")), _to_float(reference.get("max"))
+
+        flag = FLAG_ALIASES.get(str(reported_flag).strip().lower()) if reported_flag else None
+        if flag is None and value is not None and (ref_low is not None or ref_high is not None):
+            if ref_low is not None and value < ref_low:
+                flag = "low"
+            elif ref_high is not None and value > ref_high:
+                flag = "high"
+            else:
+                flag = "normal"
+
+        rows.append({
+            "patient_id": patient_id,
+            "test_result_id": test_result_id,
+            "test_name": test_name,
+            "analyte": str(analyte)[:200],
+            "value": value,
+            "value_text": str(reported)[:200],
+            "unit": (unit or reference.get("unit") or None),
+            "ref_low": ref_low,
+            "ref_high": ref_high,
+            "flag": flag,
+            "measured_at": measured_at,
+        })
+    return rows
+
+
+def backfill_lab_values(connection, min_test_result_id: int = None, batch_size: int = 1000) -> int:
+    """
+    Extract the lab values of test results that have none yet.
+
+    Idempotent: results that already have lab values are skipped, so it can
+    run at startup and after bulk imports (`min_test_result_id` limits it to
+    newly imported results).
+
+    Returns:
+        Number of lab values inserted
+    """
+    has_values = select(LabValue.id).where(LabValue.test_result_id == TestResult.id).exists()
+    statement = select(
+        TestResult.id, TestResult.patient_id, TestResult.test_name, TestResult.test_date, TestResult.results_data
+    ).where(~has_values).order_by(TestResult.id)
+    if min_test_result_id is not None:
+        statement = statement.where(TestResult.id >= min_test_result_id)
+
+    # Rows are fetched before inserting: SQLite cursors must not see the table change under them
+    pending = connection.execute(statement).all()
+    inserted = 0
+    for start in range(0, len(pending), batch_size):
+        rows = []
+        for test_id, patient_id, test_name, test_date, results_data in pending[start:start + batch_size]:
+            rows.extend(extract_lab_values(results_data, patient_id, test_id, test_name, test_date))
+        if rows:
+            connection.execute(LabValue.__table__.insert(), rows)
+            inserted += len(rows)
+    return inserted
+
+
+def lab_series(connection, patient_id: int, analytes: Optional[Iterable[str]] = None,
+               start: datetime = None, end: datetime = None) -> Dict[str, Dict]:
+    """Query a patient's lab values as NumPy arrays per analyte; see DatabaseManager.get_lab_series."""
+    statement = select(
+        LabValue.analyte, LabValue.measured_at, LabValue.value, LabValue.ref_low, LabValue.ref_high,
+        LabValue.flag, LabValue.unit
+    ).where(LabValue.patient_id == patient_id)
+    if analytes is not None:
+        statement = statement.where(LabValue.analyte.in_(list(analytes)))
+    if start is not None:
+        statement = statement.where(LabValue.measured_at >= start)
+    if end is not None:
+        statement = statement.where(LabValue.measured_at <= end)
+    rows = connection.execute(statement.order_by(LabValue.analyte, LabValue.measured_at)).all()
+
+    series = {}
+    for analyte, group in groupby(rows, key=lambda row: row[0]):
+        _, dates, values, lows, highs, flags, units = zip(*group)
+        series[analyte] = {
+            "dates": np.array(dates, dtype="datetime64[s]"),
+            "values": np.array(values, dtype=np.float64),  # None (non-numeric result) becomes NaN
+            "ref_low": np.array(lows, dtype=np.float64),
+            "ref_high": np.array(highs, dtype=np.float64),
+            "flags": np.array([flag or "" for flag in flags], dtype=object),
+            "unit": next((unit for unit in reversed(units) if unit), ""),
+        }
+    return series
+
+
+def lab_analytes(connection, patient_id: int) -> List[Dict]:
+    """Analytes measured for a patient with their count and latest measurement date."""
+    rows = connection.execute(
+        select(LabValue.analyte, func.count(LabValue.id), func.max(LabValue.measured_at))
+        .where(LabValue.patient_id == patient_id)
+        .group_by(LabValue.analyte)
+        .order_by(LabValue.analyte)
+    ).all()
+    return [{"analyte": analyte, "count": count, "last_measured_at": last} for analyte, count, last in rows]
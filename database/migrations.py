@@ -0,0 +1,94 @@
+"""Startup migrations for existing databases."""
+from typing import List
+from sqlalchemy import bindparam, inspect, or_, select
+from database.schema import Base, Patient, search_key
+
+# Indexes replaced by later schema versions, dropped from existing databases
+OBSOLETE_INDEXES = (
+    "ix_patients_name", "ix_patients_last_name_lower", "ix_patients_first_name_lower", "ix_patients_code_lower"
+)
+
+
+def upgrade_schema(engine) -> List[str]:
+    """
+    Bring an existing database up to the declared schema.
+
+    `create_all` only creates missing tables, so installs created before a
+    column or an index was declared never get it. Adds the missing columns
+    (fills the patient search keys), drops replaced indexes and creates the
+    missing ones. Safe to run at every startup: existing objects are left
+    alone. When an index is added, ANALYZE refreshes the planner statistics
+    so SQLite starts using it right away; otherwise the cheap
+    `PRAGMA optimize` keeps them current.
+
+    Returns:
+        Names of the columns and indexes created
+    """
+    with engine.begin() as connection:
+        return upgrade_schema_on_connection(connection)
+
+
+def upgrade_schema_on_connection(connection) -> List[str]:
+    """Same as `upgrade_schema`, inside an open transaction (e.g. from `AsyncConnection.run_sync`)."""
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                # Declared columns added later are nullable, which ADD COLUMN requires
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+                created.append(f"{table.name}.{column.name}")
+
+    if "patients" in existing_tables:
+        backfill_search_keys(connection)
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        # From sqlite_master: the inspector skips expression indexes
+        existing_indexes = set(connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table.name,)
+        ).scalars())
+        for name in existing_indexes & set(OBSOLETE_INDEXES):
+            connection.exec_driver_sql(f'DROP INDEX "{name}"')
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+                created.append(index.name)
+
+    if created:
+        connection.exec_driver_sql("ANALYZE")
+    else:
+        connection.exec_driver_sql("PRAGMA optimize")
+
+    return created
+
+
+def backfill_search_keys(connection) -> int:
+    """Fill the search keys of patients written without them (before the columns existed, or by other tools)."""
+    table = Patient.__table__
+    rows = connection.execute(
+        select(table.c.id, table.c.last_name, table.c.first_name, table.c.patient_id).where(or_(
+            table.c.last_name_key.is_(None), table.c.first_name_key.is_(None), table.c.code_key.is_(None)
+        ))
+    ).all()
+    if rows:
+        connection.execute(
+            # updated_at set to itself: filling a derived column is not an edit of the patient
+            table.update().where(table.c.id == bindparam("row_id")).values(
+                last_name_key=bindparam("last"), first_name_key=bindparam("first"),
+                code_key=bindparam("code"), updated_at=table.c.updated_at
+            ),
+            [
+                {"row_id": row.id, "last": search_key(row.last_name), "first": search_key(row.first_name),
+                 "code": search_key(row.patient_id)}
+                for row in rows
+            ]
+        )
+    return len(rows)
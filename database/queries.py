@@ -0,0 +1,190 @@
+"""SQLAlchemy Core statements shared by the sync and async database managers."""
+from typing import Iterable, List, Union
+from sqlalchemy import func, select, tuple_
+from database.schema import Patient, Visit, Medication, TestResult, search_key
+from database.read_models import PatientRecord, VisitRecord, MedicationRecord, TestResultRecord
+
+# Free-text visit columns (a transcript alone is several kilobytes): visit listings skip them unless asked for
+VISIT_TEXT_COLUMNS = ("transcription", "summary", "cleaned_summary", "notes")
+
+
+def unloaded_visit_text(load_text: Union[bool, Iterable[str]] = False) -> List[str]:
+    """Visit text columns to leave out of a query: all but those requested (True requests all)."""
+    if load_text is True:
+        return []
+    wanted = set(load_text or ())
+    unknown = wanted - set(VISIT_TEXT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown visit text columns: {', '.join(sorted(unknown))}")
+    return [column for column in VISIT_TEXT_COLUMNS if column not in wanted]
+
+
+def patient_statement(patient_id: int = None, patient_code: str = None):
+    """One patient by database ID or patient code (None when neither is given)."""
+    if patient_id:
+        condition = Patient.id == patient_id
+    elif patient_code:
+        condition = Patient.patient_id == patient_code
+    else:
+        return None
+    return PatientRecord.select().where(condition).limit(1)
+
+
+def all_patients_statement():
+    return PatientRecord.select().order_by(Patient.id)
+
+
+def patient_visits_statement(patient_id: int, limit: int = None, load_text: Union[bool, Iterable[str]] = False):
+    """A patient's visits, newest first, without the text columns not requested."""
+    statement = VisitRecord.select(exclude=unloaded_visit_text(load_text)) \
+        .where(Visit.patient_id == patient_id).order_by(Visit.visit_date.desc())
+    return statement.limit(limit) if limit else statement
+
+
+def visit_statement(visit_id: int):
+    return VisitRecord.select().where(Visit.id == visit_id)
+
+
+def patient_medications_statement(patient_id: int, active_only: bool = True):
+    statement = MedicationRecord.select().where(Medication.patient_id == patient_id)
+    if active_only:
+        statement = statement.where(Medication.is_active == True)
+    return statement.order_by(Medication.start_date.desc())
+
+
+def patient_test_results_statement(patient_id: int, test_type: str = None):
+    statement = TestResultRecord.select().where(TestResult.patient_id == patient_id)
+    if test_type:
+        statement = statement.where(TestResult.test_type == test_type)
+    return statement.order_by(TestResult.test_date.desc())
+
+
+def visit_text_sizes_statement(patient_id: int):
+    """
+    Per-visit text lengths and content hash of a patient, computed in SQLite
+    without transferring the text (content_hash is registered by database.engine).
+    """
+    text_columns = [getattr(Visit, column) for column in VISIT_TEXT_COLUMNS]
+    text_columns += [Visit.chief_complaint, Visit.diagnosis, Visit.recommendations]
+    return select(
+        Visit.id, *[func.length(column) for column in text_columns], func.content_hash(*text_columns)
+    ).where(Visit.patient_id == patient_id).order_by(Visit.id)
+
+
+def patient_list_statement(sort_by: str = "last_visit", descending: bool = True, limit: int = None, offset: int = 0):
+    """Build the patient list query; see DatabaseManager.get_patient_list."""
+    # One grouped subquery per table keeps the joins one row per patient
+    visit_stats = select(
+        Visit.patient_id.label("patient_id"),
+        func.count(Visit.id).label("visit_count"),
+        func.max(Visit.visit_date).label("last_visit_date")
+    ).group_by(Visit.patient_id).subquery()
+    medication_stats = select(
+        Medication.patient_id.label("patient_id"),
+        func.count(Medication.id).label("active_medication_count")
+    ).where(Medication.is_active == True).group_by(Medication.patient_id).subquery()
+    test_stats = select(
+        TestResult.patient_id.label("patient_id"),
+        func.max(TestResult.test_date).label("last_test_date")
+    ).group_by(TestResult.patient_id).subquery()
+
+    visit_count = func.coalesce(visit_stats.c.visit_count, 0).label("visit_count")
+    active_medication_count = func.coalesce(medication_stats.c.active_medication_count, 0).label("active_medication_count")
+    statement = select(
+        Patient.id, Patient.patient_id, Patient.first_name, Patient.last_name,
+        Patient.date_of_birth, Patient.phone, Patient.created_at,
+        visit_count,
+        visit_stats.c.last_visit_date,
+        active_medication_count,
+        test_stats.c.last_test_date
+    ).outerjoin(visit_stats, visit_stats.c.patient_id == Patient.id) \
+     .outerjoin(medication_stats, medication_stats.c.patient_id == Patient.id) \
+     .outerjoin(test_stats, test_stats.c.patient_id == Patient.id)
+
+    sort_columns = {
+        "last_visit": [visit_stats.c.last_visit_date],
+        "name": [Patient.last_name_key, Patient.first_name_key],
+        "created_at": [Patient.created_at],
+        "visit_count": [visit_count],
+        "last_test": [test_stats.c.last_test_date],
+    }
+    if sort_by not in sort_columns:
+        raise ValueError(f"Unknown sort key: {sort_by}")
+    order = [(c.desc() if descending else c.asc()).nulls_last() for c in sort_columns[sort_by]]
+    statement = statement.order_by(*order, Patient.id)
+
+    if offset:
+        statement = statement.offset(offset)
+    if limit:
+        statement = statement.limit(limit)
+    return statement
+
+
+# Patient listing order and keyset cursor: the search keys, so "Émery" sorts with "Emery"
+PATIENT_PAGE_CURSOR = ("last_name_key", "first_name_key", "id")
+
+
+def _prefix_match(column, prefix: str):
+    """Prefix test written as a range, so the column's index is used."""
+    return (column >= prefix) & (column < prefix + "\U0010ffff")
+
+
+def patient_page_statement(search: str = None, last_visit_from=None, last_visit_to=None,
+                           limit: int = 50, cursor: tuple = None):
+    """
+    Build one page of the patient listing ordered by the search keys of (last_name, first_name), then id.
+
+    Fetches `limit + 1` rows so the caller can tell whether a next page exists.
+    See DatabaseManager.list_patients.
+    """
+    last_visit = select(func.max(Visit.visit_date)).where(Visit.patient_id == Patient.id) \
+        .correlate(Patient).scalar_subquery().label("last_visit_date")
+    statement = select(
+        Patient.id, Patient.patient_id, Patient.first_name, Patient.last_name,
+        Patient.date_of_birth, last_visit, Patient.last_name_key, Patient.first_name_key
+    )
+    # Every word must start the last name, first name or patient code ("dup jea" finds Jean Dupont,
+    # "elo" and "Élo" find Élodie), compared on the stored search keys
+    for word in search_key(search or "").split():
+        statement = statement.where(
+            _prefix_match(Patient.last_name_key, word) | _prefix_match(Patient.first_name_key, word) |
+            _prefix_match(Patient.code_key, word)
+        )
+    if last_visit_from is not None:
+        statement = statement.where(last_visit >= last_visit_from)
+    if last_visit_to is not None:
+        statement = statement.where(last_visit <= last_visit_to)
+    if cursor is not None:
+        statement = statement.where(tuple_(Patient.last_name_key, Patient.first_name_key, Patient.id) > tuple(cursor))
+    return statement.order_by(Patient.last_name_key, Patient.first_name_key, Patient.id).limit(limit + 1)
+
+
+def visit_page_statement(patient_id: int = None, date_from=None, date_to=None, visit_type: str = None,
+                         limit: int = 50, cursor: tuple = None):
+    """
+    Build one page of the visit listing, newest first, ordered by (visit_date, id) descending.
+
+    Fetches `limit + 1` rows; see DatabaseManager.list_visits.
+    """
+    statement = select(
+        Visit.id, Visit.patient_id, Visit.visit_date, Visit.visit_type,
+        Visit.chief_complaint, Visit.diagnosis
+    )
+    if patient_id is not None:
+        statement = statement.where(Visit.patient_id == patient_id)
+    if date_from is not None:
+        statement = statement.where(Visit.visit_date >= date_from)
+    if date_to is not None:
+        statement = statement.where(Visit.visit_date <= date_to)
+    if visit_type:
+        statement = statement.where(Visit.visit_type == visit_type)
+    if cursor is not None:
+        statement = statement.where(tuple_(Visit.visit_date, Visit.id) < tuple(cursor))
+    return statement.order_by(Visit.visit_date.desc(), Visit.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int, cursor_columns: tuple) -> dict:
+    """Turn the `limit + 1` rows of a page statement into {'items', 'next_cursor'}."""
+    items = [row._asdict() for row in rows[:limit]]
+    next_cursor = tuple(items[-1][column] for column in cursor_columns) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,156 @@
+"""Read-through cache of DatabaseManager reads, invalidated by committed writes."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+from sqlalchemy import event, inspect
+from database.schema import Patient, Visit, Medication, TestResult
+
+# Cached reads are tagged (kind, key); a committed write to a model drops its kind's tags
+MODEL_KINDS = {Patient: "patient", Visit: "visits", Medication: "medications", TestResult: "test_results"}
+MISSING = object()
+
+
+class QueryCache:
+    """
+    Bounded LRU of query results with a time-to-live, invalidated by tag.
+
+    Each entry carries tags such as ('visits', patient_id): a write to a
+    patient's visits only drops the entries built from them. The TTL bounds
+    staleness for writes this process cannot see (other processes, the
+    async manager). Cached values must be immutable, like the read models.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        """
+        Args:
+            max_entries: Results kept in memory
+            ttl_seconds: Age after which a result is read again from the database
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._keys_by_tag = {}  # tag -> keys of the entries carrying it
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        """Return the cached value, or MISSING when absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return MISSING
+
+    def put(self, key: Hashable, value, tags: Iterable[Tuple], generation: int = None):
+        """
+        Store a value, evicting the least recently used entries beyond the bound.
+
+        `generation` is the cache's generation read before the value was
+        queried: if an invalidation happened since, the value may predate a
+        write and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            tags = tuple(tags)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, tags, value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def invalidate(self, tags: Iterable[Tuple] = (), kinds: Iterable[str] = ()):
+        """Drop the entries carrying any of `tags`, or a tag of any of `kinds`."""
+        tags, kinds = set(tags), set(kinds)
+        with self._lock:
+            self.generation += 1
+            tags |= {tag for tag in self._keys_by_tag if tag[0] in kinds}
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def get_stats(self) -> Dict:
+        """Get cache size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+def _write_tags(instance):
+    """Tags of the cached reads a flushed Patient, Visit, Medication or TestResult affects."""
+    kind = MODEL_KINDS.get(type(instance))
+    if kind is None:
+        return []
+    # The previous value too: a record moved to another patient changes both
+    attribute = inspect(instance).attrs.patient_id
+    keys = {attribute.value, *attribute.history.deleted}
+    if kind == "patient":
+        return [("patient", instance.id)] + [("patient_code", code) for code in keys]
+    return [(kind, patient_id) for patient_id in keys]
+
+
+def invalidate_on_commit(session_factory: Callable, cache: QueryCache):
+    """
+    Invalidate `cache` when sessions from `session_factory` commit writes.
+
+    Tags are collected at flush time and applied after the commit, so a
+    rolled back transaction leaves the cache alone. ORM bulk UPDATE/DELETE
+    statements (`query(...).delete()`) do not say which patients they touch
+    and drop the whole kind.
+    """
+    @event.listens_for(session_factory, "after_flush")
+    def collect(session, flush_context):
+        pending = session.info.setdefault("query_cache_tags", set())
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            pending.update(_write_tags(instance))
+
+    def collect_bulk(context):
+        kind = MODEL_KINDS.get(context.mapper.class_)
+        if kind is not None:
+            context.session.info.setdefault("query_cache_kinds", set()).add(kind)
+
+    event.listen(session_factory, "after_bulk_update", collect_bulk)
+    event.listen(session_factory, "after_bulk_delete", collect_bulk)
+
+    @event.listens_for(session_factory, "after_commit")
+    def apply(session):
+        tags = session.info.pop("query_cache_tags", None)
+        kinds = session.info.pop("query_cache_kinds", None)
+        if tags or kinds:
+            cache.invalidate(tags or (), kinds or ())
+
+    @event.listens_for(session_factory, "after_rollback")
+    def discard(session):
+        session.info.pop("query_cache_tags", None)
+        session.info.pop("query_cache_kinds", None)
@@ -0,0 +1,141 @@
+"""Immutable read models returned by the DatabaseManager getters."""
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import select
+from database.schema import Patient, Visit, Medication, TestResult
+
+
+class ReadModel:
+    """
+    Base of the read models: frozen, slotted dataclasses built straight from Core rows.
+
+    Unlike detached ORM instances they hold plain values only: no session, no lazy
+    loading, no identity map. Columns left out of the query (e.g. visit transcripts
+    in listings) are absent: reading one raises AttributeError naming the column.
+    """
+    __slots__ = ()
+    __model__ = None  # ORM model whose columns the fields mirror
+
+    @classmethod
+    def field_names(cls) -> List[str]:
+        return [field.name for field in fields(cls)]
+
+    @classmethod
+    def select(cls, exclude: Iterable[str] = ()):
+        """SELECT of the model's columns, in field order, minus `exclude`."""
+        table = cls.__model__.__table__
+        excluded = set(exclude)
+        return select(*[table.c[name] for name in cls.field_names() if name not in excluded])
+
+    @classmethod
+    def from_rows(cls, result) -> list:
+        """Build records from the rows of a `select()` executed with `cls.select(...)`."""
+        keys = list(result.keys())
+        if keys == cls.field_names():
+            return [cls(*row) for row in result]
+        records = []
+        for row in result:
+            record = object.__new__(cls)
+            for key, value in zip(keys, row):
+                object.__setattr__(record, key, value)
+            records.append(record)
+        return records
+
+    def __getattr__(self, name):
+        # Only reached for empty slots: columns the query did not load
+        if name in type(self).field_names():
+            raise AttributeError(f"{type(self).__name__}.{name} was not loaded by this query")
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def loaded_fields(self) -> List[str]:
+        return [name for name in self.field_names() if hasattr(self, name)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Loaded fields as a dictionary."""
+        return {name: getattr(self, name) for name in self.loaded_fields()}
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.loaded_fields()[:4])
+        return f"{type(self).__name__}({values}, ...)"
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.to_dict() == self.to_dict()
+
+    __hash__ = None  # JSON fields (lists, dicts) are not hashable
+
+
+@dataclass(frozen=True, slots=True, repr=False, eq=False)
+class PatientRecord(ReadModel):
+    __model__ = Patient
+
+    id: int
+    patient_id: str
+    first_name: str
+    last_name: str
+    date_of_birth: Optional[datetime]
+    gender: Optional[str]
+    phone: Optional[str]
+    email: Optional[str]
+    address: Optional[str]
+    emergency_contact: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+@dataclass(frozen=True, slots=True, repr=False, eq=False)
+class VisitRecord(ReadModel):
+    __model__ = Visit
+
+    id: int
+    patient_id: int
+    visit_date: datetime
+    visit_type: Optional[str]
+    audio_file_path: Optional[str]
+    transcription: Optional[str]
+    summary: Optional[str]
+    cleaned_summary: Optional[str]
+    topics_discussed: Optional[list]
+    chief_complaint: Optional[str]
+    diagnosis: Optional[str]
+    recommendations: Optional[str]
+    notes: Optional[str]
+    duration_minutes: Optional[float]
+    created_at: Optional[datetime]
+
+
+@dataclass(frozen=True, slots=True, repr=False, eq=False)
+class MedicationRecord(ReadModel):
+    __model__ = Medication
+
+    id: int
+    patient_id: int
+    visit_id: Optional[int]
+    medication_name: str
+    dosage: Optional[str]
+    frequency: Optional[str]
+    duration: Optional[str]
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
+    is_active: Optional[bool]
+    notes: Optional[str]
+    created_at: Optional[datetime]
+
+
+@dataclass(frozen=True, slots=True, repr=False, eq=False)
+class TestResultRecord(ReadModel):
+    __model__ = TestResult
+
+    id: int
+    patient_id: int
+    visit_id: Optional[int]
+    test_type: str
+    test_name: str
+    test_date: datetime
+    results_data: Optional[Any]
+    results_file_path: Optional[str]
+    interpretation: Optional[str]
+    notes: Optional[str]
+    source: Optional[str]
+    source_reference: Optional[str]
+    created_at: Optional[datetime]
@@ -1,15 +1,37 @@
 """Database schema definitions."""
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, ForeignKey, JSON, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, ForeignKey, JSON, Boolean, Index, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Optional
+import unicodedata
 
 Base = declarative_base()
 
 
+def search_key(text: Optional[str]) -> Optional[str]:
+    """Case- and accent-insensitive form of a name or code ("Émery" -> "emery"), as stored in the *_key columns."""
+    if text is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _search_key_default(source: str):
+    # Context-sensitive default: also fills the keys of Core inserts (bulk import)
+    return lambda context: search_key(context.get_current_parameters().get(source))
+
+
 class Patient(Base):
     """Patient master record."""
     __tablename__ = "patients"
+    __table_args__ = (
+        # Patient listings: keyset pagination in name order, accent-insensitive prefix search
+        # (see database.queries.patient_page_statement)
+        Index("ix_patients_name_key", "last_name_key", "first_name_key", "id"),
+        Index("ix_patients_first_name_key", "first_name_key"),
+        Index("ix_patients_code_key", "code_key"),
+    )
     
     id = Column(Integer, primary_key=True)
     patient_id = Column(String(50), unique=True, nullable=False, index=True)
@@ -24,15 +46,31 @@ class Patient(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # search_key() of the names and code: SQLite's lower() only folds ASCII letters
+    last_name_key = Column(String(100), default=_search_key_default("last_name"))
+    first_name_key = Column(String(100), default=_search_key_default("first_name"))
+    code_key = Column(String(50), default=_search_key_default("patient_id"))
+    
     # Relationships
     visits = relationship("Visit", back_populates="patient", cascade="all, delete-orphan")
     medications = relationship("Medication", back_populates="patient", cascade="all, delete-orphan")
     test_results = relationship("TestResult", back_populates="patient", cascade="all, delete-orphan")
 
 
+@event.listens_for(Patient, "before_update")
+def _update_search_keys(mapper, connection, patient):
+    patient.last_name_key = search_key(patient.last_name)
+    patient.first_name_key = search_key(patient.first_name)
+    patient.code_key = search_key(patient.patient_id)
+
+
 class Visit(Base):
     """Patient visit record."""
     __tablename__ = "visits"
+    __table_args__ = (
+        # Patient timeline: filter by patient, newest first
+        Index("ix_visits_patient_date", "patient_id", "visit_date"),
+    )
     
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -64,6 +102,9 @@ class Visit(Base):
 class Medication(Base):
     """Medication records."""
     __tablename__ = "medications"
+    __table_args__ = (
+        Index("ix_medications_patient_active_start", "patient_id", "is_active", "start_date"),
+    )
     
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -87,6 +128,9 @@ class Medication(Base):
 class TestResult(Base):
     """Medical test results (blood tests, MRIs, scans, etc.)."""
     __tablename__ = "test_results"
+    __table_args__ = (
+        Index("ix_test_results_patient_type_date", "patient_id", "test_type", "test_date"),
+    )
     
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -110,6 +154,33 @@ class TestResult(Base):
     
     # Relationships
     patient = relationship("Patient", back_populates="test_results")
+    lab_values = relationship("LabValue", back_populates="test_result", cascade="all, delete-orphan")
+
+
+class LabValue(Base):
+    """One analyte measurement of a lab test, extracted from TestResult.results_data for trend queries."""
+    __tablename__ = "lab_values"
+    __table_args__ = (
+        # Trends: one analyte of one patient over time
+        Index("ix_lab_values_patient_analyte_date", "patient_id", "analyte", "measured_at"),
+        Index("ix_lab_values_test_result", "test_result_id"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
+    test_result_id = Column(Integer, ForeignKey("test_results.id"), nullable=False)
+    test_name = Column(String(200))
+    analyte = Column(String(200), nullable=False)
+    value = Column(Float)  # None when the result is not numeric
+    value_text = Column(String(200))  # Result as reported ("0.9", "positif", "< 5")
+    unit = Column(String(50))
+    ref_low = Column(Float)
+    ref_high = Column(Float)
+    flag = Column(String(20))  # low, high, normal (from the report, or computed from the range)
+    measured_at = Column(DateTime, nullable=False)
+    
+    # Relationships
+    test_result = relationship("TestResult", back_populates="lab_values")
 
 
 class PatternAnalysis(Base):
@@ -126,3 +197,12 @@ class PatternAnalysis(Base):
     # Relationships
     patient = relationship("Patient")
 
+
+class VectorSyncState(Base):
+    """Content hash of each visit as last written to the vector store."""
+    __tablename__ = "vector_sync_state"
+    
+    visit_id = Column(Integer, primary_key=True)  # No foreign key: rows outlive deleted visits until synced
+    patient_id = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    synced_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -4,7 +4,12 @@ from services.summarizer import MedicalSummarizer
 from services.pattern_analyzer import PatternAnalyzer
 from services.pdf_generator import PDFGenerator
 from services.vector_store import VectorStore
+from services.index_sync import IndexSync
+from services.intent_router import IntentRouter
+from services.answer_cache import AnswerCache
+from services.hybrid_retriever import HybridRetriever
 from services.medical_chat import MedicalChat
+from services.chat_service import ChatService
 
 __all__ = [
     "Transcriber",
@@ -12,6 +17,11 @@ __all__ = [
     "PatternAnalyzer",
     "PDFGenerator",
     "VectorStore",
+    "IndexSync",
+    "IntentRouter",
+    "AnswerCache",
+    "HybridRetriever",
     "MedicalChat",
+    "ChatService",
 ]
 
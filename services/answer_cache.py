@@ -0,0 +1,74 @@
+"""Answer cache for the predefined chat questions."""
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class AnswerCache:
+    """Bounded LRU cache of chat answers keyed by patient, question and data fingerprint."""
+
+    def __init__(self, max_entries: int = 500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (patient_id, question) -> (fingerprint, answer)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Normalize a question so that trivial variations share a cache entry."""
+        return re.sub(r"\s+", " ", question.strip().lower()).rstrip(" ?")
+
+    @staticmethod
+    def fingerprint(patient_context: Dict) -> str:
+        """Hash the patient context; any change to the record changes the fingerprint."""
+        payload = json.dumps(patient_context, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, patient_id: int, question: str, fingerprint: str) -> Optional[Dict]:
+        """Return the cached answer if it was computed from the same record version."""
+        key = (patient_id, self.normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, patient_id: int, question: str, fingerprint: str, answer: Dict):
+        """Store an answer, evicting the least recently used entries beyond the bound."""
+        key = (patient_id, self.normalize_question(question))
+        with self._lock:
+            self._entries[key] = (fingerprint, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def contains(self, patient_id: int, question: str, fingerprint: str) -> bool:
+        """Check for a fresh entry without touching the hit/miss counters."""
+        key = (patient_id, self.normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            return bool(entry and entry[0] == fingerprint)
+
+    def invalidate(self, patient_id: int):
+        """Drop every cached answer for a patient."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == patient_id]:
+                del self._entries[key]
+
+    def get_stats(self) -> Dict:
+        """Get cache size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
@@ -0,0 +1,168 @@
+"""Concurrent chat service for several doctors using the app at once."""
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Dict, Optional
+import ollama
+import config
+from services.medical_chat import MedicalChat, GENERATION_OPTIONS
+
+
+class ChatService:
+    """Async chat front-end over MedicalChat with per-session/per-patient locking."""
+
+    def __init__(self, medical_chat: MedicalChat, max_in_flight: int = None):
+        """
+        Args:
+            medical_chat: Shared MedicalChat holding histories, router and answer cache
+            max_in_flight: Maximum concurrent LLM generations (defaults to Ollama's parallel slots)
+        """
+        self.medical_chat = medical_chat
+        self.max_in_flight = max_in_flight or config.OLLAMA_NUM_PARALLEL
+
+        # All coroutines run on a dedicated loop so locks and the pool are shared
+        # by every caller, whether it awaits chat() or calls chat_sync() from a thread
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="chat-service", daemon=True)
+        self._thread.start()
+
+        self._client = ollama.AsyncClient(host=config.OLLAMA_BASE_URL)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._session_locks = weakref.WeakValueDictionary()  # (session_id, patient_id) -> asyncio.Lock
+        self._patient_locks = weakref.WeakValueDictionary()  # patient_id -> asyncio.Lock
+
+        self._stats_lock = threading.Lock()
+        self._queue_times_ms = deque(maxlen=500)
+        self.stats = {"completed": 0, "errors": 0, "in_flight": 0, "waiting": 0}
+
+    async def chat(
+        self,
+        session_id: str,
+        patient_id: int,
+        user_message: str,
+        use_vector_search: bool = True
+    ) -> Dict:
+        """
+        Chat with patient medical records without blocking the caller's loop.
+
+        Args:
+            session_id: Doctor's UI session; each session keeps its own history
+            patient_id: Patient ID
+            user_message: User's question
+            use_vector_search: Whether to use vector search for additional context
+
+        Returns:
+            MedicalChat result dictionary with an added 'timing' entry
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._chat(session_id, patient_id, user_message, use_vector_search), self._loop
+        )
+        return await asyncio.wrap_future(future)
+
+    def chat_sync(
+        self,
+        session_id: str,
+        patient_id: int,
+        user_message: str,
+        use_vector_search: bool = True
+    ) -> Dict:
+        """Blocking variant of chat() for Streamlit script threads."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._chat(session_id, patient_id, user_message, use_vector_search), self._loop
+        )
+        return future.result()
+
+    def _get_lock(self, locks: weakref.WeakValueDictionary, key) -> asyncio.Lock:
+        lock = locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            locks[key] = lock
+        return lock
+
+    async def _chat(self, session_id: str, patient_id: int, user_message: str, use_vector_search: bool) -> Dict:
+        """Run one turn on the service loop; queue time is the wait for the session lock and an LLM slot."""
+        submitted_at = time.perf_counter()
+        session_lock = self._get_lock(self._session_locks, (session_id, patient_id))
+        patient_lock = self._get_lock(self._patient_locks, patient_id)
+        generation_ms = 0.0
+        queue_ms = 0.0
+
+        self._update_stats(waiting=1)
+        waiting = True
+        try:
+            # One turn at a time per session keeps its history in question order
+            async with session_lock:
+                queue_ms = (time.perf_counter() - submitted_at) * 1000
+                # Shared per-patient state (answer cache, routing) is read under the patient lock
+                async with patient_lock:
+                    turn = await asyncio.to_thread(
+                        self.medical_chat._prepare_turn,
+                        patient_id, user_message, use_vector_search, True, session_id
+                    )
+
+                if "result" in turn:
+                    result = turn["result"]
+                else:
+                    slot_requested = time.perf_counter()
+                    async with self._slots:
+                        queue_ms += (time.perf_counter() - slot_requested) * 1000
+                        self._update_stats(waiting=-1, in_flight=1)
+                        waiting = False
+                        generation_started = time.perf_counter()
+                        try:
+                            response = await self._client.chat(
+                                model=self.medical_chat.model,
+                                messages=turn["messages"],
+                                options=GENERATION_OPTIONS
+                            )
+                        finally:
+                            self._update_stats(in_flight=-1)
+                        generation_ms = (time.perf_counter() - generation_started) * 1000
+
+                    async with patient_lock:
+                        result = self.medical_chat._complete_turn(turn, response["message"]["content"])
+
+            self._update_stats(completed=1, queue_ms=queue_ms)
+        except Exception as e:
+            print(f"Error in chat service: {e}")
+            self._update_stats(errors=1)
+            result = {
+                "response": f"Erreur lors de la génération de la réponse: {str(e)}",
+                "error": True
+            }
+        finally:
+            if waiting:
+                self._update_stats(waiting=-1)
+
+        result = dict(result)
+        result["timing"] = {
+            "queue_ms": round(queue_ms, 1),
+            "generation_ms": round(generation_ms, 1),
+            "total_ms": round((time.perf_counter() - submitted_at) * 1000, 1)
+        }
+        return result
+
+    def _update_stats(self, queue_ms: Optional[float] = None, **deltas):
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+            if queue_ms is not None:
+                self._queue_times_ms.append(queue_ms)
+
+    def get_stats(self) -> Dict:
+        """Get request counters and queue-time percentiles over recent requests."""
+        with self._stats_lock:
+            queue_times = sorted(self._queue_times_ms)
+            stats = dict(self.stats)
+        stats["max_in_flight"] = self.max_in_flight
+        if queue_times:
+            stats["queue_ms_p50"] = round(queue_times[len(queue_times) // 2], 1)
+            stats["queue_ms_p95"] = round(queue_times[min(len(queue_times) - 1, int(len(queue_times) * 0.95))], 1)
+        return stats
+
+    def shutdown(self):
+        """Stop the service loop."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
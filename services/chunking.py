@@ -0,0 +1,95 @@
+"""Chunking of consultation transcripts for vector indexing."""
+import re
+from typing import Dict, List, Optional
+
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about 4 characters per token for French text)."""
+    return max(1, len(text) // 4)
+
+
+def _split_long_segment(segment: Dict, max_tokens: int) -> List[Dict]:
+    """Split a segment longer than a chunk into word windows, interpolating timestamps."""
+    words = segment["text"].split()
+    words_per_piece = max(1, max_tokens * 4 // 6)  # ~6 characters per French word incl. space
+    pieces = []
+    start, end = segment.get("start"), segment.get("end")
+    for i in range(0, len(words), words_per_piece):
+        piece = {"text": " ".join(words[i:i + words_per_piece]), "start": None, "end": None}
+        if start is not None and end is not None and words:
+            piece["start"] = start + (end - start) * i / len(words)
+            piece["end"] = start + (end - start) * min(len(words), i + words_per_piece) / len(words)
+        pieces.append(piece)
+    return pieces
+
+
+def chunk_transcript(
+    transcription: str,
+    segments: Optional[List[Dict]] = None,
+    max_tokens: int = 200,
+    overlap_tokens: int = 40
+) -> List[Dict]:
+    """
+    Split a transcript into overlapping token-sized windows along segment boundaries.
+
+    Args:
+        transcription: Full transcription text (used when no segments are available)
+        segments: Whisper segments ({'start', 'end', 'text'}); sentences are used otherwise
+        max_tokens: Maximum estimated tokens per chunk
+        overlap_tokens: Estimated tokens of trailing segments repeated at the start of the next chunk
+
+    Returns:
+        List of chunks with 'chunk_index', 'text', 'start' and 'end' (seconds, or None)
+    """
+    if segments:
+        units = [
+            {"text": s["text"].strip(), "start": s.get("start"), "end": s.get("end")}
+            for s in segments if s.get("text", "").strip()
+        ]
+    else:
+        units = [
+            {"text": sentence.strip(), "start": None, "end": None}
+            for sentence in SENTENCE_PATTERN.split(transcription or "") if sentence.strip()
+        ]
+
+    expanded = []
+    for unit in units:
+        if estimate_tokens(unit["text"]) > max_tokens:
+            expanded.extend(_split_long_segment(unit, max_tokens))
+        else:
+            expanded.append(unit)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in expanded:
+        unit_tokens = estimate_tokens(unit["text"])
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(current)
+            # Carry the tail of the previous chunk over for context continuity
+            overlap = []
+            overlap_size = 0
+            for previous in reversed(current):
+                overlap_size += estimate_tokens(previous["text"])
+                if overlap_size > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+            current = overlap
+            current_tokens = sum(estimate_tokens(u["text"]) for u in current)
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(current)
+
+    return [
+        {
+            "chunk_index": i,
+            "text": " ".join(u["text"] for u in chunk),
+            "start": chunk[0]["start"],
+            "end": chunk[-1]["end"]
+        }
+        for i, chunk in enumerate(chunks)
+    ]
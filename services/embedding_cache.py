@@ -0,0 +1,157 @@
+"""Persistent cache of text embeddings keyed by content hash and embedding model."""
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+
+def embedding_model_id(embedding_function) -> str:
+    """Identify the model behind a Chroma embedding function (vectors of different models never mix)."""
+    name = None
+    try:
+        name = embedding_function.name()
+    except Exception:
+        pass
+    name = name or type(embedding_function).__name__
+    try:
+        model_name = (embedding_function.get_config() or {}).get("model_name")
+    except Exception:
+        model_name = None
+    return f"{name}:{model_name}" if model_name else name
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding store (float32 blobs) with an in-memory LRU for hot texts."""
+
+    def __init__(self, db_path: Path, model_id: str, memory_entries: int = 2048):
+        """
+        Args:
+            db_path: SQLite file holding the cached vectors
+            model_id: Embedding model identifier, part of every cache key
+            memory_entries: Vectors kept in the in-memory LRU (0 disables it)
+        """
+        self.model_id = model_id
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()  # content hash -> np.ndarray
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model_id TEXT NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model_id, content_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors of the given texts, keyed by content hash."""
+        keys = {self.content_hash(text) for text in texts}
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.stats["memory_hits"] += len(found)
+
+            missing = [key for key in keys if key not in found]
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model_id = ? "
+                    f"AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [self.model_id, *chunk]
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.stats["disk_hits"] += 1
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """Store vectors keyed by content hash."""
+        if not vectors:
+            return
+        rows = []
+        with self._lock:
+            for key, vector in vectors.items():
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((self.model_id, key, int(vector.shape[0]), vector.tobytes()))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, content_hash, dim, vector) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def embed(self, texts: List[str], embed_fn: Callable[[List[str]], List]) -> List[np.ndarray]:
+        """
+        Embed texts, calling the model only for texts never embedded before.
+
+        Args:
+            texts: Texts to embed (duplicates are embedded once)
+            embed_fn: Model call taking a list of texts and returning their vectors
+
+        Returns:
+            float32 vectors in the order of `texts`
+        """
+        found = self.get_many(texts)
+        pending = {}
+        for text in texts:
+            key = self.content_hash(text)
+            if key not in found:
+                pending.setdefault(key, text)
+
+        if pending:
+            computed = embed_fn(list(pending.values()))
+            new_vectors = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(pending.keys(), computed)
+            }
+            self.put_many(new_vectors)
+            found.update(new_vectors)
+
+        return [found[self.content_hash(text)] for text in texts]
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and cache sizes."""
+        with self._lock:
+            stored = self._conn.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE model_id = ?", (self.model_id,)
+            ).fetchone()[0]
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        total = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["stored"] = stored
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / total if total else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
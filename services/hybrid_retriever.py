@@ -0,0 +1,207 @@
+"""Hybrid lexical (BM25) + vector retrieval of chat context."""
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+import config
+from database import db_manager
+from services.chunking import estimate_tokens
+
+
+# Keeps drug names, lab codes and ICD codes (e.g. "HbA1c", "E11.9", "T4-libre") as single tokens
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-/]\w+)*")
+
+STOPWORDS = {
+    "le", "la", "les", "de", "des", "du", "un", "une", "et", "ou", "en", "au", "aux", "a", "est",
+    "que", "qui", "quoi", "pour", "par", "sur", "dans", "avec", "ce", "ces", "il", "elle", "se",
+    "son", "sa", "ses", "ne", "pas", "plus", "y", "t", "l", "d", "the", "of", "and", "to", "is", "in",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents and split text into search tokens."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in TOKEN_PATTERN.findall(folded) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory Okapi BM25 index over a small set of passages."""
+
+    def __init__(self, passages: List[Dict], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            passages: Dictionaries with at least a 'text' key
+        """
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(p["text"])) for p in passages]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    def search(self, query: str, n_results: int = 10) -> List[Dict]:
+        """Return the best passages for a query with their BM25 scores."""
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        if not terms:
+            return []
+
+        scored = []
+        for i, tf in enumerate(self.term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scored.append((score, i))
+
+        scored.sort(reverse=True)
+        return [{**self.passages[i], "score": score} for score, i in scored[:n_results]]
+
+
+class HybridRetriever:
+    """Fuses BM25 over the patient's record with Chroma results using reciprocal rank fusion."""
+
+    def __init__(self, vector_store=None, token_budget: int = None, rrf_k: int = 60, passage_words: int = 80):
+        """
+        Args:
+            vector_store: Optional VectorStore for the semantic side
+            token_budget: Maximum estimated tokens of returned passages
+            rrf_k: Reciprocal rank fusion constant
+            passage_words: Words per lexical passage
+        """
+        self.vector_store = vector_store
+        self.token_budget = token_budget or config.CHAT_CONTEXT_TOKEN_BUDGET
+        self.rrf_k = rrf_k
+        self.passage_words = passage_words
+        self._indexes = OrderedDict()  # patient_id -> (signature, BM25Index)
+        self._lock = threading.Lock()
+
+    def _visit_passages(self, visit) -> List[Dict]:
+        """Split the searchable text of a visit into fixed-size word windows."""
+        fields = [
+            ("Motif", visit.chief_complaint),
+            ("Diagnostic", visit.diagnosis),
+            ("Recommandations", visit.recommendations),
+            ("Résumé", visit.cleaned_summary or visit.summary),
+            ("Notes", visit.notes),
+            ("Transcription", visit.transcription),
+        ]
+        passages = []
+        for label, text in fields:
+            if not text:
+                continue
+            words = text.split()
+            for start in range(0, len(words), self.passage_words):
+                passages.append({
+                    "visit_id": visit.id,
+                    "date": visit.visit_date.strftime("%Y-%m-%d"),
+                    "text": f"{label}: {' '.join(words[start:start + self.passage_words])}"
+                })
+        return passages
+
+    def _get_lexical_index(self, patient_id: int) -> BM25Index:
+        """Build (or reuse) the BM25 index of a patient's visits."""
+        # Text lengths and hashes are computed in SQLite: the text itself is only read when it changed
+        signature = tuple(db_manager.get_visit_text_sizes(patient_id))
+        with self._lock:
+            cached = self._indexes.get(patient_id)
+            if cached and cached[0] == signature:
+                self._indexes.move_to_end(patient_id)
+                return cached[1]
+
+        visits = db_manager.get_patient_visits(patient_id, load_text=True)
+        passages = []
+        for visit in visits:
+            passages.extend(self._visit_passages(visit))
+        index = BM25Index(passages)
+
+        with self._lock:
+            self._indexes[patient_id] = (signature, index)
+            while len(self._indexes) > 100:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _vector_results(self, query: str, patient_id: int, n_results: int) -> List[Dict]:
+        """Semantic hits from the vector store, conversations and notes ranked together."""
+        if not self.vector_store:
+            return []
+        results = self.vector_store.search_all(query=query, patient_id=patient_id, n_results=n_results * 2)
+        hits = []
+        for result in results["results"]:
+            visit_id = result["metadata"].get("visit_id")
+            if visit_id is None:
+                continue
+            hits.append({
+                "visit_id": int(visit_id),
+                "date": str(result["metadata"].get("visit_date", ""))[:10],
+                "text": result["document"]
+            })
+        return hits
+
+    def retrieve(self, query: str, patient_id: int, n_results: int = 5) -> List[Dict]:
+        """
+        Retrieve token-budgeted passages for a question, one per visit.
+
+        Args:
+            query: Doctor's question
+            patient_id: Patient ID
+            n_results: Maximum number of visits to return
+
+        Returns:
+            Passages ordered by fused rank with 'visit_id', 'date', 'text', 'sources' and 'score'
+        """
+        ranked_lists = {}
+        try:
+            ranked_lists["bm25"] = self._get_lexical_index(patient_id).search(query, n_results * 4)
+        except Exception as e:
+            print(f"Error in lexical search: {e}")
+        try:
+            ranked_lists["vector"] = self._vector_results(query, patient_id, n_results)
+        except Exception as e:
+            print(f"Error in vector search: {e}")
+
+        # Reciprocal rank fusion at visit level; each visit keeps its best passage
+        fused = {}
+        for source, hits in ranked_lists.items():
+            seen = set()
+            for rank, hit in enumerate(hits):
+                visit_id = hit["visit_id"]
+                if visit_id in seen:
+                    continue
+                seen.add(visit_id)
+                entry = fused.setdefault(visit_id, {
+                    "visit_id": visit_id,
+                    "date": hit["date"],
+                    "text": hit["text"],
+                    "sources": [],
+                    "score": 0.0
+                })
+                entry["score"] += 1.0 / (self.rrf_k + rank + 1)
+                entry["sources"].append(source)
+                # Prefer the lexical passage: it contains the exact terms asked about
+                if source == "bm25":
+                    entry["text"] = hit["text"]
+                if not entry["date"]:
+                    entry["date"] = hit["date"]
+
+        passages = []
+        remaining = self.token_budget
+        for entry in sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:n_results]:
+            if remaining <= 0:
+                break
+            text = entry["text"]
+            if estimate_tokens(text) > remaining:
+                text = text[:remaining * 4].rsplit(" ", 1)[0] + "..."
+            remaining -= estimate_tokens(text)
+            passages.append({**entry, "text": text})
+        return passages
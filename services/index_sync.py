@@ -0,0 +1,145 @@
+"""Incremental synchronization of the vector store with the visits table."""
+import hashlib
+import json
+from typing import Dict, List
+from database import db_manager
+
+
+def visit_content_hash(visit: Dict) -> str:
+    """Hash the visit fields that end up in the vector store."""
+    payload = json.dumps(
+        [
+            visit["patient_id"],
+            visit["visit_date"].isoformat() if visit.get("visit_date") else None,
+            visit.get("visit_type"),
+            visit.get("transcription"),
+            visit.get("summary"),
+            visit.get("topics_discussed"),
+            visit.get("diagnosis"),
+            visit.get("recommendations"),
+        ],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IndexSync:
+    """Re-embeds only the visits whose content changed and removes orphaned vectors."""
+
+    def __init__(self, vector_store, db=None):
+        self.vector_store = vector_store
+        self.db = db or db_manager
+
+    def _index_visits(self, visits: List[Dict]):
+        """Write the conversation and note vectors of changed visits."""
+        conversations = []
+        notes = []
+        stale_notes = []
+        for visit in visits:
+            metadata = {"visit_type": visit.get("visit_type") or ""}
+            if visit.get("visit_date"):
+                metadata["visit_date"] = visit["visit_date"].isoformat()
+            if visit.get("topics_discussed"):
+                metadata["topics"] = str(visit["topics_discussed"])
+            conversations.append({
+                "visit_id": visit["id"],
+                "patient_id": visit["patient_id"],
+                "transcription": visit.get("transcription") or "",
+                "summary": visit.get("summary") or "",
+                "metadata": metadata
+            })
+
+            for note_type in ("diagnosis", "recommendations"):
+                note_id = f"{note_type}_{visit['id']}"
+                if visit.get(note_type):
+                    notes.append({
+                        "note_id": note_id,
+                        "patient_id": visit["patient_id"],
+                        "note_text": visit[note_type],
+                        "note_type": note_type,
+                        "metadata": {"visit_id": visit["id"]}
+                    })
+                else:
+                    stale_notes.append(note_id)
+
+        self.vector_store.add_conversations(conversations)
+        self.vector_store.add_medical_notes(notes)
+        self.vector_store.delete_medical_notes(stale_notes)
+
+    def mark_synced(self, visit_ids: List[int]):
+        """Record visits indexed elsewhere (e.g. the consultation page) as up to date."""
+        states = [
+            {"visit_id": v["id"], "patient_id": v["patient_id"], "content_hash": visit_content_hash(v)}
+            for v in self.db.iter_visits_for_indexing(visit_ids=list(visit_ids))
+        ]
+        self.db.save_vector_sync_state(states)
+
+    def export_state(self) -> List[Dict]:
+        """Sync state to store alongside a vector store snapshot."""
+        return self.db.get_vector_sync_rows()
+
+    def import_state(self, states: List[Dict]):
+        """Reset the sync state to the one saved with a restored snapshot."""
+        self.db.replace_vector_sync_state(states)
+
+    def sync(self, batch_size: int = 200, dry_run: bool = False) -> Dict:
+        """
+        Bring the vector store in line with the visits table.
+
+        Args:
+            batch_size: Changed visits re-embedded per round
+            dry_run: Only report what would change
+
+        Returns:
+            Counters: checked, unchanged, upserted, deleted
+        """
+        synced = self.db.get_vector_sync_state()
+        stats = {"checked": 0, "unchanged": 0, "upserted": 0, "deleted": 0}
+        seen = set()
+        changed = {}  # visit_id -> new content hash
+
+        # Hash pass first: the streaming read must end before writing to SQLite
+        for visit in self.db.iter_visits_for_indexing():
+            stats["checked"] += 1
+            seen.add(visit["id"])
+            content_hash = visit_content_hash(visit)
+            if synced.get(visit["id"]) == content_hash:
+                stats["unchanged"] += 1
+            else:
+                changed[visit["id"]] = content_hash
+
+        changed_ids = list(changed)
+        for start in range(0, len(changed_ids), batch_size):
+            batch_ids = changed_ids[start:start + batch_size]
+            if not dry_run:
+                visits = list(self.db.iter_visits_for_indexing(visit_ids=batch_ids))
+                self._index_visits(visits)
+                self.db.save_vector_sync_state([
+                    {"visit_id": v["id"], "patient_id": v["patient_id"], "content_hash": changed[v["id"]]}
+                    for v in visits
+                ])
+            stats["upserted"] += len(batch_ids)
+
+        # Visits deleted from SQL since the last sync
+        orphans = [visit_id for visit_id in synced if visit_id not in seen]
+        if orphans and not dry_run:
+            for visit_id in orphans:
+                self.vector_store.delete_visit(visit_id)
+            self.vector_store.delete_medical_notes(
+                [f"{note_type}_{visit_id}" for visit_id in orphans for note_type in ("diagnosis", "recommendations")]
+            )
+            self.db.delete_vector_sync_state(orphans)
+        stats["deleted"] = len(orphans)
+
+        return stats
+
+
+if __name__ == "__main__":
+    from services.vector_store import VectorStore
+
+    print("🔄 Synchronisation de l'index vectoriel...")
+    result = IndexSync(VectorStore()).sync()
+    print(f"✅ {result['checked']} consultations vérifiées, {result['upserted']} réindexées, "
+          f"{result['deleted']} supprimées, {result['unchanged']} inchangées")
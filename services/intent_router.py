@@ -0,0 +1,219 @@
+"""Deterministic intent routing for structured chat questions."""
+import re
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+
+# Questions asking for interpretation are always left to the LLM
+OPEN_ENDED_PATTERN = re.compile(
+    r"pourquoi|expliqu|évolu|evolu|résum|resum|compar|changement|modifi|tendance|"
+    r"recommand|risque|interpr|analysez|analyser|efficac|effet|interaction|"
+    r"why|explain|summar|trend|compare|change|risk|effect",
+    re.IGNORECASE
+)
+
+# Questions close to an intent that its canned answer would get wrong: stopped or
+# past treatments, allergies, history, findings of a specific exam
+NEGATIVE_PATTERN = re.compile(
+    r"arr[êe]t|stopp|interromp|suspendu|ancien|pass[ée]|d[ée]j[àa]|jamais|ant[ée]c[ée]dent|histor|"
+    r"allerg|intol[ée]ran|contre-indi|r[ée]sultats? (?:de |des |d['’])|montr|r[ée]v[èée]l|trouv|"
+    r"stopped|discontinu|previous|past\b|ever\b|allerg|history|result of|show",
+    re.IGNORECASE
+)
+
+# intent -> question templates answered directly (exact match, or embedding similarity)
+INTENTS = {
+    "active_medications": [
+        "Quels sont les médicaments actifs?",
+        "Quel est le traitement actuel du patient?",
+        "Que prend le patient en ce moment?",
+        "What are the current medications?",
+    ],
+    "last_visit": [
+        "Quelle est la date de la dernière consultation?",
+        "Quand a eu lieu la dernière visite?",
+        "When was the last visit?",
+    ],
+    "last_diagnosis": [
+        "Quel était le dernier diagnostic?",
+        "Quel est le diagnostic actuel?",
+        "What was the last diagnosis?",
+    ],
+    "latest_lab_values": [
+        "Quelles sont les dernières valeurs de l'analyse de sang?",
+        "Quels sont les résultats du dernier bilan sanguin?",
+        "What are the latest blood test values?",
+    ],
+    "recent_tests": [
+        "Quels sont les tests récents?",
+        "Quels examens ont été réalisés?",
+        "What are the recent tests?",
+    ],
+}
+
+
+class IntentRouter:
+    """
+    Answers structured questions straight from the loaded patient context.
+
+    Only the question templates of INTENTS are routed: verbatim (ignoring case,
+    accents and punctuation), or, with an embedding function, by high cosine
+    similarity to a template. Questions matching NEGATIVE_PATTERN or
+    OPEN_ENDED_PATTERN always go to the LLM: a wrong canned answer is worse
+    than a slow one.
+    """
+
+    def __init__(self, embedding_function: Optional[Callable[[List[str]], List]] = None, similarity_threshold: float = 0.9):
+        """
+        Args:
+            embedding_function: Optional callable mapping texts to embeddings, used when
+                the question is not a template
+            similarity_threshold: Minimum cosine similarity to a template
+        """
+        self.embedding_function = embedding_function
+        self.similarity_threshold = similarity_threshold
+        self._templates = {
+            self.normalize_question(example): intent
+            for intent, examples in INTENTS.items()
+            for example in examples
+        }
+        self._example_matrix = None
+        self._example_intents = []
+        self._stats_lock = threading.Lock()
+        self.stats = {"routed": 0, "fallthrough": 0, "by_intent": {}}
+
+    @staticmethod
+    def normalize_question(question: str) -> str:
+        """Lowercase, strip accents and punctuation, collapse whitespace."""
+        text = unicodedata.normalize("NFKD", question.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        return " ".join(re.sub(r"[^\w']+", " ", text).split())
+
+    def classify(self, question: str) -> Optional[str]:
+        """Return the intent of a question, or None if it needs the LLM."""
+        if OPEN_ENDED_PATTERN.search(question) or NEGATIVE_PATTERN.search(question):
+            return None
+
+        intent = self._templates.get(self.normalize_question(question))
+        if intent:
+            return intent
+
+        if self.embedding_function:
+            return self._classify_by_similarity(question)
+        return None
+
+    def _classify_by_similarity(self, question: str) -> Optional[str]:
+        """Match a question against the intent templates by cosine similarity."""
+        try:
+            if self._example_matrix is None:
+                examples = [example for intent_examples in INTENTS.values() for example in intent_examples]
+                matrix = self._normalize(np.asarray(self.embedding_function(examples), dtype=np.float32))
+                # Set only once the embeddings succeeded, so a failed call can be retried
+                self._example_intents = [intent for intent, intent_examples in INTENTS.items() for _ in intent_examples]
+                self._example_matrix = matrix
+
+            query = self._normalize(np.asarray(self.embedding_function([question]), dtype=np.float32))[0]
+            scores = self._example_matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                return self._example_intents[best]
+        except Exception as e:
+            print(f"Error in intent similarity: {e}")
+        return None
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def route(self, question: str, patient_context: Dict) -> Optional[Dict]:
+        """
+        Answer a question from structured data if it matches a known intent.
+
+        Args:
+            question: Doctor's question
+            patient_context: Context as built by MedicalChat._load_patient_context
+
+        Returns:
+            Dictionary with 'intent' and 'response', or None to fall through to the LLM
+        """
+        intent = self.classify(question)
+        response = getattr(self, f"_answer_{intent}")(patient_context) if intent else None
+
+        with self._stats_lock:
+            if response:
+                self.stats["routed"] += 1
+                self.stats["by_intent"][intent] = self.stats["by_intent"].get(intent, 0) + 1
+            else:
+                self.stats["fallthrough"] += 1
+
+        if not response:
+            return None
+        return {"intent": intent, "response": response}
+
+    def get_stats(self) -> Dict:
+        """Get routing counters and hit rate."""
+        with self._stats_lock:
+            total = self.stats["routed"] + self.stats["fallthrough"]
+            return {
+                "routed": self.stats["routed"],
+                "fallthrough": self.stats["fallthrough"],
+                "by_intent": dict(self.stats["by_intent"]),
+                "hit_rate": self.stats["routed"] / total if total else 0.0
+            }
+
+    def _answer_active_medications(self, context: Dict) -> str:
+        active_meds = [m for m in context.get("medications", []) if m.get("is_active")]
+        if not active_meds:
+            return "Aucun médicament actif trouvé dans le dossier."
+        lines = []
+        for med in active_meds:
+            line = f"- {med.get('name')}"
+            details = " - ".join(d for d in [med.get("dosage"), med.get("frequency")] if d)
+            if details:
+                line += f" ({details})"
+            if med.get("start_date"):
+                line += f", depuis le {med.get('start_date')}"
+            lines.append(line)
+        return f"Médicaments actifs ({len(active_meds)}):\n" + "\n".join(lines)
+
+    def _answer_last_visit(self, context: Dict) -> str:
+        visits = context.get("visits", [])
+        if not visits:
+            return "Aucune consultation trouvée dans le dossier."
+        latest = visits[0]  # Most recent first
+        response = f"Dernière consultation: {latest.get('date')} ({latest.get('type', 'consultation')})."
+        if latest.get("chief_complaint"):
+            response += f"\nMotif: {latest.get('chief_complaint')}"
+        if latest.get("diagnosis"):
+            response += f"\nDiagnostic: {latest.get('diagnosis')}"
+        return response + f"\nTotal consultations: {context.get('total_visits', len(visits))}"
+
+    def _answer_last_diagnosis(self, context: Dict) -> Optional[str]:
+        visits = context.get("visits", [])
+        if not visits:
+            return "Aucune consultation trouvée dans le dossier."
+        for visit in visits:
+            if visit.get("diagnosis"):
+                return f"Dernier diagnostic ({visit.get('date', 'N/A')}): {visit.get('diagnosis')}"
+        return "Aucun diagnostic trouvé dans les consultations."
+
+    def _answer_latest_lab_values(self, context: Dict) -> Optional[str]:
+        lab_tests = [t for t in context.get("test_results", []) if t.get("key_results")]
+        if not lab_tests:
+            return "Aucun résultat d'analyse biologique trouvé dans le dossier."
+        latest = lab_tests[0]  # Most recent first
+        lines = [f"- {name}: {value}" for name, value in latest["key_results"].items()]
+        response = f"{latest.get('name')} ({latest.get('date')}):\n" + "\n".join(lines)
+        if latest.get("interpretation"):
+            response += f"\nInterprétation: {latest.get('interpretation')}"
+        return response
+
+    def _answer_recent_tests(self, context: Dict) -> str:
+        tests = context.get("test_results", [])
+        if not tests:
+            return "Aucun résultat de test trouvé dans le dossier."
+        lines = [f"- {t.get('name')} ({t.get('type', 'test')}) - {t.get('date')}" for t in tests[:5]]
+        return f"Tests récents ({len(tests)} au total):\n" + "\n".join(lines)
@@ -2,19 +2,66 @@
 import ollama
 import config
 import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from datetime import datetime
 from database import db_manager
+from services.intent_router import IntentRouter
+from services.answer_cache import AnswerCache
+from services.hybrid_retriever import HybridRetriever
+
+
+# Predefined questions offered in the patient view; their answers are cached per record version
+SUGGESTED_QUESTIONS = [
+    "Quels sont les médicaments actifs?",
+    "Résumez l'évolution de la pathologie",
+    "Quels sont les tests récents?",
+    "Y a-t-il eu des changements de médicaments?",
+    "Quel était le dernier diagnostic?"
+]
+
+GENERATION_OPTIONS = {
+    "temperature": 0.3,  # Lower temperature for medical accuracy
+    "num_predict": 500  # Limit response length
+}
 
 
 class MedicalChat:
     """Interactive chat for querying patient medical records."""
     
-    def __init__(self, vector_store=None):
+    def __init__(self, vector_store=None, memory_mode: str = None, intent_router: Optional[IntentRouter] = None):
         self.model = config.OLLAMA_MODEL
         self.base_url = config.OLLAMA_BASE_URL
         self.vector_store = vector_store
-        self.conversation_history = {}  # patient_id -> list of messages
+        self.retriever = HybridRetriever(vector_store=vector_store)
+        # history key (patient_id or (session_id, patient_id)) -> list of messages, least recently used first;
+        # one entry per browser session and patient, so the oldest conversations are evicted
+        self.conversation_history = OrderedDict()
+        self.max_conversations = config.CHAT_HISTORY_MAX_CONVERSATIONS
+        self._history_lock = threading.Lock()
+        
+        # Structured questions (active medications, last visit, ...) are answered
+        # from the loaded context without an LLM generation
+        if intent_router is None and config.CHAT_INTENT_ROUTER:
+            intent_router = IntentRouter()
+        self.intent_router = intent_router
+        
+        self.answer_cache = AnswerCache(config.CHAT_ANSWER_CACHE_SIZE) if config.CHAT_ANSWER_CACHE_SIZE > 0 else None
+        self._suggested_questions = {AnswerCache.normalize_question(q) for q in SUGGESTED_QUESTIONS}
+        self._precompute_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-precompute")
+        
+        # Rolling memory: older exchanges are folded into a running summary
+        # by a background worker, only unfolded exchanges are sent verbatim
+        self.memory_mode = memory_mode or config.CHAT_MEMORY_MODE
+        self.conversation_summaries = {}  # history key -> running summary text
+        self._exchange_counts = {}  # history key -> total exchanges recorded
+        self._folded_counts = {}  # history key -> exchanges folded into the summary
+        self._memory_generations = {}  # history key -> generation, renewed on clear/eviction to drop stale folds
+        self._memory_epoch = 0  # Source of unique generations
+        self._memory_lock = threading.Lock()
+        self._summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-memory")
     
     def _load_patient_context(self, patient_id: int) -> Dict:
         """Load complete patient context for chat."""
@@ -23,7 +70,7 @@ class MedicalChat:
             return {}
         
         # Get all patient data
-        visits = db_manager.get_patient_visits(patient_id)
+        visits = db_manager.get_patient_visits(patient_id, load_text=("summary", "cleaned_summary"))
         medications = db_manager.get_patient_medications(patient_id)
         test_results = db_manager.get_patient_test_results(patient_id)
         
@@ -87,33 +134,20 @@ class MedicalChat:
             "total_tests": len(test_results)
         }
     
-    def _search_relevant_context(self, query: str, patient_id: int, n_results: int = 3) -> str:
-        """Search for relevant context using vector store."""
-        if not self.vector_store:
-            return ""
-        
+    def _search_relevant_context(self, query: str, patient_id: int, n_results: int = 4) -> str:
+        """Search for relevant passages with hybrid lexical + vector retrieval."""
         try:
-            # Search conversations and medical notes
-            results = self.vector_store.search_all(
-                query=query,
-                patient_id=patient_id,
-                n_results=n_results
-            )
+            passages = self.retriever.retrieve(query=query, patient_id=patient_id, n_results=n_results)
             
             relevant_context = ""
-            if results.get("conversations"):
-                relevant_context += "\n\nConversations pertinentes:\n"
-                for i, conv in enumerate(results["conversations"][:2], 1):
-                    relevant_context += f"{i}. {conv['document'][:300]}...\n"
-            
-            if results.get("medical_notes"):
-                relevant_context += "\n\nNotes médicales pertinentes:\n"
-                for i, note in enumerate(results["medical_notes"][:2], 1):
-                    relevant_context += f"{i}. {note['document'][:300]}...\n"
+            if passages:
+                relevant_context += "\n\nPassages pertinents du dossier:\n"
+                for i, passage in enumerate(passages, 1):
+                    relevant_context += f"{i}. [Consultation du {passage['date'] or 'N/A'}] {passage['text']}\n"
             
             return relevant_context
         except Exception as e:
-            print(f"Error in vector search: {e}")
+            print(f"Error in context search: {e}")
             return ""
     
     def _build_system_prompt(self, patient_context: Dict) -> str:
@@ -212,7 +246,8 @@ Répondez aux questions du médecin de manière précise et professionnelle."""
         self,
         patient_id: int,
         user_message: str,
-        use_vector_search: bool = True
+        use_vector_search: bool = True,
+        session_id: Optional[str] = None
     ) -> Dict:
         """
         Chat with patient medical records.
@@ -221,21 +256,94 @@ Répondez aux questions du médecin de manière précise et professionnelle."""
             patient_id: Patient ID
             user_message: User's question
             use_vector_search: Whether to use vector search for additional context
+            session_id: Optional UI session, keeps one history per doctor session
         
         Returns:
             Dictionary with response and metadata
         """
-        # Initialize conversation history if needed
-        if patient_id not in self.conversation_history:
-            self.conversation_history[patient_id] = []
+        turn = self._prepare_turn(patient_id, user_message, use_vector_search, session_id=session_id)
+        if "result" in turn:
+            return turn["result"]
+        
+        try:
+            # Call LLM
+            response = ollama.chat(
+                model=self.model,
+                messages=turn["messages"],
+                options=GENERATION_OPTIONS
+            )
+            return self._complete_turn(turn, response["message"]["content"])
+            
+        except Exception as e:
+            print(f"Error in medical chat: {e}")
+            return {
+                "response": f"Erreur lors de la génération de la réponse: {str(e)}",
+                "error": True
+            }
+    
+    def _prepare_turn(
+        self,
+        patient_id: int,
+        user_message: str,
+        use_vector_search: bool = True,
+        record_history: bool = True,
+        session_id: Optional[str] = None,
+        patient_context: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Resolve a question without the LLM when possible, otherwise build its prompt.
+        
+        Args:
+            patient_context: Context already loaded by the caller (loaded here when None)
+        
+        Returns:
+            Turn state; contains 'result' when the question was answered directly
+            (intent router or answer cache), 'messages' when a generation is needed
+        """
+        history_key = self._history_key(patient_id, session_id)
         
         # Load patient context
-        patient_context = self._load_patient_context(patient_id)
+        if patient_context is None:
+            patient_context = self._load_patient_context(patient_id)
         if not patient_context:
-            return {
+            return {"result": {
                 "response": "Erreur: Patient non trouvé.",
                 "error": True
-            }
+            }}
+        
+        context_used = {
+            "visits_count": len(patient_context.get("visits", [])),
+            "medications_count": len(patient_context.get("medications", [])),
+            "tests_count": len(patient_context.get("test_results", [])),
+            "vector_search_used": False
+        }
+        
+        # Answer structured questions directly from the record (precomputation
+        # filters routed questions itself, keeping the router stats user-facing)
+        if self.intent_router and record_history:
+            routed = self.intent_router.route(user_message, patient_context)
+            if routed:
+                self._record_exchange(history_key, user_message, routed["response"])
+                return {"result": {
+                    "response": routed["response"],
+                    "error": False,
+                    "context_used": {**context_used, "routed_intent": routed["intent"]}
+                }}
+        
+        # Suggested questions are answered once per version of the record
+        fingerprint = None
+        is_suggested = self._is_suggested_question(user_message)
+        if is_suggested and self.answer_cache:
+            fingerprint = self.answer_cache.fingerprint(patient_context)
+            cached = self.answer_cache.get(patient_id, user_message, fingerprint)
+            if cached:
+                if record_history:
+                    self._record_exchange(history_key, user_message, cached["response"])
+                return {"result": {
+                    "response": cached["response"],
+                    "error": False,
+                    "context_used": {**cached["context_used"], "cached": True}
+                }}
         
         # Build system prompt
         system_prompt = self._build_system_prompt(patient_context)
@@ -245,7 +353,7 @@ Répondez aux questions du médecin de manière précise et professionnelle."""
         
         # Search for relevant context if enabled
         relevant_context = ""
-        if use_vector_search and self.vector_store:
+        if use_vector_search:
             relevant_context = self._search_relevant_context(user_message, patient_id)
         
         # Build messages for LLM
@@ -257,9 +365,10 @@ Répondez aux questions du médecin de manière précise et professionnelle."""
             "content": system_prompt + context_text + relevant_context
         })
         
-        # Add conversation history (last 5 exchanges to preserve context)
-        history = self.conversation_history[patient_id][-10:]  # Last 10 messages (5 exchanges)
-        messages.extend(history)
+        # Add conversation history (running summary + recent exchanges); suggested
+        # questions are self-contained so their answers can be shared across turns
+        if not is_suggested:
+            messages.extend(self._build_history_messages(history_key))
         
         # Add current user message
         messages.append({
@@ -267,85 +376,249 @@ Répondez aux questions du médecin de manière précise et professionnelle."""
             "content": user_message
         })
         
-        try:
-            # Call LLM
-            response = ollama.chat(
-                model=self.model,
-                messages=messages,
-                options={
-                    "temperature": 0.3,  # Lower temperature for medical accuracy
-                    "num_predict": 500  # Limit response length
-                }
+        context_used["vector_search_used"] = bool(relevant_context)
+        if not is_suggested:
+            with self._memory_lock:
+                context_used["memory_summary_used"] = bool(self.conversation_summaries.get(history_key))
+        
+        return {
+            "patient_id": patient_id,
+            "history_key": history_key,
+            "user_message": user_message,
+            "patient_context": patient_context,
+            "messages": messages,
+            "context_used": context_used,
+            "fingerprint": fingerprint,
+            "record_history": record_history
+        }
+    
+    def _complete_turn(self, turn: Dict, raw_response: str) -> Dict:
+        """Post-process an LLM answer, update history and cache, and build the result."""
+        patient_id = turn["patient_id"]
+        user_message = turn["user_message"]
+        assistant_response = raw_response.strip()
+        
+        # Check for empty or very short responses
+        if not assistant_response or len(assistant_response) < 10:
+            assistant_response = "Je n'ai pas pu générer de réponse. Veuillez reformuler votre question ou vérifier que le patient a des données dans son dossier."
+        
+        # Check for refusal/apology messages and provide fallback
+        refusal_phrases = [
+            "je suis désolé",
+            "je ne peux pas",
+            "je ne peux pas répondre",
+            "i'm sorry",
+            "i cannot",
+            "i cannot respond",
+            "i'm sorry, but i cannot"
+        ]
+        
+        response_lower = assistant_response.lower()
+        has_refusal = any(phrase in response_lower for phrase in refusal_phrases)
+        
+        if has_refusal and len(assistant_response) < 200:
+            # Try to extract useful information from context
+            fallback_response = self._generate_fallback_response(
+                user_message, turn["patient_context"]
             )
-            
-            assistant_response = response["message"]["content"].strip()
-            
-            # Check for empty or very short responses
-            if not assistant_response or len(assistant_response) < 10:
-                assistant_response = "Je n'ai pas pu générer de réponse. Veuillez reformuler votre question ou vérifier que le patient a des données dans son dossier."
-            
-            # Check for refusal/apology messages and provide fallback
-            refusal_phrases = [
-                "je suis désolé",
-                "je ne peux pas",
-                "je ne peux pas répondre",
-                "i'm sorry",
-                "i cannot",
-                "i cannot respond",
-                "i'm sorry, but i cannot"
-            ]
-            
-            response_lower = assistant_response.lower()
-            has_refusal = any(phrase in response_lower for phrase in refusal_phrases)
-            
-            if has_refusal and len(assistant_response) < 200:
-                # Try to extract useful information from context
-                fallback_response = self._generate_fallback_response(
-                    user_message, patient_context
+            if fallback_response:
+                assistant_response = fallback_response
+        
+        # Update conversation history
+        if turn["record_history"]:
+            self._record_exchange(turn["history_key"], user_message, assistant_response)
+        
+        result = {
+            "response": assistant_response,
+            "error": False,
+            "context_used": turn["context_used"]
+        }
+        
+        if turn["fingerprint"] and self.answer_cache:
+            self.answer_cache.put(patient_id, user_message, turn["fingerprint"], result)
+        
+        return result
+    
+    def _is_suggested_question(self, question: str) -> bool:
+        """Check whether a question is one of the UI's predefined questions."""
+        return AnswerCache.normalize_question(question) in self._suggested_questions
+    
+    def precompute_suggested_answers(self, patient_id: int):
+        """Answer the suggested questions for a patient in the background."""
+        if self.answer_cache:
+            self._precompute_executor.submit(self._precompute_suggested_answers, patient_id)
+    
+    def _precompute_suggested_answers(self, patient_id: int):
+        """Generate and cache suggested answers that are missing for the current record."""
+        try:
+            patient_context = self._load_patient_context(patient_id)
+        except Exception as e:
+            print(f"Error precomputing suggested answers: {e}")
+            return
+        if not patient_context:
+            return
+        fingerprint = self.answer_cache.fingerprint(patient_context)
+        
+        for question in SUGGESTED_QUESTIONS:
+            try:
+                if self.intent_router and self.intent_router.classify(question):
+                    continue  # Answered instantly without the LLM anyway
+                if self.answer_cache.contains(patient_id, question, fingerprint):
+                    continue
+                
+                turn = self._prepare_turn(
+                    patient_id, question, use_vector_search=True, record_history=False,
+                    patient_context=patient_context
                 )
-                if fallback_response:
-                    assistant_response = fallback_response
-            
-            # Update conversation history
-            self.conversation_history[patient_id].append({
+                if "result" in turn:
+                    continue
+                response = ollama.chat(
+                    model=self.model,
+                    messages=turn["messages"],
+                    options=GENERATION_OPTIONS
+                )
+                self._complete_turn(turn, response["message"]["content"])
+            except Exception as e:
+                print(f"Error precomputing suggested answer: {e}")
+    
+    def _record_exchange(self, history_key, user_message: str, assistant_response: str):
+        """Append a question/answer pair to the conversation history."""
+        with self._history_lock:
+            history = self.conversation_history.setdefault(history_key, [])
+            self.conversation_history.move_to_end(history_key)
+            history.append({
                 "role": "user",
                 "content": user_message
             })
-            self.conversation_history[patient_id].append({
+            history.append({
                 "role": "assistant",
                 "content": assistant_response
             })
             
             # Keep history manageable (last 20 messages max)
-            if len(self.conversation_history[patient_id]) > 20:
-                self.conversation_history[patient_id] = self.conversation_history[patient_id][-20:]
+            if len(history) > 20:
+                history = self.conversation_history[history_key] = history[-20:]
+            snapshot = list(history)
             
-            return {
-                "response": assistant_response,
-                "error": False,
-                "context_used": {
-                    "visits_count": len(patient_context.get("visits", [])),
-                    "medications_count": len(patient_context.get("medications", [])),
-                    "tests_count": len(patient_context.get("test_results", [])),
-                    "vector_search_used": bool(relevant_context)
+            evicted = []
+            while len(self.conversation_history) > self.max_conversations:
+                evicted.append(self.conversation_history.popitem(last=False)[0])
+        
+        if evicted:
+            with self._memory_lock:
+                for key in evicted:
+                    self._drop_memory_state(key)
+        
+        if self.memory_mode == "rolling":
+            self._schedule_memory_fold(history_key, snapshot)
+    
+    def get_router_stats(self) -> Dict:
+        """Get intent router hit rate and counters."""
+        if not self.intent_router:
+            return {"routed": 0, "fallthrough": 0, "by_intent": {}, "hit_rate": 0.0}
+        return self.intent_router.get_stats()
+    
+    def _build_history_messages(self, history_key) -> List[Dict]:
+        """Build the history part of the prompt according to the memory mode."""
+        with self._history_lock:
+            history = list(self.conversation_history.get(history_key, []))
+        if self.memory_mode != "rolling":
+            return history[-10:]  # Last 10 messages (5 exchanges)
+        
+        with self._memory_lock:
+            summary = self.conversation_summaries.get(history_key, "")
+            unfolded = self._exchange_counts.get(history_key, 0) - self._folded_counts.get(history_key, 0)
+        
+        # Exchanges whose fold is still running are sent verbatim (bounded as in window mode)
+        messages = []
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"Résumé des échanges précédents avec le médecin:\n{summary}"
+            })
+        if unfolded > 0:
+            messages.extend(history[-min(unfolded * 2, 10):])
+        return messages
+    
+    def _schedule_memory_fold(self, history_key, history: List[Dict]):
+        """Queue the exchange that just left the verbatim window for summarization."""
+        with self._memory_lock:
+            self._exchange_counts[history_key] = self._exchange_counts.get(history_key, 0) + 1
+            # Keep the last exchange verbatim, fold the one before it
+            if self._exchange_counts[history_key] < 2 or len(history) < 4:
+                return
+            exchange = history[-4:-2]
+            if history_key not in self._memory_generations:
+                self._memory_epoch += 1
+                self._memory_generations[history_key] = self._memory_epoch
+            generation = self._memory_generations[history_key]
+        
+        self._summary_executor.submit(self._fold_exchange, history_key, exchange, generation)
+    
+    def _fold_exchange(self, history_key, exchange: List[Dict], generation: int):
+        """Merge one exchange into the running conversation summary (background worker)."""
+        with self._memory_lock:
+            previous_summary = self.conversation_summaries.get(history_key, "")
+        
+        exchange_text = "\n".join(
+            f"{'Médecin' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in exchange
+        )
+        prompt = f"""Mettez à jour le résumé d'une conversation entre un médecin et un assistant médical à propos du dossier d'un patient.
+
+RÉSUMÉ ACTUEL:
+{previous_summary or "(aucun)"}
+
+NOUVEL ÉCHANGE:
+{exchange_text}
+
+Produisez un résumé unique, concis et factuel (questions posées, faits et valeurs cités, conclusions). Répondez uniquement avec le résumé, en français."""
+        
+        try:
+            response = ollama.chat(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                options={
+                    "temperature": 0.2,
+                    "num_predict": config.CHAT_SUMMARY_MAX_TOKENS
                 }
-            }
-            
+            )
+            new_summary = response["message"]["content"].strip()
         except Exception as e:
-            print(f"Error in medical chat: {e}")
-            return {
-                "response": f"Erreur lors de la génération de la réponse: {str(e)}",
-                "error": True
-            }
+            print(f"Error summarizing chat history: {e}")
+            # Keep the exchange visible rather than losing it
+            new_summary = f"{previous_summary}\n{exchange_text[:500]}".strip()
+        
+        with self._memory_lock:
+            if self._memory_generations.get(history_key) != generation:
+                return  # History was cleared or evicted while summarizing
+            self.conversation_summaries[history_key] = new_summary
+            self._folded_counts[history_key] = self._folded_counts.get(history_key, 0) + 1
+    
+    @staticmethod
+    def _history_key(patient_id: int, session_id: Optional[str] = None):
+        """Key conversation state per patient, or per (session, patient) for concurrent sessions."""
+        return (session_id, patient_id) if session_id else patient_id
     
-    def clear_history(self, patient_id: int):
+    def clear_history(self, patient_id: int, session_id: Optional[str] = None):
         """Clear conversation history for a patient."""
-        if patient_id in self.conversation_history:
-            del self.conversation_history[patient_id]
+        history_key = self._history_key(patient_id, session_id)
+        with self._history_lock:
+            self.conversation_history.pop(history_key, None)
+        with self._memory_lock:
+            self._drop_memory_state(history_key)
+    
+    def _drop_memory_state(self, history_key):
+        """Forget the rolling memory of a conversation (caller holds _memory_lock)."""
+        self.conversation_summaries.pop(history_key, None)
+        self._exchange_counts.pop(history_key, None)
+        self._folded_counts.pop(history_key, None)
+        # A new conversation under this key gets a new generation: pending folds are dropped
+        self._memory_generations.pop(history_key, None)
     
-    def get_history(self, patient_id: int) -> List[Dict]:
+    def get_history(self, patient_id: int, session_id: Optional[str] = None) -> List[Dict]:
         """Get conversation history for a patient."""
-        return self.conversation_history.get(patient_id, [])
+        with self._history_lock:
+            return list(self.conversation_history.get(self._history_key(patient_id, session_id), []))
     
     def _generate_fallback_response(self, user_message: str, patient_context: Dict) -> Optional[str]:
         """Generate a fallback response based on patient context when LLM refuses."""
@@ -0,0 +1,446 @@
+"""In-process vector index on memory-mapped NumPy arrays (alternative to ChromaDB)."""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+
+def _normalize(vectors) -> np.ndarray:
+    """Return float32 rows scaled to unit length."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def matches_where(metadata: Dict, where: Optional[Dict]) -> bool:
+    """Evaluate a Chroma-style metadata filter on a single record."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq":
+                ok = value == expected
+            elif op == "$ne":
+                ok = value != expected
+            elif op == "$in":
+                ok = value in expected
+            elif op == "$nin":
+                ok = value not in expected
+            else:
+                raise ValueError(f"Unsupported where operator: {op}")
+            if not ok:
+                return False
+    return True
+
+
+def where_patient_id(where: Optional[Dict]):
+    """The patient a filter is restricted to by equality, or None."""
+    if not where:
+        return None
+    condition = where.get("patient_id")
+    if isinstance(condition, dict):
+        condition = condition.get("$eq") if list(condition) == ["$eq"] else None
+    if condition is not None:
+        return condition
+    for sub in where.get("$and", []):
+        patient_id = where_patient_id(sub)
+        if patient_id is not None:
+            return patient_id
+    return None
+
+
+class NumpyCollection:
+    """
+    Append-only vector collection exposing the subset of the Chroma collection API used by VectorStore.
+
+    Unit-normalized embeddings live in a memory-mapped file (float32, or int8 with a
+    per-vector scale); ids, documents and metadata in an append-only JSON log. Deletes
+    and upserts tombstone old rows. Queries are exact: one matrix product over the rows
+    selected by boolean masks built from the metadata filter. Rows are also partitioned
+    by patient_id, so a patient-scoped query only touches that patient's vectors.
+    Distances are squared L2 between unit vectors (2 - 2*cos), as with Chroma's default space.
+
+    Other instances (processes) may write to the same files: every call first
+    replays the records appended since the last one. Writers must be serialized
+    across processes by the caller (VectorStore holds an exclusive file lock).
+    """
+
+    def __init__(self, path: Path, name: str, metadata: Optional[Dict] = None,
+                 embedding_function=None, quantize: bool = False):
+        """
+        Args:
+            path: Directory of the collection files
+            name: Collection name
+            metadata: Collection metadata (stored in the manifest)
+            embedding_function: Used only when documents or query texts come without embeddings
+            quantize: Store int8 vectors instead of float32 (new collections only)
+        """
+        self.name = name
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embedding_function = embedding_function
+        self._lock = threading.RLock()
+
+        manifest_path = self.path / "manifest.json"
+        if manifest_path.exists():
+            self.manifest = json.loads(manifest_path.read_text())
+        else:
+            self.manifest = {"name": name, "metadata": metadata or {}, "dim": None,
+                             "dtype": "int8" if quantize else "float32"}
+            manifest_path.write_text(json.dumps(self.manifest))
+        self.metadata = self.manifest["metadata"]
+        self._dtype = np.int8 if self.manifest["dtype"] == "int8" else np.float32
+
+        self._vectors_path = self.path / "vectors.bin"
+        self._scales_path = self.path / "scales.bin"
+        self._records_path = self.path / "records.jsonl"
+        self._load()
+
+    # Storage
+
+    def _load(self):
+        """Replay the record log and map the vector file."""
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Dict] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._id_to_row: Dict[str, int] = {}
+        self._patient_rows: Dict[object, set] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._matrix = None
+        self._scales = None
+        self._records_offset = 0  # Bytes of the record log replayed so far
+        self._apply(self._read_records(repair=True))
+
+    def _refresh(self, repair: bool = False):
+        """Replay the records other instances appended since the last call."""
+        if self._records_path.exists() and os.path.getsize(self._records_path) > self._records_offset:
+            if self.manifest["dim"] is None:
+                self.manifest = json.loads((self.path / "manifest.json").read_text())
+            self._apply(self._read_records(repair))
+
+    def _apply(self, records: List[Dict]):
+        """Add records read from the log to the in-memory state and remap the vectors."""
+        alive = self._alive.tolist()
+        for record in records:
+            if "delete" in record:
+                for row in record["delete"]:
+                    alive[row] = False
+                    self._id_to_row.pop(self._ids[row], None)
+                    self._patient_rows.get(self._metadatas[row].get("patient_id"), set()).discard(row)
+                continue
+            row = len(self._ids)
+            self._ids.append(record["id"])
+            self._documents.append(record.get("document"))
+            self._metadatas.append(record.get("metadata") or {})
+            alive.append(True)
+            self._id_to_row[record["id"]] = row
+            self._patient_rows.setdefault(self._metadatas[row].get("patient_id"), set()).add(row)
+
+        self._alive = np.array(alive, dtype=bool)
+        self._columns.clear()
+        self._remap()
+
+    def _read_records(self, repair: bool) -> List[Dict]:
+        """
+        Read the records appended to the log after the replayed offset.
+
+        Every record is written with its newline, so bytes after the last newline
+        come from a write in progress in another process or, when `repair` says no
+        write can be in progress (opening, or writing under the caller's lock), from
+        a torn write: they are cut off (their vectors, if written, are orphans that
+        the next append truncates). A tail that is a complete record missing only
+        its newline is kept and the newline restored.
+        """
+        if not self._records_path.exists():
+            return []
+        with open(self._records_path, "rb") as f:
+            f.seek(self._records_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        records = [json.loads(line) for line in data[:end].split(b"\n") if line.strip()]
+        self._records_offset += end
+
+        tail = data[end:]
+        if tail and repair:
+            try:
+                record = json.loads(tail)
+            except ValueError:
+                record = None
+            with open(self._records_path, "r+b") as f:
+                if isinstance(record, dict):
+                    f.seek(0, 2)
+                    f.write(b"\n")
+                    records.append(record)
+                    self._records_offset += len(tail) + 1
+                else:
+                    f.truncate(self._records_offset)
+        return records
+
+    def _write_records(self, records: List[Dict]):
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+        with open(self._records_path, "ab") as f:
+            f.write(data)
+        self._records_offset += len(data)
+
+    def _remap(self):
+        """(Re)map the vector file after rows were appended."""
+        dim = self.manifest["dim"]
+        rows = len(self._ids)
+        if not dim or not rows:
+            self._matrix = np.zeros((0, dim or 0), dtype=self._dtype)
+            self._scales = np.zeros(0, dtype=np.float32)
+            return
+        self._matrix = np.memmap(self._vectors_path, dtype=self._dtype, mode="r", shape=(rows, dim))
+        if self._dtype == np.int8:
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(rows,))
+
+    def _append(self, ids: List[str], vectors: np.ndarray, documents: List[Optional[str]], metadatas: List[Dict]):
+        if self.manifest["dim"] is None:
+            self.manifest["dim"] = int(vectors.shape[1])
+            (self.path / "manifest.json").write_text(json.dumps(self.manifest))
+        elif vectors.shape[1] != self.manifest["dim"]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.manifest['dim']}")
+
+        # Vectors are written before the records: rows left without a record by an
+        # interrupted write are cut off so that row numbers stay aligned
+        rows = len(self._ids)
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(rows * self.manifest["dim"] * np.dtype(self._dtype).itemsize)
+            if self._dtype == np.int8:
+                scales = 127.0 / np.maximum(np.abs(vectors).max(axis=1), 1e-12)
+                f.write(np.round(vectors * scales[:, None]).astype(np.int8).tobytes())
+                with open(self._scales_path, "ab") as sf:
+                    sf.truncate(rows * 4)
+                    sf.write(scales.astype(np.float32).tobytes())
+            else:
+                f.write(vectors.astype(np.float32).tobytes())
+
+        self._write_records([
+            {"id": record_id, "document": document, "metadata": metadata}
+            for record_id, document, metadata in zip(ids, documents, metadatas)
+        ])
+
+        start = len(self._ids)
+        self._ids.extend(ids)
+        self._documents.extend(documents)
+        self._metadatas.extend(metadatas)
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+        for offset, (record_id, metadata) in enumerate(zip(ids, metadatas)):
+            self._id_to_row[record_id] = start + offset
+            self._patient_rows.setdefault(metadata.get("patient_id"), set()).add(start + offset)
+        self._columns.clear()
+        self._remap()
+
+    def _tombstone(self, rows: List[int]):
+        if not rows:
+            return
+        self._write_records([{"delete": rows}])
+        for row in rows:
+            self._alive[row] = False
+            self._id_to_row.pop(self._ids[row], None)
+            self._patient_rows.get(self._metadatas[row].get("patient_id"), set()).discard(row)
+
+    # Filters
+
+    def _column(self, key: str) -> np.ndarray:
+        """Metadata values of every row as an array (cached until the next write)."""
+        column = self._columns.get(key)
+        if column is None:
+            column = np.empty(len(self._metadatas), dtype=object)
+            column[:] = [metadata.get(key) for metadata in self._metadatas]
+            self._columns[key] = column
+        return column
+
+    def _where_mask(self, where: Dict) -> np.ndarray:
+        """Evaluate a Chroma-style metadata filter ($eq, $ne, $in, $nin, $and, $or) as a boolean mask."""
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for sub in condition:
+                    mask &= self._where_mask(sub)
+                continue
+            if key == "$or":
+                any_mask = np.zeros(len(self._ids), dtype=bool)
+                for sub in condition:
+                    any_mask |= self._where_mask(sub)
+                mask &= any_mask
+                continue
+
+            column = self._column(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op == "$eq":
+                    mask &= column == value
+                elif op == "$ne":
+                    mask &= column != value
+                elif op in ("$in", "$nin"):
+                    in_mask = np.zeros(len(self._ids), dtype=bool)
+                    for item in value:
+                        in_mask |= column == item
+                    mask &= in_mask if op == "$in" else ~in_mask
+                else:
+                    raise ValueError(f"Unsupported where operator: {op}")
+        return mask
+
+    def _select(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None) -> np.ndarray:
+        """Rows of live records matching ids and/or a metadata filter."""
+        patient_id = where_patient_id(where)
+        if patient_id is not None:
+            # Patient partition: filter the patient's rows one by one instead of masking the whole collection
+            rows = sorted(self._patient_rows.get(patient_id, ()))
+            if ids is not None:
+                wanted = {self._id_to_row[i] for i in ids if i in self._id_to_row}
+                rows = [row for row in rows if row in wanted]
+            return np.array([row for row in rows if matches_where(self._metadatas[row], where)], dtype=np.int64)
+
+        mask = self._alive.copy()
+        if where:
+            mask &= self._where_mask(where)
+        if ids is not None:
+            id_mask = np.zeros(len(self._ids), dtype=bool)
+            id_mask[[self._id_to_row[i] for i in ids if i in self._id_to_row]] = True
+            mask &= id_mask
+        return np.flatnonzero(mask)
+
+    def _similarities(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if len(rows) == len(self._ids):
+            vectors, scales = self._matrix, self._scales
+        else:
+            vectors, scales = self._matrix[rows], (self._scales[rows] if self._dtype == np.int8 else None)
+        if self._dtype == np.int8:
+            return (vectors.astype(np.float32) @ query) / scales
+        return vectors @ query
+
+    def _vectors_of(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self._matrix[rows], dtype=np.float32)
+        if self._dtype == np.int8:
+            vectors = vectors / self._scales[rows][:, None]
+        return vectors
+
+    # Chroma collection API
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return int(self._alive.sum())
+
+    def upsert(self, ids: List[str], embeddings=None, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict]] = None):
+        """Insert records, replacing any existing record with the same id."""
+        if not ids:
+            return
+        if embeddings is None:
+            if self.embedding_function is None or documents is None:
+                raise ValueError("upsert needs embeddings or documents and an embedding function")
+            embeddings = self.embedding_function(documents)
+        vectors = _normalize(embeddings)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{} for _ in ids]
+
+        with self._lock:
+            self._refresh(repair=True)
+            # Last occurrence wins when an id repeats within the batch
+            latest = {record_id: i for i, record_id in enumerate(ids)}
+            keep = sorted(latest.values())
+            self._tombstone([self._id_to_row[i] for i in latest if i in self._id_to_row])
+            self._append([ids[i] for i in keep], vectors[keep], [documents[i] for i in keep],
+                         [dict(metadatas[i] or {}) for i in keep])
+
+    add = upsert
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        """Delete records by id and/or metadata filter."""
+        if ids is None and not where:
+            return
+        with self._lock:
+            self._refresh(repair=True)
+            self._tombstone(self._select(ids, where).tolist())
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            limit: Optional[int] = None, offset: int = 0, include: Optional[List[str]] = None) -> Dict:
+        """Fetch records by id and/or metadata filter."""
+        include = include or ["documents", "metadatas"]
+        with self._lock:
+            self._refresh()
+            rows = self._select(ids, where)[offset:]
+            if limit is not None:
+                rows = rows[:limit]
+            result = {
+                "ids": [self._ids[r] for r in rows],
+                "documents": [self._documents[r] for r in rows] if "documents" in include else None,
+                "metadatas": [self._metadatas[r] for r in rows] if "metadatas" in include else None,
+            }
+            if "embeddings" in include:
+                result["embeddings"] = self._vectors_of(rows)
+            return result
+
+    def query(self, query_embeddings=None, query_texts: Optional[List[str]] = None, n_results: int = 10,
+              where: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict:
+        """Exact top-k nearest records for each query."""
+        if query_embeddings is None:
+            if self.embedding_function is None or query_texts is None:
+                raise ValueError("query needs query_embeddings or query_texts and an embedding function")
+            query_embeddings = self.embedding_function(query_texts)
+        queries = _normalize(query_embeddings)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            self._refresh()
+            rows = self._select(where=where)
+            for query in queries:
+                if len(rows) == 0 or n_results <= 0:
+                    for key in result:
+                        result[key].append([])
+                    continue
+                similarities = self._similarities(rows, query)
+                k = min(n_results, len(rows))
+                top = np.argpartition(-similarities, k - 1)[:k]
+                top = top[np.argsort(-similarities[top])]
+                result["ids"].append([self._ids[rows[i]] for i in top])
+                result["documents"].append([self._documents[rows[i]] for i in top])
+                result["metadatas"].append([self._metadatas[rows[i]] for i in top])
+                result["distances"].append([float(2.0 - 2.0 * similarities[i]) for i in top])
+        return result
+
+
+class NumpyIndexClient:
+    """Client holding NumpyCollections under one directory, mirroring chromadb's PersistentClient."""
+
+    def __init__(self, path: Path, quantize: bool = False):
+        """
+        Args:
+            path: Root directory of the index
+            quantize: Create new collections with int8 vectors
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.quantize = quantize
+        self._collections: Dict[str, NumpyCollection] = {}
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None, embedding_function=None) -> NumpyCollection:
+        if name not in self._collections:
+            self._collections[name] = NumpyCollection(
+                self.path / name, name, metadata=metadata,
+                embedding_function=embedding_function, quantize=self.quantize
+            )
+        return self._collections[name]
+
+    def get_max_batch_size(self) -> int:
+        return 100000
@@ -0,0 +1,118 @@
+"""Per-patient vector partitions for exact patient-scoped search over a Chroma collection."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from services.numpy_index import matches_where, where_patient_id
+
+
+class PatientPartitions:
+    """
+    LRU of per-patient vector matrices searched by brute force.
+
+    A metadata filter inside Chroma's global HNSW graph still walks the whole
+    graph and can miss neighbours at small k. A patient has at most a few
+    hundred vectors, so loading them once and taking an exact dot product
+    keeps patient-scoped latency flat as the clinic's corpus grows.
+    Partitions are invalidated by VectorStore on every write in this process;
+    writes from other processes (index sync, maintenance CLI) are picked up
+    when a partition expires after `ttl_seconds`.
+    """
+
+    def __init__(self, max_patients: int = 256, ttl_seconds: float = 30.0):
+        """
+        Args:
+            max_patients: Partitions kept in memory per collection
+            ttl_seconds: Age after which a partition is reloaded from the collection
+        """
+        self.max_patients = max_patients
+        self.ttl_seconds = ttl_seconds
+        self._partitions = OrderedDict()  # (collection name, patient_id) -> (loaded_at, partition dict)
+        # Bumped by invalidate: a partition loaded across an invalidation is not cached
+        self._versions = {}  # (collection name, patient_id) -> version
+        self._collection_versions = {}  # collection name -> version
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0}
+
+    def _version(self, key) -> tuple:
+        return self._collection_versions.get(key[0], 0), self._versions.get(key, 0)
+
+    def _partition(self, collection, patient_id) -> Dict:
+        key = (collection.name, patient_id)
+        with self._lock:
+            entry = self._partitions.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+                self._partitions.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            loaded_at = time.monotonic()
+            version = self._version(key)
+
+        records = collection.get(where={"patient_id": patient_id}, include=["documents", "metadatas", "embeddings"])
+        vectors = np.asarray(records["embeddings"], dtype=np.float32) if len(records["ids"]) else np.zeros((0, 0), np.float32)
+        if len(vectors):
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        partition = {
+            "ids": records["ids"],
+            "documents": records["documents"],
+            "metadatas": records["metadatas"],
+            "vectors": vectors
+        }
+
+        with self._lock:
+            self.stats["loads"] += 1
+            # Invalidated while loading: the vectors read may predate the write
+            if self._version(key) == version:
+                self._partitions[key] = (loaded_at, partition)
+                self._partitions.move_to_end(key)
+                while len(self._partitions) > self.max_patients:
+                    self._partitions.popitem(last=False)
+        return partition
+
+    def query(self, collection, query_embeddings: List[List[float]], n_results: int, where: Dict) -> Dict:
+        """
+        Exact top-k within the patient named by `where`, in Chroma's query result format.
+
+        Args:
+            collection: Chroma collection
+            query_embeddings: Query vectors
+            n_results: Number of results per query
+            where: Metadata filter containing a patient_id equality
+        """
+        partition = self._partition(collection, where_patient_id(where))
+        rows = np.array([i for i, metadata in enumerate(partition["metadatas"]) if matches_where(metadata, where)], dtype=np.int64)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query in query_embeddings:
+            if len(rows) == 0 or n_results <= 0:
+                for key in result:
+                    result[key].append([])
+                continue
+            query = np.asarray(query, dtype=np.float32)
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+            similarities = partition["vectors"][rows] @ query
+            top = np.argsort(-similarities)[:n_results]
+            result["ids"].append([partition["ids"][rows[i]] for i in top])
+            result["documents"].append([partition["documents"][rows[i]] for i in top])
+            result["metadatas"].append([partition["metadatas"][rows[i]] for i in top])
+            # Squared L2 between unit vectors, as returned by Chroma
+            result["distances"].append([float(2.0 - 2.0 * similarities[i]) for i in top])
+        return result
+
+    def invalidate(self, collection_name: str, patient_ids: Optional[List] = None):
+        """Drop the partitions of the given patients (all patients when None)."""
+        with self._lock:
+            if patient_ids is None:
+                self._collection_versions[collection_name] = self._collection_versions.get(collection_name, 0) + 1
+            else:
+                for patient_id in patient_ids:
+                    key = (collection_name, patient_id)
+                    self._versions[key] = self._versions.get(key, 0) + 1
+            for key in list(self._partitions):
+                if key[0] == collection_name and (patient_ids is None or key[1] in patient_ids):
+                    del self._partitions[key]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "partitions": len(self._partitions)}
@@ -23,7 +23,7 @@ class PatternAnalyzer:
         if not patient:
             return {}
         
-        visits = db_manager.get_patient_visits(patient_id)
+        visits = db_manager.get_patient_visits(patient_id, load_text=("summary", "transcription"))
         medications = db_manager.get_patient_medications(patient_id, active_only=False)
         
         if len(visits) < 2:
@@ -45,6 +45,9 @@ class Transcriber:
             vad_parameters=dict(min_silence_duration_ms=500)
         )
         
+        # Segments are a lazy generator; materialize them so they can be returned too
+        segments = list(segments)
+        
         # Combine all segments
         full_text = " ".join([segment.text for segment in segments])
         
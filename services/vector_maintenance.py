@@ -0,0 +1,68 @@
+"""
+Vector store maintenance: compaction, snapshots and restore, with the matching sync state.
+
+Safe to run while the app is up: maintenance holds the index lock
+exclusively, writers in other processes wait for it, and every process
+reopens the index once it has been swapped (see VectorStore).
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Dict
+from services.index_sync import IndexSync
+from services.vector_store import VectorStore
+
+SYNC_STATE_FILE = "sync_state.json"
+
+
+def snapshot(vector_store: VectorStore, index_sync: IndexSync, label: str = None) -> Path:
+    """Snapshot the index together with the sync state describing its content."""
+    states = index_sync.export_state()
+    return vector_store.snapshot(label, extra_files={SYNC_STATE_FILE: json.dumps(states)})
+
+
+def restore(vector_store: VectorStore, index_sync: IndexSync, snapshot_path: Path) -> Dict:
+    """
+    Restore a snapshot, then bring it up to date with the database.
+
+    The snapshot's sync state is restored with it, so the follow-up sync only
+    re-indexes visits changed or deleted since the snapshot was taken.
+    """
+    vector_store.restore(snapshot_path)
+    state_file = Path(snapshot_path) / SYNC_STATE_FILE
+    index_sync.import_state(json.loads(state_file.read_text()) if state_file.exists() else [])
+    return index_sync.sync()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Maintenance de l'index vectoriel",
+        epilog="Peut tourner pendant que l'application est ouverte: les écritures attendent la fin "
+               "de l'opération, puis l'index est rouvert."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("compact", help="Reconstruire l'index pour récupérer l'espace disque")
+    snapshot_parser = commands.add_parser("snapshot", help="Créer une sauvegarde de l'index")
+    snapshot_parser.add_argument("--label")
+    restore_parser = commands.add_parser("restore", help="Restaurer une sauvegarde")
+    restore_parser.add_argument("path")
+    commands.add_parser("list", help="Lister les sauvegardes")
+    args = parser.parse_args()
+
+    store = VectorStore()
+    sync = IndexSync(store)
+
+    if args.command == "compact":
+        print("🗜️  Compactage de l'index vectoriel...")
+        result = store.compact()
+        print(f"✅ {result['records']} vecteurs conservés, "
+              f"{result['size_before_mb']} Mo → {result['size_after_mb']} Mo")
+    elif args.command == "snapshot":
+        print(f"✅ Sauvegarde créée: {snapshot(store, sync, args.label)}")
+    elif args.command == "restore":
+        print(f"♻️  Restauration de {args.path}...")
+        result = restore(store, sync, Path(args.path))
+        print(f"✅ Index restauré, {result['upserted']} consultations réindexées, {result['deleted']} supprimées")
+    elif args.command == "list":
+        for entry in store.list_snapshots():
+            print(f"{entry['path']}  {entry['created_at']:%Y-%m-%d %H:%M}  {entry['size_mb']} Mo")
@@ -1,35 +1,283 @@
-"""ChromaDB vector store for semantic search of conversations and medical notes."""
+"""Vector store (ChromaDB or in-process NumPy index) for semantic search of conversations and medical notes."""
 import chromadb
+from chromadb.api.client import SharedSystemClient
 from chromadb.config import Settings
-from typing import List, Dict, Optional
+from chromadb.utils import embedding_functions
+from typing import List, Dict, Optional, Iterable, Iterator
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import fcntl
+import os
+import shutil
+import threading
+import uuid
 import config
 from pathlib import Path
+from services.chunking import chunk_transcript
+from services.embedding_cache import EmbeddingCache, embedding_model_id
+from services.numpy_index import NumpyIndexClient, where_patient_id
+from services.patient_partitions import PatientPartitions
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of at most `size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Conversation hits fetched per requested visit before collapsing chunks
+CHUNK_OVERFETCH = 3
+
+def _directory_size_mb(path: Path) -> float:
+    if not path.exists():
+        return 0.0
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1e6
+
+
+# Written into the index directory; compaction and restore give the new index a new id
+INDEX_ID_FILE = "index_id"
+
+
+def _read_index_id(path: Path) -> Optional[str]:
+    try:
+        return (path / INDEX_ID_FILE).read_text()
+    except FileNotFoundError:
+        return None
+
+
+def _write_index_id(path: Path) -> str:
+    """Give the index at `path` a new id (atomically, concurrent readers never see a partial id)."""
+    index_id = uuid.uuid4().hex
+    staging = path / f"{INDEX_ID_FILE}.tmp"
+    staging.write_text(index_id)
+    os.replace(staging, path / INDEX_ID_FILE)
+    return index_id
+
+
+COLLECTIONS = {
+    "conversations": "Patient conversation transcripts and summaries",
+    "medical_notes": "Structured medical notes and visit summaries",
+}
+
+
+def distance_to_score(distance: Optional[float]) -> float:
+    """
+    Map a Chroma L2 distance to a similarity in [0, 1].
+    
+    Embeddings are unit-normalized, so squared L2 = 2 - 2*cos and 1 - d/2 is the
+    cosine similarity: scores from both collections are comparable.
+    """
+    if distance is None:
+        return 0.0
+    return min(1.0, max(0.0, 1.0 - distance / 2.0))
 
 
 class VectorStore:
-    """Manages vector embeddings for semantic search."""
+    """
+    Manages vector embeddings for semantic search.
+    
+    Several processes may share the index (the app, index sync, the
+    maintenance CLI). Writes hold a lock on `<index>.lock` (shared with Chroma,
+    exclusive with the numpy backend) and compaction, snapshots and restore an
+    exclusive one, so the index is never swapped under a write. A swapped index gets a new id: every instance
+    compares it with the id it opened before using its handles, and reopens.
+    """
     
-    def __init__(self):
-        """Initialize ChromaDB client."""
+    def __init__(
+        self,
+        embedding_function=None,
+        batch_size: int = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        backend: Optional[str] = None,
+        persist_path: Optional[Path] = None,
+        lazy: Optional[bool] = None
+    ):
+        """
+        Initialize the vector index client.
+        
+        Args:
+            embedding_function: Chroma-compatible embedding function (defaults to Chroma's MiniLM)
+            batch_size: Documents embedded and written per collection call
+            embedding_cache: Cache of computed vectors (defaults to the persistent cache in config)
+            backend: 'chroma' (PersistentClient) or 'numpy' (in-process memory-mapped index)
+            persist_path: Index directory (defaults to CHROMADB_PATH or VECTOR_INDEX_PATH)
+            lazy: Open the index on first use instead of now (defaults to VECTOR_LAZY_OPEN)
+        """
+        self.embedding_function = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        self.batch_size = batch_size or config.VECTOR_BATCH_SIZE
+        
+        # Identical texts (repeated queries, boilerplate recommendations) are embedded once per model
+        self.embedding_cache = embedding_cache
+        if self.embedding_cache is None and config.EMBEDDING_CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(
+                config.EMBEDDING_CACHE_PATH,
+                embedding_model_id(self.embedding_function),
+                memory_entries=config.EMBEDDING_CACHE_MEMORY_SIZE
+            )
+        
+        self.backend = backend or config.VECTOR_BACKEND
+        if self.backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown vector backend: {self.backend}")
+        default_path = config.VECTOR_INDEX_PATH if self.backend == "numpy" else config.CHROMADB_PATH
+        self.persist_path = Path(persist_path or default_path)
+        
+        # The index is opened on first use (see _open), so app start does not wait for it
+        self.client = None
+        self._collections = None
+        self._index_id = None  # Id of the index the collections were opened on
+        self._lock = threading.RLock()  # Serializes writes and maintenance (compaction, snapshots)
+        self._lock_file = None  # Cross-process lock, see _index_lock
+        self._lock_depth = 0
+        
+        # Patient-scoped queries skip Chroma's global graph (the numpy backend partitions natively)
+        self.patient_partitions = None
+        if self.backend == "chroma" and config.PATIENT_PARTITION_CACHE_SIZE > 0:
+            self.patient_partitions = PatientPartitions(
+                max_patients=config.PATIENT_PARTITION_CACHE_SIZE,
+                ttl_seconds=config.PATIENT_PARTITION_TTL
+            )
+        
+        # Both collections are queried in parallel by search_all
+        self._search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vector-search")
+        
+        if not (config.VECTOR_LAZY_OPEN if lazy is None else lazy):
+            self._open()
+    
+    def _create_client(self, path: Path):
+        if self.backend == "numpy":
+            return NumpyIndexClient(path, quantize=config.VECTOR_INDEX_INT8)
+        
         # Ensure ChromaDB directory exists
-        config.CHROMADB_PATH.mkdir(parents=True, exist_ok=True)
+        path.mkdir(parents=True, exist_ok=True)
         
         # Initialize ChromaDB client (persistent)
-        self.client = chromadb.PersistentClient(
-            path=str(config.CHROMADB_PATH),
+        return chromadb.PersistentClient(
+            path=str(path),
             settings=Settings(anonymized_telemetry=False)
         )
+    
+    def _get_collections(self, client) -> Dict:
+        return {
+            name: client.get_or_create_collection(
+                name=name,
+                metadata={"description": description},
+                embedding_function=self.embedding_function
+            )
+            for name, description in COLLECTIONS.items()
+        }
+    
+    def _open(self) -> Dict:
+        """Open the client and collections if not open yet."""
+        # Shared index lock: never open (or recover) the directory midway through another process's swap
+        with self._index_lock():
+            if self._collections is None:
+                # An interrupted index swap leaves the previous index under .old
+                previous = self._sibling_path("old")
+                if not self.persist_path.exists() and previous.exists():
+                    os.replace(previous, self.persist_path)
+                
+                self.client = self._create_client(self.persist_path)
+                self._collections = self._get_collections(self.client)
+                self._index_id = _read_index_id(self.persist_path) or _write_index_id(self.persist_path)
+                
+                # Never send more than the server accepts in one call
+                try:
+                    self.batch_size = min(self.batch_size, self.client.get_max_batch_size())
+                except Exception:
+                    pass
+            return self._collections
+    
+    def _current_collections(self) -> Dict:
+        """Open collections, reopened if another process compacted or restored the index since."""
+        collections = self._collections
+        if collections is not None and _read_index_id(self.persist_path) == self._index_id:
+            return collections
+        with self._lock:
+            if self._collections is not None and _read_index_id(self.persist_path) != self._index_id:
+                self.close()
+            return self._open()
+    
+    @property
+    def conversations_collection(self):
+        return self._current_collections()["conversations"]
+    
+    @property
+    def medical_notes_collection(self):
+        return self._current_collections()["medical_notes"]
+    
+    @contextmanager
+    def _index_lock(self, exclusive: bool = False):
+        """
+        Hold the cross-process index lock (reentrant within this instance).
         
-        # Get or create collections
-        self.conversations_collection = self.client.get_or_create_collection(
-            name="conversations",
-            metadata={"description": "Patient conversation transcripts and summaries"}
-        )
-        
-        self.medical_notes_collection = self.client.get_or_create_collection(
-            name="medical_notes",
-            metadata={"description": "Structured medical notes and visit summaries"}
-        )
+        Shared for writes (exclusive with the numpy backend), exclusive for
+        maintenance: another process cannot swap the index directory while this
+        one writes to it.
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                if self._lock_file is None:
+                    self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._lock_file = open(self._sibling_path("lock"), "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _writing(self) -> Iterator[Dict]:
+        """Hold the write locks and yield the collections of the live index."""
+        # Chroma serializes writers in its SQLite database; NumPy collections append
+        # at row numbers they hold in memory, so only one process may write at a time
+        with self._index_lock(exclusive=self.backend == "numpy"):
+            yield self._current_collections()
+    
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, calling the model once for the texts missing from the cache."""
+        if self.embedding_cache is not None:
+            vectors = self.embedding_cache.embed(texts, self.embedding_function)
+        else:
+            vectors = self.embedding_function(texts)
+        return [list(map(float, embedding)) for embedding in vectors]
+    
+    def _write_batches(self, collection_name: str, records: Iterable[Dict], batch_size: Optional[int] = None) -> int:
+        """Embed and upsert records ({'id', 'document', 'metadata'}) with one call per batch."""
+        count = 0
+        for batch in _batched(records, batch_size or self.batch_size):
+            documents = [record["document"] for record in batch]
+            embeddings = self._embed(documents)
+            with self._writing() as collections:
+                collection = collections[collection_name]
+                collection.upsert(
+                    ids=[record["id"] for record in batch],
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=[record["metadata"] for record in batch]
+                )
+                self._invalidate_partitions(collection, {record["metadata"].get("patient_id") for record in batch})
+            count += len(batch)
+        return count
+    
+    def _invalidate_partitions(self, collection, patient_ids: Optional[Iterable] = None):
+        """Drop cached patient partitions after a write (all patients of the collection when None)."""
+        if self.patient_partitions is not None:
+            self.patient_partitions.invalidate(collection.name, None if patient_ids is None else set(patient_ids))
+    
+    def _query(self, collection, query_embedding: List[List[float]], n_results: int, where: Optional[Dict]) -> Dict:
+        """Query a collection, searching only the patient's partition for patient-scoped filters."""
+        if self.patient_partitions is not None and where_patient_id(where) is not None:
+            return self.patient_partitions.query(collection, query_embedding, n_results, where)
+        return collection.query(query_embeddings=query_embedding, n_results=n_results, where=where)
     
     def add_conversation(
         self,
@@ -37,7 +285,8 @@ class VectorStore:
         patient_id: int,
         transcription: str,
         summary: str,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        segments: Optional[List[Dict]] = None
     ):
         """
         Add a conversation to the vector store.
@@ -48,24 +297,78 @@ class VectorStore:
             transcription: Full transcription text
             summary: Visit summary
             metadata: Additional metadata
+            segments: Optional Whisper segments used as chunk boundaries
         """
-        # Combine transcription and summary for better semantic understanding
-        combined_text = f"{summary}\n\n{transcription[:1000]}"  # Limit transcription length
-        
-        # Prepare metadata
-        doc_metadata = {
+        self.add_conversations([{
             "visit_id": visit_id,
             "patient_id": patient_id,
-            "type": "conversation",
-            **(metadata or {})
-        }
+            "transcription": transcription,
+            "summary": summary,
+            "metadata": metadata,
+            "segments": segments
+        }])
+    
+    def add_conversations(self, conversations: Iterable[Dict], batch_size: Optional[int] = None) -> int:
+        """
+        Add or replace many conversations, embedding them in batches.
         
-        # Add to collection
-        self.conversations_collection.add(
-            documents=[combined_text],
-            ids=[f"visit_{visit_id}"],
-            metadatas=[doc_metadata]
-        )
+        The summary is stored under `visit_{id}` and the full transcript as
+        overlapping chunks `visit_{id}_chunk_{n}` carrying their time offsets.
+        Re-adding a visit replaces all of its previous vectors.
+        
+        Args:
+            conversations: Iterable of dictionaries with the add_conversation arguments
+            batch_size: Documents per embedding/write call (defaults to the store's batch size)
+        
+        Returns:
+            Number of conversations added
+        """
+        count = 0
+        
+        def records(group):
+            for conversation in group:
+                visit_id = conversation["visit_id"]
+                base_metadata = {
+                    "visit_id": visit_id,
+                    "patient_id": conversation["patient_id"],
+                    "type": "conversation",
+                    **(conversation.get("metadata") or {})
+                }
+                
+                if conversation.get("summary"):
+                    yield {
+                        "id": f"visit_{visit_id}",
+                        "document": conversation["summary"],
+                        "metadata": {**base_metadata, "chunk_type": "summary"}
+                    }
+                
+                chunks = chunk_transcript(
+                    conversation.get("transcription") or "",
+                    segments=conversation.get("segments"),
+                    max_tokens=config.TRANSCRIPT_CHUNK_TOKENS,
+                    overlap_tokens=config.TRANSCRIPT_CHUNK_OVERLAP
+                )
+                for chunk in chunks:
+                    chunk_metadata = {**base_metadata, "chunk_type": "transcript", "chunk_index": chunk["chunk_index"]}
+                    # Chroma metadata values cannot be None
+                    if chunk["start"] is not None:
+                        chunk_metadata["start_time"] = float(chunk["start"])
+                        chunk_metadata["end_time"] = float(chunk["end"])
+                    yield {
+                        "id": f"visit_{visit_id}_chunk_{chunk['chunk_index']}",
+                        "document": chunk["text"],
+                        "metadata": chunk_metadata
+                    }
+        
+        for group in _batched(conversations, batch_size or self.batch_size):
+            # Drop the previous chunks first: a shorter transcript leaves fewer chunk ids
+            visit_ids = [conversation["visit_id"] for conversation in group]
+            with self._writing() as collections:
+                collections["conversations"].delete(where={"visit_id": {"$in": visit_ids}})
+                self._invalidate_partitions(collections["conversations"], [conversation["patient_id"] for conversation in group])
+                self._write_batches("conversations", records(group), batch_size)
+            count += len(group)
+        return count
     
     def add_medical_note(
         self,
@@ -85,24 +388,46 @@ class VectorStore:
             note_type: Type of note (diagnosis, recommendation, etc.)
             metadata: Additional metadata
         """
-        doc_metadata = {
+        self.add_medical_notes([{
+            "note_id": note_id,
             "patient_id": patient_id,
+            "note_text": note_text,
             "note_type": note_type,
-            "type": "medical_note",
-            **(metadata or {})
-        }
+            "metadata": metadata
+        }])
+    
+    def add_medical_notes(self, notes: Iterable[Dict], batch_size: Optional[int] = None) -> int:
+        """
+        Add or replace many medical notes, embedding them in batches.
         
-        self.medical_notes_collection.add(
-            documents=[note_text],
-            ids=[note_id],
-            metadatas=[doc_metadata]
-        )
+        Args:
+            notes: Iterable of dictionaries with the add_medical_note arguments
+            batch_size: Documents per embedding/write call (defaults to the store's batch size)
+        
+        Returns:
+            Number of notes added
+        """
+        def records():
+            for note in notes:
+                yield {
+                    "id": note["note_id"],
+                    "document": note["note_text"],
+                    "metadata": {
+                        "patient_id": note["patient_id"],
+                        "note_type": note["note_type"],
+                        "type": "medical_note",
+                        **(note.get("metadata") or {})
+                    }
+                }
+        
+        return self._write_batches("medical_notes", records(), batch_size)
     
     def search_conversations(
         self,
         query: str,
         patient_id: Optional[int] = None,
-        n_results: int = 5
+        n_results: int = 5,
+        query_embedding: Optional[List[List[float]]] = None
     ) -> List[Dict]:
         """
         Search conversations semantically.
@@ -111,6 +436,7 @@ class VectorStore:
             query: Search query
             patient_id: Optional filter by patient
             n_results: Number of results to return
+            query_embedding: Precomputed embedding of the query (skips embedding it again)
         
         Returns:
             List of matching conversations with metadata
@@ -120,31 +446,61 @@ class VectorStore:
         if patient_id:
             where = {"patient_id": patient_id}
         
-        results = self.conversations_collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            where=where
-        )
+        query_embedding = query_embedding or self._embed([query])
         
-        # Format results
-        formatted_results = []
-        if results["ids"] and len(results["ids"][0]) > 0:
-            for i in range(len(results["ids"][0])):
-                formatted_results.append({
-                    "id": results["ids"][0][i],
-                    "document": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i] if "distances" in results else None
-                })
+        # Several chunks of one visit can match; fetch extra hits to fill n_results visits
+        fetch = n_results * CHUNK_OVERFETCH
+        for _ in range(3):
+            results = self._query(self.conversations_collection, query_embedding, fetch, where)
+            
+            # Format results
+            formatted_results = []
+            if results["ids"] and len(results["ids"][0]) > 0:
+                for i in range(len(results["ids"][0])):
+                    formatted_results.append({
+                        "id": results["ids"][0][i],
+                        "document": results["documents"][0][i],
+                        "metadata": results["metadatas"][0][i],
+                        "distance": results["distances"][0][i] if "distances" in results else None
+                    })
+            
+            collapsed = self._collapse_to_visits(formatted_results)
+            # Stop once enough visits are found or the collection is exhausted
+            if len(collapsed) >= n_results or len(formatted_results) < fetch:
+                break
+            fetch *= 4
         
-        return formatted_results
+        return collapsed[:n_results]
+    
+    @staticmethod
+    def _collapse_to_visits(hits: List[Dict]) -> List[Dict]:
+        """
+        Keep the best-matching passage per visit (hits are ordered by distance).
+        
+        Each result keeps the visit-level id `visit_{id}` and exposes the matched
+        chunk as 'chunk_id' with its time offset in 'passage_start' (seconds, or None).
+        """
+        collapsed = {}
+        for hit in hits:
+            visit_id = hit["metadata"].get("visit_id")
+            key = visit_id if visit_id is not None else hit["id"]
+            if key in collapsed:
+                continue
+            collapsed[key] = {
+                **hit,
+                "id": f"visit_{visit_id}" if visit_id is not None else hit["id"],
+                "chunk_id": hit["id"],
+                "passage_start": hit["metadata"].get("start_time")
+            }
+        return list(collapsed.values())
     
     def search_medical_notes(
         self,
         query: str,
         patient_id: Optional[int] = None,
         note_type: Optional[str] = None,
-        n_results: int = 5
+        n_results: int = 5,
+        query_embedding: Optional[List[List[float]]] = None
     ) -> List[Dict]:
         """
         Search medical notes semantically.
@@ -154,24 +510,22 @@ class VectorStore:
             patient_id: Optional filter by patient
             note_type: Optional filter by note type
             n_results: Number of results to return
+            query_embedding: Precomputed embedding of the query (skips embedding it again)
         
         Returns:
             List of matching notes with metadata
         """
         # Build query filter
-        where = {}
+        conditions = []
         if patient_id:
-            where["patient_id"] = patient_id
+            conditions.append({"patient_id": patient_id})
         if note_type:
-            where["note_type"] = note_type
+            conditions.append({"note_type": note_type})
         
-        where = where if where else None
+        # Chroma expects a single top-level key per filter
+        where = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else None)
         
-        results = self.medical_notes_collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            where=where
-        )
+        results = self._query(self.medical_notes_collection, query_embedding or self._embed([query]), n_results, where)
         
         # Format results
         formatted_results = []
@@ -190,40 +544,249 @@ class VectorStore:
         self,
         query: str,
         patient_id: Optional[int] = None,
-        n_results: int = 10
-    ) -> Dict[str, List[Dict]]:
+        n_results: int = 10,
+        cursor: Optional[int] = None
+    ) -> Dict:
         """
-        Search across all collections.
+        Search across all collections and rank the hits together.
+        
+        The query is embedded once and both collections are queried concurrently.
+        Hits are ranked by a common similarity 'score' (see distance_to_score);
+        a note repeating a text already returned for the same visit is dropped.
+        
+        Args:
+            query: Search query
+            patient_id: Optional filter by patient
+            n_results: Number of results per page
+            cursor: 'next_cursor' of the previous page (None for the first page)
         
         Returns:
-            Dictionary with 'conversations' and 'medical_notes' keys
+            Dictionary with 'results' (the ranked page), 'next_cursor' (None on the
+            last page) and the page split by type under 'conversations' and 'medical_notes'
         """
+        offset = cursor or 0
+        # Each collection may hold every hit of the first offset + n_results ranks
+        depth = offset + n_results + 1
+        query_embedding = self._embed([query])
+        
+        conversations_future = self._search_executor.submit(
+            self.search_conversations, query, patient_id, depth, query_embedding
+        )
+        notes_future = self._search_executor.submit(
+            self.search_medical_notes, query, patient_id, None, depth, query_embedding
+        )
+        
+        merged = []
+        seen = set()
+        hits = conversations_future.result() + notes_future.result()
+        for hit in sorted(hits, key=lambda h: distance_to_score(h.get("distance")), reverse=True):
+            visit_id = hit["metadata"].get("visit_id")
+            key = (visit_id, " ".join(hit["document"].lower().split())) if visit_id is not None else hit["id"]
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append({**hit, "score": distance_to_score(hit.get("distance"))})
+        
+        page = merged[offset:offset + n_results]
         return {
-            "conversations": self.search_conversations(query, patient_id, n_results // 2),
-            "medical_notes": self.search_medical_notes(query, patient_id, None, n_results // 2)
+            "results": page,
+            "next_cursor": offset + n_results if len(merged) > offset + n_results else None,
+            "conversations": [hit for hit in page if hit["metadata"].get("type") == "conversation"],
+            "medical_notes": [hit for hit in page if hit["metadata"].get("type") == "medical_note"]
         }
     
     def delete_visit(self, visit_id: int):
-        """Delete a visit from the vector store."""
+        """Delete a visit (summary and all transcript chunks) from the vector store."""
         try:
-            self.conversations_collection.delete(ids=[f"visit_{visit_id}"])
+            with self._writing() as collections:
+                collections["conversations"].delete(where={"visit_id": visit_id})
+                self._invalidate_partitions(collections["conversations"])
         except Exception as e:
             print(f"Error deleting visit from vector store: {e}")
     
+    def delete_medical_notes(self, note_ids: List[str]):
+        """Delete medical notes by id (missing ids are ignored)."""
+        if note_ids:
+            with self._writing() as collections:
+                collections["medical_notes"].delete(ids=list(note_ids))
+                self._invalidate_partitions(collections["medical_notes"])
+    
+    def get_embedding_cache_stats(self) -> Dict:
+        """Get embedding cache hit/miss counters (empty when the cache is disabled)."""
+        return self.embedding_cache.get_stats() if self.embedding_cache is not None else {}
+    
     def get_patient_conversations(self, patient_id: int) -> List[Dict]:
         """Get all conversations for a patient."""
         results = self.conversations_collection.get(
             where={"patient_id": patient_id}
         )
         
-        formatted_results = []
+        # One entry per visit: the summary when indexed, else the first transcript chunk
+        by_visit = {}
         if results["ids"]:
             for i in range(len(results["ids"])):
-                formatted_results.append({
-                    "id": results["ids"][i],
-                    "document": results["documents"][i],
-                    "metadata": results["metadatas"][i]
-                })
+                metadata = results["metadatas"][i]
+                visit_id = metadata.get("visit_id")
+                rank = (metadata.get("chunk_type") != "summary", metadata.get("chunk_index", 0))
+                if visit_id not in by_visit or rank < by_visit[visit_id][0]:
+                    by_visit[visit_id] = (rank, {
+                        "id": f"visit_{visit_id}",
+                        "document": results["documents"][i],
+                        "metadata": metadata
+                    })
         
-        return formatted_results
+        return [entry for _, entry in by_visit.values()]
+    
+    # Maintenance
+    
+    def _sibling_path(self, suffix: str) -> Path:
+        return self.persist_path.with_name(f"{self.persist_path.name}.{suffix}")
+    
+    def close(self):
+        """Release the index files; the next query reopens them."""
+        with self._lock:
+            self._collections = None
+            self._index_id = None
+            self.client = None
+            if self.patient_partitions is not None:
+                for name in COLLECTIONS:
+                    self.patient_partitions.invalidate(name)
+            if self.backend == "chroma":
+                # Chroma keeps its files open in a process-wide system cache
+                SharedSystemClient.clear_system_cache()
+    
+    def _swap_in(self, new_path: Path):
+        """
+        Replace the live index directory with `new_path` using renames.
+        
+        Called with the exclusive index lock held. The new index gets a new id,
+        so other processes reopen it instead of writing through stale handles.
+        """
+        _write_index_id(new_path)
+        previous = self._sibling_path("old")
+        self.close()
+        shutil.rmtree(previous, ignore_errors=True)
+        if self.persist_path.exists():
+            os.replace(self.persist_path, previous)
+        os.replace(new_path, self.persist_path)
+        shutil.rmtree(previous, ignore_errors=True)
+    
+    def compact(self) -> Dict:
+        """
+        Rebuild the index into a fresh directory and swap it in.
+        
+        Deleted and replaced vectors are only tombstoned by both backends; copying
+        the live records (with their stored embeddings, no re-embedding) into a new
+        index reclaims that space and keeps cold start proportional to live data.
+        Writers in other processes wait for the swap, then reopen the new index.
+        
+        Returns:
+            Dictionary with 'records', 'size_before_mb' and 'size_after_mb'
+        """
+        with self._index_lock(exclusive=True):
+            size_before = _directory_size_mb(self.persist_path)
+            fresh_path = self._sibling_path("compacting")
+            shutil.rmtree(fresh_path, ignore_errors=True)
+            
+            records = 0
+            targets = self._get_collections(self._create_client(fresh_path))
+            for name, source in self._current_collections().items():
+                offset = 0
+                while True:
+                    page = source.get(
+                        limit=self.batch_size,
+                        offset=offset,
+                        include=["embeddings", "documents", "metadatas"]
+                    )
+                    if not len(page["ids"]):
+                        break
+                    targets[name].upsert(
+                        ids=page["ids"],
+                        embeddings=page["embeddings"],
+                        documents=page["documents"],
+                        metadatas=page["metadatas"]
+                    )
+                    offset += len(page["ids"])
+                records += offset
+            del targets
+            
+            self._swap_in(fresh_path)
+            return {
+                "records": records,
+                "size_before_mb": round(size_before, 2),
+                "size_after_mb": round(_directory_size_mb(self.persist_path), 2)
+            }
+    
+    def snapshot(self, label: Optional[str] = None, extra_files: Optional[Dict[str, str]] = None) -> Path:
+        """
+        Copy the index to the snapshot directory.
+        
+        The index is closed and writes from every process are held off during
+        the copy so the snapshot is consistent; it only appears under its final
+        name once complete, extra files included.
+        
+        Args:
+            label: Optional suffix of the snapshot name
+            extra_files: File name -> text written into the snapshot alongside the index
+        
+        Returns:
+            Path of the snapshot
+        """
+        with self._index_lock(exclusive=True):
+            name = f"{self.backend}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            if label:
+                name += f"-{label}"
+            target = config.VECTOR_SNAPSHOT_DIR / name
+            partial = target.with_name(f"{name}.partial")
+            shutil.rmtree(partial, ignore_errors=True)
+            
+            self._open()
+            self.close()
+            config.VECTOR_SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+            shutil.copytree(self.persist_path, partial)
+            for file_name, text in (extra_files or {}).items():
+                (partial / file_name).write_text(text)
+            os.replace(partial, target)
+            
+            # Keep the most recent snapshots only
+            for old_snapshot in self.list_snapshots()[config.VECTOR_SNAPSHOT_KEEP:]:
+                shutil.rmtree(old_snapshot["path"], ignore_errors=True)
+            return target
+    
+    def restore(self, snapshot_path: Path):
+        """
+        Replace the index with a snapshot.
+        
+        The snapshot is staged next to the live index, then swapped in by rename
+        under the exclusive index lock (see compact).
+        
+        Args:
+            snapshot_path: Path returned by snapshot() or listed by list_snapshots()
+        """
+        snapshot_path = Path(snapshot_path)
+        if not snapshot_path.is_dir() or not snapshot_path.name.startswith(f"{self.backend}-"):
+            raise ValueError(f"Not a {self.backend} vector store snapshot: {snapshot_path}")
+        
+        with self._index_lock(exclusive=True):
+            staging = self._sibling_path("restoring")
+            shutil.rmtree(staging, ignore_errors=True)
+            shutil.copytree(snapshot_path, staging)
+            self._swap_in(staging)
+    
+    def list_snapshots(self) -> List[Dict]:
+        """Snapshots of this backend, newest first, with 'path', 'created_at' and 'size_mb'."""
+        if not config.VECTOR_SNAPSHOT_DIR.exists():
+            return []
+        snapshots = [
+            path for path in config.VECTOR_SNAPSHOT_DIR.iterdir()
+            if path.is_dir() and path.name.startswith(f"{self.backend}-") and not path.name.endswith(".partial")
+        ]
+        return [
+            {
+                "path": path,
+                "created_at": datetime.fromtimestamp(path.stat().st_mtime),
+                "size_mb": round(_directory_size_mb(path), 2)
+            }
+            for path in sorted(snapshots, key=lambda p: p.name, reverse=True)
+        ]
 
@@ -239,6 +239,12 @@ def test_test_results_upload(services, patient):
         
         imaging_test = db_manager.add_test_result(imaging_data)
         
+        # Lab values are normalized into lab_values; imaging results have none
+        series = db_manager.get_lab_series(patient.id, ["Hémoglobine", "Leucocytes", "Modality"])
+        if set(series) != {"Hémoglobine", "Leucocytes"} or series["Hémoglobine"]["flags"][-1] != "normal":
+            log_test("Test Results Upload (Lab Values)", "FAIL", f"Unexpected lab series: {sorted(series)}")
+            return None
+        
         if imaging_test and imaging_test.id:
             log_test("Test Results Upload", "PASS", "Lab and imaging tests created")
             return [lab_test, imaging_test]
@@ -250,6 +256,482 @@ def test_test_results_upload(services, patient):
         traceback.print_exc()
         return None
 
+def test_database_concurrency(patient):
+    """Test that readers are not blocked while a writer holds the write lock."""
+    import threading
+    import time
+
+    try:
+        with db_manager.engine.connect() as connection:
+            journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        if journal_mode.lower() != config.SQLITE_JOURNAL_MODE.lower():
+            log_test("Database Concurrency", "WARN", f"journal_mode={journal_mode}")
+
+        errors = []
+        read_latencies = []
+        write_started = threading.Event()
+        write_hold_s = 1.0
+
+        def writer():
+            # BEGIN EXCLUSIVE locks out readers with a rollback journal; in WAL mode readers proceed
+            connection = db_manager.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                cursor.execute("BEGIN EXCLUSIVE")
+                cursor.execute("UPDATE patients SET updated_at = updated_at WHERE id = ?", (patient.id,))
+                write_started.set()
+                time.sleep(write_hold_s)
+                connection.rollback()
+            except Exception as e:
+                errors.append(f"writer: {e}")
+                write_started.set()
+            finally:
+                connection.close()
+
+        def reader():
+            write_started.wait()
+            for _ in range(5):
+                started = time.perf_counter()
+                try:
+                    db_manager.clear_cache()  # Read from SQLite, not from the query cache
+                    db_manager.get_patient(patient.id)
+                    db_manager.get_patient_visits(patient.id)
+                except Exception as e:
+                    errors.append(f"reader: {e}")
+                read_latencies.append(time.perf_counter() - started)
+
+        def concurrent_writer(index):
+            write_started.wait()
+            visit = db_manager.create_visit({
+                "patient_id": patient.id,
+                "visit_date": datetime.now(),
+                "visit_type": "Test concurrence",
+                "notes": f"Écriture concurrente {index}"
+            })
+            if not visit:
+                errors.append(f"concurrent writer {index}: visit not created")
+            else:
+                with db_manager.get_session() as session:
+                    session.query(Visit).filter(Visit.id == visit.id).delete()
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        threads += [threading.Thread(target=concurrent_writer, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        slowest_read = max(read_latencies) if read_latencies else 0.0
+        if errors:
+            log_test("Database Concurrency", "FAIL", "; ".join(errors[:3]))
+        elif slowest_read >= write_hold_s:
+            log_test("Database Concurrency", "FAIL", f"Readers blocked by writer ({slowest_read:.2f}s)")
+        else:
+            log_test("Database Concurrency", "PASS",
+                     f"{len(read_latencies)} reads during a {write_hold_s:.0f}s write, slowest {slowest_read * 1000:.0f}ms")
+    except Exception as e:
+        log_test("Database Concurrency", "FAIL", str(e))
+        traceback.print_exc()
+
+
+def test_async_database_parity(patient):
+    """Test that AsyncDatabaseManager returns the same data as DatabaseManager."""
+    import asyncio
+    from database.async_db_manager import AsyncDatabaseManager
+    from database.engine import dispose_async_engines
+
+    def ids(records):
+        return [record.id for record in records]
+
+    async def run_checks():
+        async_db = AsyncDatabaseManager(db_manager.db_path)
+        await async_db.initialize()
+        try:
+            mismatches = []
+            async_patient, async_visits, async_medications, async_tests, async_count, async_list, async_search = \
+                await asyncio.gather(
+                    async_db.get_patient(patient.id),
+                    async_db.get_patient_visits(patient.id),
+                    async_db.get_patient_medications(patient.id),
+                    async_db.get_patient_test_results(patient.id),
+                    async_db.count_patients(),
+                    async_db.get_patient_list(sort_by="name", limit=20),
+                    async_db.search_text("migraines", patient_id=patient.id)
+                )
+            checks = {
+                "get_patient": (async_patient.patient_id, db_manager.get_patient(patient.id).patient_id),
+                "get_patient_visits": (ids(async_visits), ids(db_manager.get_patient_visits(patient.id))),
+                "get_patient_medications": (ids(async_medications), ids(db_manager.get_patient_medications(patient.id))),
+                "get_patient_test_results": (ids(async_tests), ids(db_manager.get_patient_test_results(patient.id))),
+                "count_patients": (async_count, db_manager.count_patients()),
+                "get_patient_list": (async_list, db_manager.get_patient_list(sort_by="name", limit=20)),
+                "search_text": (async_search, db_manager.search_text("migraines", patient_id=patient.id)),
+            }
+            mismatches += [name for name, (async_value, sync_value) in checks.items() if async_value != sync_value]
+
+            # Writes made through one manager are visible to the other
+            visit = await async_db.create_visit({
+                "patient_id": patient.id,
+                "visit_date": datetime.now(),
+                "visit_type": "Test async",
+                "diagnosis": "Parité async"
+            })
+            await async_db.update_visit(visit.id, {"notes": "Mis à jour en async"})
+            sync_visit = db_manager.get_visit(visit.id)
+            if not sync_visit or sync_visit.notes != "Mis à jour en async":
+                mismatches.append("create_visit/update_visit")
+            indexed = [row async for row in async_db.iter_visits_for_indexing([visit.id])]
+            if indexed != list(db_manager.iter_visits_for_indexing([visit.id])):
+                mismatches.append("iter_visits_for_indexing")
+            with db_manager.get_session() as session:
+                session.query(Visit).filter(Visit.id == visit.id).delete()
+            return mismatches
+        finally:
+            await dispose_async_engines()
+
+    try:
+        mismatches = asyncio.run(run_checks())
+        if mismatches:
+            log_test("Async Database Parity", "FAIL", f"Different results: {', '.join(mismatches)}")
+        else:
+            log_test("Async Database Parity", "PASS", "Async and sync managers return the same data")
+    except Exception as e:
+        log_test("Async Database Parity", "FAIL", str(e))
+        traceback.print_exc()
+
+
+def test_bulk_import():
+    """Test BulkImporter: per-row errors, the row-by-row fallback and patient code resolution."""
+    import csv
+    import tempfile
+    from sqlalchemy import create_engine, select
+    from database.schema import Base
+    from database.bulk_import import BulkImporter, read_records
+    
+    try:
+        errors = []
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{Path(tmp) / 'import.db'}")
+            Base.metadata.create_all(engine)
+            
+            report = BulkImporter(engine, Patient, chunk_size=2).run([
+                {"patient_id": "P001", "first_name": "Élodie", "last_name": "Dupont", "date_of_birth": "1980-04-02"},
+                {"patient_id": "P002", "first_name": "Jean", "last_name": "Martin", "date_of_birth": "pas une date"},
+                {"patient_id": "P003", "first_name": "Marc"},
+                {"patient_id": "P001", "first_name": "Doublon", "last_name": "Dupont"},
+                {"patient_id": "P004", "first_name": "Anne", "last_name": "Roux", "allergies": "aucune"},
+                {"patient_id": "P005", "first_name": "Luc", "last_name": "Petit"},
+            ])
+            if report["inserted"] != 2 or [error["row"] for error in report["errors"]] != [1, 2, 3, 4]:
+                errors.append(f"patients: {report['inserted']} inserted, errors {report['errors']}")
+            
+            # Patients referenced by code (patient_code or string patient_id) or by integer key
+            with engine.connect() as connection:
+                keys = dict(connection.execute(select(Patient.patient_id, Patient.id)).all())
+            # A database constraint fails inside the chunk: its other rows are inserted one by one
+            with engine.begin() as connection:
+                connection.exec_driver_sql(
+                    "CREATE TRIGGER reject_dosage BEFORE INSERT ON medications WHEN NEW.dosage = 'refusé' "
+                    "BEGIN SELECT RAISE(ABORT, 'dosage refusé'); END"
+                )
+            report = BulkImporter(engine, Medication, chunk_size=10).run([
+                {"patient_code": "P001", "medication_name": "Ibuprofène", "dosage": "400mg"},
+                {"patient_id": "P005", "medication_name": "Paracétamol", "is_active": "non"},
+                {"patient_id": keys["P001"], "medication_name": "Amoxicilline", "dosage": "refusé"},
+                {"patient_id": "P999", "medication_name": "Inconnu"},
+                {"patient_id": keys["P005"], "medication_name": "Metformine"},
+            ])
+            with engine.connect() as connection:
+                medications = connection.execute(select(Medication.patient_id, Medication.medication_name)).all()
+            expected = {(keys["P001"], "Ibuprofène"), (keys["P005"], "Paracétamol"), (keys["P005"], "Metformine")}
+            if set(medications) != expected or [error["row"] for error in report["errors"]] != [2, 3]:
+                errors.append(f"medications: {medications}, errors {report['errors']}")
+            elif "dosage refusé" not in report["errors"][0]["error"]:
+                errors.append(f"constraint error not reported: {report['errors'][0]}")
+            
+            # JSON columns read from CSV are parsed, not stored as a JSON string
+            csv_path = Path(tmp) / "results.csv"
+            with open(csv_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["patient_id", "test_type", "test_name", "test_date", "results_data"])
+                writer.writerow(["P001", "blood_test", "Glycémie", "2024-03-01", json.dumps({"glucose": "5.4 mmol/L"})])
+                writer.writerow(["P005", "blood_test", "Glycémie", "2024-03-01", "{pas du json"])
+            report = BulkImporter(engine, TestResult).run(read_records(csv_path))
+            with engine.connect() as connection:
+                results_data = connection.execute(select(TestResult.results_data)).scalars().all()
+            if results_data != [{"glucose": "5.4 mmol/L"}] or [error["row"] for error in report["errors"]] != [1]:
+                errors.append(f"CSV results_data: {results_data}, errors {report['errors']}")
+            engine.dispose()
+        
+        if errors:
+            log_test("Bulk Import", "FAIL", "; ".join(errors[:3]))
+        else:
+            log_test("Bulk Import", "PASS", "row errors, constraint fallback, patient codes, CSV JSON columns")
+    except Exception as e:
+        log_test("Bulk Import", "FAIL", str(e))
+        traceback.print_exc()
+
+
+def test_patient_search():
+    """Test that the patient picker search and order ignore case and accents."""
+    import tempfile
+    from database.db_manager import DatabaseManager
+    
+    try:
+        errors = []
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = DatabaseManager(str(Path(tmp) / "search.db"))
+            manager.bulk_create_patients([
+                {"patient_id": "S001", "first_name": "Élodie", "last_name": "Dupont"},
+                {"patient_id": "S002", "first_name": "Jean", "last_name": "Émery"},
+            ])
+            for first_name, last_name, code in (("Zoé", "Zola", "S003"), ("Anne", "Emery", "S004"), ("élise", "dupont", "S005")):
+                manager.create_patient({"patient_id": code, "first_name": first_name, "last_name": last_name})
+            
+            for search, expected in (("élo", ["Élodie"]), ("ELO", ["Élodie"]), ("emery", ["Anne", "Jean"]),
+                                     ("Émery jea", ["Jean"]), ("s00", ["élise", "Élodie", "Anne", "Jean", "Zoé"])):
+                found = [item["first_name"] for item in manager.list_patients(search)["items"]]
+                if found != expected:
+                    errors.append(f"'{search}' -> {found}")
+            
+            # Unfiltered keyset walk: "Émery" sorts with "Emery", "dupont" with "Dupont"
+            names, page = [], manager.list_patients(limit=2)
+            while True:
+                names += [item["last_name"] for item in page["items"]]
+                if page["next_cursor"] is None:
+                    break
+                page = manager.list_patients(limit=2, cursor=page["next_cursor"])
+            if names != ["dupont", "Dupont", "Emery", "Émery", "Zola"]:
+                errors.append(f"order {names}")
+            manager.engine.dispose()
+        
+        if errors:
+            log_test("Patient Search", "FAIL", "; ".join(errors[:3]))
+        else:
+            log_test("Patient Search", "PASS", "accent- and case-insensitive prefixes, keyset walk in name order")
+    except Exception as e:
+        log_test("Patient Search", "FAIL", str(e))
+        traceback.print_exc()
+
+
+def test_query_cache(patient):
+    """Test that repeated reads are served by the query cache and writes invalidate them."""
+    try:
+        if db_manager.query_cache is None:
+            log_test("Query Cache", "WARN", "Cache disabled (QUERY_CACHE_SIZE=0)")
+            return
+        
+        visit_count = len(db_manager.get_patient_visits(patient.id))
+        hits_before = db_manager.get_cache_stats()["hits"]
+        db_manager.get_patient_visits(patient.id)
+        if db_manager.get_cache_stats()["hits"] != hits_before + 1:
+            log_test("Query Cache", "FAIL", "Repeated read not served by the cache")
+            return
+        
+        visit = db_manager.create_visit({
+            "patient_id": patient.id,
+            "visit_date": datetime.now(),
+            "visit_type": "Test cache"
+        })
+        visits = db_manager.get_patient_visits(patient.id)
+        with db_manager.get_session() as session:
+            session.query(Visit).filter(Visit.id == visit.id).delete()
+        if len(visits) != visit_count + 1:
+            log_test("Query Cache", "FAIL", "New visit missing after create_visit")
+        elif len(db_manager.get_patient_visits(patient.id)) != visit_count:
+            log_test("Query Cache", "FAIL", "Deleted visit still cached")
+        else:
+            stats = db_manager.get_cache_stats()
+            log_test("Query Cache", "PASS", f"{stats['entries']} entries, hit rate {stats['hit_rate']:.0%}")
+    except Exception as e:
+        log_test("Query Cache", "FAIL", str(e))
+        traceback.print_exc()
+
+
+def test_numpy_vector_index():
+    """Test the NumPy vector backend: round trip, tombstones and recovery from interrupted writes."""
+    import tempfile
+    import numpy as np
+    from services.numpy_index import NumpyCollection
+    
+    try:
+        errors = []
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(6, 8)).astype(np.float32)
+        ids = [f"doc_{i}" for i in range(6)]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for quantize in (False, True):
+                path = Path(tmp) / ("int8" if quantize else "float32")
+                collection = NumpyCollection(path, "test", quantize=quantize)
+                collection.upsert(ids, embeddings=vectors, documents=[f"texte {i}" for i in range(6)],
+                                  metadatas=[{"patient_id": i % 2} for i in range(6)])
+                
+                # Round trip, also after reopening
+                for current in (collection, NumpyCollection(path, "test")):
+                    hit = current.query(query_embeddings=[vectors[3]], n_results=1)
+                    if hit["ids"][0] != ["doc_3"] or hit["distances"][0][0] > 1e-3:
+                        errors.append(f"{path.name}: round trip returned {hit['ids'][0]}")
+                    if current.get(where={"patient_id": 1})["ids"] != ["doc_1", "doc_3", "doc_5"]:
+                        errors.append(f"{path.name}: patient filter")
+                
+                # Deletes and upserts tombstone the old rows, on disk too
+                collection.delete(ids=["doc_3"])
+                collection.upsert(["doc_1"], embeddings=vectors[[0]], documents=["remplacé"], metadatas=[{"patient_id": 1}])
+                reopened = NumpyCollection(path, "test")
+                if reopened.count() != 5 or reopened.get(ids=["doc_3"])["ids"]:
+                    errors.append(f"{path.name}: deleted record still present")
+                if reopened.get(ids=["doc_1"])["documents"] != ["remplacé"]:
+                    errors.append(f"{path.name}: upsert did not replace the record")
+                
+                # Interrupted append: vectors written, record log torn mid-line
+                extra = rng.normal(size=(2, 8)).astype(np.float32)
+                with open(path / "vectors.bin", "ab") as f:
+                    f.write(np.round(extra * 100).astype(np.int8).tobytes() if quantize else extra.tobytes())
+                if quantize:
+                    with open(path / "scales.bin", "ab") as f:
+                        f.write(np.ones(2, dtype=np.float32).tobytes())
+                with open(path / "records.jsonl", "a", encoding="utf-8") as f:
+                    f.write('{"id": "orphan", "docum')
+                
+                recovered = NumpyCollection(path, "test")
+                recovered.upsert(["doc_new"], embeddings=[vectors[5] + vectors[2]], metadatas=[{"patient_id": 0}])
+                reopened = NumpyCollection(path, "test")
+                for record_id, vector in (("doc_new", vectors[5] + vectors[2]), ("doc_4", vectors[4])):
+                    hit = reopened.query(query_embeddings=[vector], n_results=1)
+                    if hit["ids"][0] != [record_id] or hit["distances"][0][0] > 1e-3:
+                        errors.append(f"{path.name}: after recovery {record_id} -> {hit['ids'][0]} {hit['distances'][0]}")
+                if reopened.get(ids=["orphan"])["ids"]:
+                    errors.append(f"{path.name}: torn record loaded")
+                
+                # Two instances (processes) writing in turn: each sees the other's rows
+                shared = Path(tmp) / f"shared_{path.name}"
+                first, second = NumpyCollection(shared, "test", quantize=quantize), NumpyCollection(shared, "test")
+                batches = [(first, 0), (second, 2), (first, 4), (second, 0)]
+                for writer, start in batches:
+                    writer.upsert(ids[start:start + 2], embeddings=vectors[start:start + 2],
+                                  metadatas=[{"patient_id": i % 2} for i in range(start, start + 2)])
+                first.delete(ids=["doc_5"])
+                tolerance = 1e-2 if quantize else 1e-3  # int8 rounding
+                for current in (first, second, NumpyCollection(shared, "test")):
+                    for i in range(5):
+                        hit = current.query(query_embeddings=[vectors[i]], n_results=1)
+                        if hit["ids"][0] != [ids[i]] or hit["distances"][0][0] > tolerance:
+                            errors.append(f"{path.name}: interleaved writes, doc_{i} -> {hit['ids'][0]}")
+                    if current.count() != 5:
+                        errors.append(f"{path.name}: interleaved writes, {current.count()} records")
+        
+        if errors:
+            log_test("NumPy Vector Index", "FAIL", "; ".join(errors[:3]))
+        else:
+            log_test("NumPy Vector Index", "PASS", "float32 and int8: round trip, tombstones, crash recovery")
+    except Exception as e:
+        log_test("NumPy Vector Index", "FAIL", str(e))
+        traceback.print_exc()
+
+
+def test_vector_maintenance():
+    """Test that writes from another instance survive a compaction and that snapshots are complete."""
+    import tempfile
+    import zlib
+    import numpy as np
+    
+    def embed(texts):
+        return [np.random.default_rng(zlib.crc32(text.encode())).normal(size=8).tolist() for text in texts]
+    
+    def notes(numbers):
+        return [{"note_id": f"note_{i}", "patient_id": i % 3, "note_text": f"note {i}", "note_type": "test"} for i in numbers]
+    
+    saved = config.VECTOR_SNAPSHOT_DIR, config.EMBEDDING_CACHE_ENABLED
+    try:
+        errors = []
+        with tempfile.TemporaryDirectory() as tmp:
+            config.VECTOR_SNAPSHOT_DIR, config.EMBEDDING_CACHE_ENABLED = Path(tmp) / "snapshots", False
+            path = Path(tmp) / "index"
+            
+            # The app writes, the maintenance CLI (another instance) compacts, the app writes again
+            app = VectorStore(embedding_function=embed, backend="numpy", persist_path=path)
+            app.add_medical_notes(notes(range(20)))
+            app.add_medical_notes(notes(range(5)))
+            maintenance = VectorStore(embedding_function=embed, backend="numpy", persist_path=path)
+            maintenance.compact()
+            snapshot = maintenance.snapshot("test", extra_files={"sync_state.json": "[]"})
+            app.add_medical_notes(notes(range(20, 30)))
+            
+            reopened = VectorStore(embedding_function=embed, backend="numpy", persist_path=path)
+            for i in range(30):
+                hit = reopened.medical_notes_collection.query(query_embeddings=embed([f"note {i}"]), n_results=1)
+                if hit["ids"][0] != [f"note_{i}"] or hit["distances"][0][0] > 1e-3:
+                    errors.append(f"note_{i} -> {hit['ids'][0]}")
+            if not (snapshot / "sync_state.json").exists():
+                errors.append("sync state missing from the snapshot")
+        
+        if errors:
+            log_test("Vector Maintenance", "FAIL", "; ".join(errors[:3]))
+        else:
+            log_test("Vector Maintenance", "PASS", "writes after an external compaction land in the new index")
+    except Exception as e:
+        log_test("Vector Maintenance", "FAIL", str(e))
+        traceback.print_exc()
+    finally:
+        config.VECTOR_SNAPSHOT_DIR, config.EMBEDDING_CACHE_ENABLED = saved
+
+
+def test_intent_router():
+    """Test that only template questions get canned answers, never their near misses."""
+    from services.intent_router import IntentRouter, INTENTS
+    
+    try:
+        # Constant embeddings: every question is maximally similar to every template,
+        # so only the negative patterns keep near misses away from the canned answers
+        routers = [IntentRouter(), IntentRouter(embedding_function=lambda texts: [[1.0, 0.0]] * len(texts))]
+        near_misses = [
+            "Quels médicaments ont été arrêtés ?",
+            "Le patient a-t-il des allergies médicamenteuses ?",
+            "Quels antibiotiques a-t-il déjà reçus ?",
+            "Historique des traitements ?",
+            "Que montre l'IRM du genou ?",
+            "Quel est le résultat de l'IRM ?",
+        ]
+        errors = []
+        for router in routers:
+            errors += [f"{q} -> {router.classify(q)}" for q in near_misses if router.classify(q)]
+            errors += [
+                f"{example} -> {router.classify(example)}"
+                for intent, examples in INTENTS.items() for example in examples
+                if router.classify(example) != intent
+            ]
+        if routers[0].classify("quels sont les medicaments actifs") != "active_medications":
+            errors.append("template without accents or punctuation not routed")
+        if routers[0].classify("Quels médicaments prend-il ?"):
+            errors.append("non-template question routed without embeddings")
+        
+        # Paraphrases reach their intent through the embeddings: one axis per intent, a last one for the rest
+        axes = {example: index for index, examples in enumerate(INTENTS.values()) for example in examples}
+        axes["Quels médicaments prend-il ?"] = list(INTENTS).index("active_medications")
+        
+        def embed(texts):
+            return [[float(axes.get(text, len(INTENTS)) == axis) for axis in range(len(INTENTS) + 1)] for text in texts]
+        
+        router = IntentRouter(embedding_function=embed)
+        for _ in range(2):
+            if router.classify("Quels médicaments prend-il ?") != "active_medications":
+                errors.append("paraphrase not routed by the embeddings")
+            if router.classify("Comment évolue sa tension ?"):
+                errors.append("unrelated question routed by the embeddings")
+        if len(router._example_intents) != len(axes) - 1:
+            errors.append(f"{len(router._example_intents)} template intents for {len(axes) - 1} templates")
+        
+        if errors:
+            log_test("Intent Router", "FAIL", "; ".join(errors[:3]))
+        else:
+            log_test("Intent Router", "PASS", f"{len(near_misses)} near misses left to the LLM")
+    except Exception as e:
+        log_test("Intent Router", "FAIL", str(e))
+        traceback.print_exc()
+
+
 def test_medical_chat(services, patient):
     """Test medical chat functionality."""
     try:
@@ -350,7 +832,7 @@ def test_patient_overview(services, patient):
         summarizer = services["summarizer"]
         
         # Get patient data
-        visits = db_manager.get_patient_visits(patient.id)
+        visits = db_manager.get_patient_visits(patient.id, load_text=True)
         medications = db_manager.get_patient_medications(patient.id)
         test_results = db_manager.get_patient_test_results(patient.id)
         
@@ -404,7 +886,7 @@ def test_pdf_generation(services, patient):
         pdf_generator = services["pdf_generator"]
         
         # Get patient data
-        visits = db_manager.get_patient_visits(patient.id)
+        visits = db_manager.get_patient_visits(patient.id, load_text=True)
         medications = db_manager.get_patient_medications(patient.id)
         test_results = db_manager.get_patient_test_results(patient.id)
         
@@ -508,10 +990,34 @@ def main():
     # Test test results
     test_results_list = test_test_results_upload(services, patient)
     
+    # Test concurrent database access
+    test_database_concurrency(patient)
+    
+    # Test async database access
+    test_async_database_parity(patient)
+    
+    # Test bulk import
+    test_bulk_import()
+    
+    # Test patient search
+    test_patient_search()
+    
+    # Test query cache
+    test_query_cache(patient)
+    
     print("\n" + "=" * 60)
     print("🤖 Testing AI Features")
     print("=" * 60)
     
+    # Test NumPy vector backend
+    test_numpy_vector_index()
+    
+    # Test vector index maintenance across instances
+    test_vector_maintenance()
+    
+    # Test intent routing
+    test_intent_router()
+    
     # Test medical chat
     chat_results = test_medical_chat(services, patient)
     
@@ -5,6 +5,8 @@ import sys
 from pathlib import Path
 from datetime import datetime
 import json
+import uuid
+import pandas as pd
 
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
@@ -12,8 +14,10 @@ if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
 from database import db_manager, Patient, Visit
-from services import Transcriber, MedicalSummarizer, PatternAnalyzer, PDFGenerator, VectorStore, MedicalChat
+from services import Transcriber, MedicalSummarizer, PatternAnalyzer, PDFGenerator, VectorStore, MedicalChat, ChatService, IndexSync
+from services.medical_chat import SUGGESTED_QUESTIONS
 from integrations import DICOMParser, LabResultsParser
+import config
 
 # Page configuration
 st.set_page_config(
@@ -28,6 +32,7 @@ st.set_page_config(
 def get_services():
     """Initialize and cache services."""
     vector_store = VectorStore()
+    medical_chat = MedicalChat(vector_store=vector_store)
     return {
         "transcriber": Transcriber(),
         "summarizer": MedicalSummarizer(vector_store=vector_store),
@@ -36,11 +41,59 @@ def get_services():
         "dicom_parser": DICOMParser(),
         "lab_parser": LabResultsParser(),
         "vector_store": vector_store,
-        "medical_chat": MedicalChat(vector_store=vector_store)
+        "index_sync": IndexSync(vector_store),
+        "medical_chat": medical_chat,
+        "chat_service": ChatService(medical_chat)
     }
 
 services = get_services()
 
+# Each browser session keeps its own chat history in the shared chat service
+if "chat_session_id" not in st.session_state:
+    st.session_state["chat_session_id"] = uuid.uuid4().hex
+
+
+def patient_picker(label: str, key: str, allow_all: bool = False):
+    """
+    Searchable patient selectbox that only loads the page of patients matching the search.
+    
+    Args:
+        label: Selectbox label
+        key: Unique widget key prefix for the page
+        allow_all: Add a "Tous les Patients" option (returns None)
+    
+    Returns:
+        Database ID of the selected patient, or None (no patient matches, or "Tous les Patients")
+    """
+    search = st.text_input("Rechercher un patient", key=f"{key}_search", placeholder="Nom, prénom ou ID patient")
+    
+    # Keyset cursors of the pages visited for the current search (None: first page)
+    if st.session_state.get(f"{key}_searched") != search:
+        st.session_state[f"{key}_searched"] = search
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    page = db_manager.list_patients(search=search, limit=config.PATIENT_PICKER_PAGE_SIZE, cursor=cursors[-1])
+    
+    options = {f"{p['first_name']} {p['last_name']} ({p['patient_id']})": p["id"] for p in page["items"]}
+    if allow_all:
+        options = {"Tous les Patients": None, **options}
+    if not options:
+        return None
+    selected_name = st.selectbox(label, list(options.keys()), key=f"{key}_select")
+    
+    if len(cursors) > 1 or page["next_cursor"]:
+        col_previous, col_next = st.columns(2)
+        with col_previous:
+            if len(cursors) > 1 and st.button("◀ Patients précédents", key=f"{key}_previous"):
+                cursors.pop()
+                st.rerun()
+        with col_next:
+            if page["next_cursor"] and st.button("Patients suivants ▶", key=f"{key}_next"):
+                cursors.append(page["next_cursor"])
+                st.rerun()
+    
+    return options[selected_name]
+
 # Sidebar navigation
 st.sidebar.title("🏥 Assistant Médical")
 page = st.sidebar.selectbox(
@@ -106,25 +159,26 @@ if shutdown_button:
 if page == "Tableau de bord":
     st.title("Tableau de Bord des Patients")
     
-    # Get all patients
-    patients = db_manager.get_all_patients()
-    
-    st.metric("Total Patients", len(patients))
+    # Patient count and the 10 most recently seen patients: two queries whatever the data size
+    st.metric("Total Patients", db_manager.count_patients())
+    patients = db_manager.get_patient_list(sort_by="last_visit", limit=10)
     
     # Patient list
     if patients:
         st.subheader("Patients Récents")
-        for patient in patients[:10]:
-            with st.expander(f"{patient.first_name} {patient.last_name} - {patient.patient_id}"):
+        for patient in patients:
+            with st.expander(f"{patient['first_name']} {patient['last_name']} - {patient['patient_id']}"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.write(f"**Date de Naissance:** {patient.date_of_birth.strftime('%Y-%m-%d') if patient.date_of_birth else 'N/A'}")
-                    st.write(f"**Téléphone:** {patient.phone or 'N/A'}")
+                    st.write(f"**Date de Naissance:** {patient['date_of_birth'].strftime('%Y-%m-%d') if patient['date_of_birth'] else 'N/A'}")
+                    st.write(f"**Téléphone:** {patient['phone'] or 'N/A'}")
+                    st.write(f"**Médicaments Actifs:** {patient['active_medication_count']}")
                 with col2:
-                    visits = db_manager.get_patient_visits(patient.id)
-                    st.write(f"**Total Consultations:** {len(visits)}")
-                    if visits:
-                        st.write(f"**Dernière Consultation:** {visits[0].visit_date.strftime('%Y-%m-%d')}")
+                    st.write(f"**Total Consultations:** {patient['visit_count']}")
+                    if patient["last_visit_date"]:
+                        st.write(f"**Dernière Consultation:** {patient['last_visit_date'].strftime('%Y-%m-%d')}")
+                    if patient["last_test_date"]:
+                        st.write(f"**Dernier Examen:** {patient['last_test_date'].strftime('%Y-%m-%d')}")
 
 # New Patient
 elif page == "Nouveau Patient":
@@ -173,14 +227,11 @@ elif page == "Enregistrer Consultation":
     st.title("Enregistrer une Consultation")
     
     # Select patient
-    patients = db_manager.get_all_patients()
+    selected_patient_id = patient_picker("Sélectionner un Patient", key="record_patient")
     
-    if not patients:
+    if selected_patient_id is None:
         st.warning("Aucun patient trouvé. Veuillez créer un patient d'abord.")
     else:
-        patient_options = {f"{p.first_name} {p.last_name} ({p.patient_id})": p.id for p in patients}
-        selected_patient_name = st.selectbox("Sélectionner un Patient", list(patient_options.keys()))
-        selected_patient_id = patient_options[selected_patient_name]
         
         visit_type = st.selectbox("Type de Consultation", ["Consultation", "Suivi", "Urgence", "Autre"])
         
@@ -245,6 +296,7 @@ elif page == "Enregistrer Consultation":
                     patient_id=selected_patient_id,
                     transcription=transcription,
                     summary=summary_data.get("summary", ""),
+                    segments=transcription_result.get("segments"),
                     metadata={
                         "visit_date": visit.visit_date.isoformat(),
                         "visit_type": visit_type,
@@ -252,24 +304,34 @@ elif page == "Enregistrer Consultation":
                     }
                 )
                 
-                # Also add structured notes
+                # Also add structured notes (embedded together in one batch)
+                notes = []
                 if summary_data.get("diagnosis"):
-                    services["vector_store"].add_medical_note(
-                        note_id=f"diagnosis_{visit.id}",
-                        patient_id=selected_patient_id,
-                        note_text=summary_data.get("diagnosis", ""),
-                        note_type="diagnosis",
-                        metadata={"visit_id": visit.id}
-                    )
+                    notes.append({
+                        "note_id": f"diagnosis_{visit.id}",
+                        "patient_id": selected_patient_id,
+                        "note_text": summary_data.get("diagnosis", ""),
+                        "note_type": "diagnosis",
+                        "metadata": {"visit_id": visit.id}
+                    })
                 
                 if recommendations:  # Use the converted string variable
-                    services["vector_store"].add_medical_note(
-                        note_id=f"recommendations_{visit.id}",
-                        patient_id=selected_patient_id,
-                        note_text=recommendations,  # Use the converted string
-                        note_type="recommendations",
-                        metadata={"visit_id": visit.id}
-                    )
+                    notes.append({
+                        "note_id": f"recommendations_{visit.id}",
+                        "patient_id": selected_patient_id,
+                        "note_text": recommendations,  # Use the converted string
+                        "note_type": "recommendations",
+                        "metadata": {"visit_id": visit.id}
+                    })
+                
+                if notes:
+                    services["vector_store"].add_medical_notes(notes)
+                
+                # The incremental sync job will only re-embed this visit if it is edited later
+                services["index_sync"].mark_synced([visit.id])
+                
+                # Warm the suggested-question answers for the updated record
+                services["medical_chat"].precompute_suggested_answers(selected_patient_id)
                 
                 st.success("Consultation enregistrée avec succès !")
                 
@@ -289,20 +351,18 @@ elif page == "Enregistrer Consultation":
 elif page == "Voir Patient":
     st.title("Dossiers des Patients")
     
-    patients = db_manager.get_all_patients()
+    selected_patient_id = patient_picker("Sélectionner un Patient", key="view_patient")
     
-    if not patients:
+    if selected_patient_id is None:
         st.warning("Aucun patient trouvé.")
     else:
-        patient_options = {f"{p.first_name} {p.last_name} ({p.patient_id})": p.id for p in patients}
-        selected_patient_name = st.selectbox("Sélectionner un Patient", list(patient_options.keys()))
-        selected_patient_id = patient_options[selected_patient_name]
         
         patient = db_manager.get_patient(patient_id=selected_patient_id)
         
         if patient:
             # Get all data first
-            visits = db_manager.get_patient_visits(selected_patient_id)
+            # Summaries only: transcripts and notes are loaded per visit when a PDF is generated
+            visits = db_manager.get_patient_visits(selected_patient_id, load_text=("summary", "cleaned_summary"))
             medications = db_manager.get_patient_medications(selected_patient_id)
             test_results = db_manager.get_patient_test_results(selected_patient_id)
             
@@ -466,7 +526,7 @@ elif page == "Voir Patient":
                     
                     # Generate PDF for this visit
                     if st.button(f"Générer le PDF", key=f"pdf_{visit.id}"):
-                        pdf_path = services["pdf_generator"].generate_visit_summary(visit, patient)
+                        pdf_path = services["pdf_generator"].generate_visit_summary(db_manager.get_visit(visit.id), patient)
                         st.success(f"PDF généré : {pdf_path}")
             
             # Medications
@@ -570,6 +630,37 @@ elif page == "Voir Patient":
                                             st.write("📋 Rapport")
                             
                             st.divider()
+                
+                # Lab trends, from the normalized lab_values table
+                analytes = db_manager.get_lab_analytes(selected_patient_id)
+                if analytes:
+                    st.subheader("📈 Évolution des Analyses")
+                    trended = [entry["analyte"] for entry in analytes if entry["count"] > 1]
+                    selected_analytes = st.multiselect(
+                        "Paramètres",
+                        [entry["analyte"] for entry in analytes],
+                        default=trended[:3],
+                        key=f"lab_trends_{selected_patient_id}"
+                    )
+                    if selected_analytes:
+                        series = db_manager.get_lab_series(selected_patient_id, selected_analytes)
+                        for analyte in selected_analytes:
+                            if analyte not in series:
+                                continue
+                            data = series[analyte]
+                            unit = f" ({data['unit']})" if data["unit"] else ""
+                            st.write(f"**{analyte}{unit}**")
+                            if pd.isna(data["values"]).all():
+                                st.caption("Résultats non numériques")
+                                continue
+                            st.line_chart(pd.DataFrame(
+                                {"Valeur": data["values"], "Min": data["ref_low"], "Max": data["ref_high"]},
+                                index=pd.to_datetime(data["dates"])
+                            ))
+                            if not pd.isna(data["values"][-1]):
+                                flags = {"high": "⬆️ élevé", "low": "⬇️ bas", "normal": "✅ normal"}
+                                last_flag = flags.get(data["flags"][-1], "")
+                                st.caption(f"Dernière valeur: {data['values'][-1]:g}{unit} {last_flag}")
             else:
                 st.info("Aucun résultat de test disponible pour ce patient.")
             
@@ -577,6 +668,9 @@ elif page == "Voir Patient":
             st.divider()
             st.subheader("💬 Chat Interactif avec le Dossier Médical")
             st.caption("Posez des questions sur le dossier complet du patient (consultations, médicaments, tests, etc.)")
+            router_stats = services["medical_chat"].get_router_stats()
+            if router_stats["routed"] + router_stats["fallthrough"]:
+                st.caption(f"⚡ Réponses directes sans LLM: {router_stats['hit_rate']:.0%} ({router_stats['routed']}/{router_stats['routed'] + router_stats['fallthrough']})")
             
             # Initialize chat session for this patient
             chat_key = f"chat_{selected_patient_id}"
@@ -601,6 +695,10 @@ elif page == "Voir Patient":
                                     st.write(f"- Tests: {ctx.get('tests_count', 0)}")
                                     if ctx.get('vector_search_used'):
                                         st.write("- Recherche sémantique: ✅")
+                                    if ctx.get('routed_intent'):
+                                        st.write("- Réponse directe depuis le dossier structuré: ⚡")
+                                    if ctx.get('cached'):
+                                        st.write("- Réponse en cache (dossier inchangé): ⚡")
             
             # Chat input
             user_question = st.chat_input("Posez une question sur le dossier du patient...")
@@ -620,7 +718,8 @@ elif page == "Voir Patient":
                 with st.chat_message("assistant"):
                     with st.spinner("Analyse du dossier..."):
                         try:
-                            chat_response = services["medical_chat"].chat(
+                            chat_response = services["chat_service"].chat_sync(
+                                session_id=st.session_state["chat_session_id"],
                                 patient_id=selected_patient_id,
                                 user_message=user_question,
                                 use_vector_search=True
@@ -651,6 +750,12 @@ elif page == "Voir Patient":
                                         st.write(f"- Tests analysés: {ctx.get('tests_count', 0)}")
                                         if ctx.get('vector_search_used'):
                                             st.write("- Recherche sémantique: ✅ Activée")
+                                        if ctx.get('routed_intent'):
+                                            st.write("- Réponse directe depuis le dossier structuré: ⚡")
+                                        if ctx.get('cached'):
+                                            st.write("- Réponse en cache (dossier inchangé): ⚡")
+                                        if chat_response.get("timing"):
+                                            st.write(f"- Attente: {chat_response['timing']['queue_ms']:.0f} ms, total: {chat_response['timing']['total_ms']:.0f} ms")
                                 
                                 # Add assistant response to history
                                 st.session_state[chat_key].append({
@@ -674,18 +779,12 @@ elif page == "Voir Patient":
             if st.session_state[chat_key]:
                 if st.button("🗑️ Effacer l'historique de conversation", key=f"clear_chat_{selected_patient_id}"):
                     st.session_state[chat_key] = []
-                    services["medical_chat"].clear_history(selected_patient_id)
+                    services["medical_chat"].clear_history(selected_patient_id, session_id=st.session_state["chat_session_id"])
                     st.rerun()
             
             # Example questions
             st.caption("💡 Exemples de questions:")
-            example_questions = [
-                "Quels sont les médicaments actifs?",
-                "Résumez l'évolution de la pathologie",
-                "Quels sont les tests récents?",
-                "Y a-t-il eu des changements de médicaments?",
-                "Quel était le dernier diagnostic?"
-            ]
+            example_questions = SUGGESTED_QUESTIONS
             cols = st.columns(len(example_questions))
             for i, question in enumerate(example_questions):
                 with cols[i]:
@@ -708,7 +807,8 @@ elif page == "Voir Patient":
                 with st.chat_message("assistant"):
                     with st.spinner("Analyse du dossier..."):
                         try:
-                            chat_response = services["medical_chat"].chat(
+                            chat_response = services["chat_service"].chat_sync(
+                                session_id=st.session_state["chat_session_id"],
                                 patient_id=selected_patient_id,
                                 user_message=auto_q,
                                 use_vector_search=True
@@ -739,6 +839,12 @@ elif page == "Voir Patient":
                                         st.write(f"- Tests analysés: {ctx.get('tests_count', 0)}")
                                         if ctx.get('vector_search_used'):
                                             st.write("- Recherche sémantique: ✅ Activée")
+                                        if ctx.get('routed_intent'):
+                                            st.write("- Réponse directe depuis le dossier structuré: ⚡")
+                                        if ctx.get('cached'):
+                                            st.write("- Réponse en cache (dossier inchangé): ⚡")
+                                        if chat_response.get("timing"):
+                                            st.write(f"- Attente: {chat_response['timing']['queue_ms']:.0f} ms, total: {chat_response['timing']['total_ms']:.0f} ms")
                                 
                                 # Add assistant response to history
                                 st.session_state[chat_key].append({
@@ -762,14 +868,11 @@ elif page == "Voir Patient":
 elif page == "Télécharger Tests":
     st.title("Télécharger des Résultats de Tests")
     
-    patients = db_manager.get_all_patients()
+    selected_patient_id = patient_picker("Sélectionner un Patient", key="upload_patient")
     
-    if not patients:
+    if selected_patient_id is None:
         st.warning("Aucun patient trouvé.")
     else:
-        patient_options = {f"{p.first_name} {p.last_name} ({p.patient_id})": p.id for p in patients}
-        selected_patient_name = st.selectbox("Sélectionner un Patient", list(patient_options.keys()))
-        selected_patient_id = patient_options[selected_patient_name]
         
         test_type = st.selectbox("Type de Test", ["IRM", "Scanner CT", "Radiographie", "Analyse de Sang", "Autre"])
         
@@ -837,14 +940,11 @@ elif page == "Télécharger Tests":
 elif page == "Analyse de Modèles":
     st.title("Analyse de Modèles")
     
-    patients = db_manager.get_all_patients()
+    selected_patient_id = patient_picker("Sélectionner un Patient", key="pattern_patient")
     
-    if not patients:
+    if selected_patient_id is None:
         st.warning("Aucun patient trouvé.")
     else:
-        patient_options = {f"{p.first_name} {p.last_name} ({p.patient_id})": p.id for p in patients}
-        selected_patient_name = st.selectbox("Sélectionner un Patient", list(patient_options.keys()))
-        selected_patient_id = patient_options[selected_patient_name]
         
         if st.button("Analyser l'Évolution du Patient"):
             with st.spinner("Analyse des modèles..."):
@@ -887,18 +987,54 @@ elif page == "Recherche Sémantique":
     # Filters
     col1, col2 = st.columns(2)
     with col1:
-        patients = db_manager.get_all_patients()
-        patient_options = {f"{p.first_name} {p.last_name} ({p.patient_id})": p.id for p in patients}
-        patient_options["Tous les Patients"] = None
-        selected_patient_name = st.selectbox("Filtrer par Patient", list(patient_options.keys()))
-        selected_patient_id = patient_options[selected_patient_name]
+        selected_patient_id = patient_picker("Filtrer par Patient", key="search_patient", allow_all=True)
     
     with col2:
-        search_type = st.selectbox("Type de Recherche", ["Tout", "Conversations Seulement", "Notes Médicales Seulement"])
+        search_mode = st.radio("Mode", ["Sémantique", "Mots-clés (exact)"], horizontal=True)
+        if search_mode == "Sémantique":
+            search_type = st.selectbox("Type de Recherche", ["Tout", "Conversations Seulement", "Notes Médicales Seulement"])
+        else:
+            search_type = None
+            keyword_sources = st.multiselect(
+                "Sources",
+                ["visit", "medication", "test_result"],
+                default=["visit", "medication", "test_result"],
+                format_func=lambda s: {"visit": "Consultations", "medication": "Médicaments", "test_result": "Examens"}[s]
+            )
     
     n_results = st.slider("Nombre de Résultats", 5, 50, 10)
     
-    if search_query and st.button("Rechercher"):
+    # Keyword mode: FTS5 index, exact terms (drug names, ICD codes, "phrases entre guillemets")
+    if search_mode == "Mots-clés (exact)" and search_query:
+        results = db_manager.search_text(
+            search_query,
+            patient_id=selected_patient_id,
+            sources=keyword_sources or None,
+            limit=n_results
+        )
+        patient_names = {}
+        for pid in {result["patient_id"] for result in results}:
+            result_patient = db_manager.get_patient(patient_id=pid)
+            if result_patient:
+                patient_names[pid] = f"{result_patient.first_name} {result_patient.last_name} ({result_patient.patient_id})"
+        source_labels = {"visit": "📝 Consultation", "medication": "💊 Médicament", "test_result": "🧪 Examen"}
+        
+        st.subheader(f"🔤 {len(results)} Résultats")
+        if not results:
+            st.info("Aucun résultat. Astuce: mettez une expression entre guillemets pour une recherche exacte.")
+        for result in results:
+            st.markdown(
+                f"**{source_labels[result['source']]} #{result['source_id']}** · "
+                f"{patient_names.get(result['patient_id'], '')} · {str(result['date'] or '')[:10]}"
+            )
+            st.markdown(result["snippet"])
+            if result["source"] == "visit":
+                if st.button("Voir Détails Consultation", key=f"fts_view_{result['source_id']}"):
+                    st.session_state["view_visit_id"] = result["source_id"]
+                    st.rerun()
+            st.divider()
+    
+    if search_type and search_query and st.button("Rechercher"):
         with st.spinner("Recherche..."):
             if search_type == "Tout":
                 results = services["vector_store"].search_all(
@@ -906,33 +1042,14 @@ elif page == "Recherche Sémantique":
                     patient_id=selected_patient_id,
                     n_results=n_results
                 )
-                
-                # Display conversations
-                if results["conversations"]:
-                    st.subheader("📝 Conversations Correspondantes")
-                    for result in results["conversations"]:
-                        with st.expander(f"ID Consultation: {result['metadata'].get('visit_id', 'N/A')} - Score: {1 - result.get('distance', 0):.2f}"):
-                            st.write("**Document:**")
-                            st.write(result["document"][:500] + "..." if len(result["document"]) > 500 else result["document"])
-                            st.write("**Métadonnées:**")
-                            st.json(result["metadata"])
-                            
-                            # Link to visit
-                            visit_id = result["metadata"].get("visit_id")
-                            if visit_id:
-                                if st.button(f"Voir Détails Consultation", key=f"view_{visit_id}"):
-                                    st.session_state["view_visit_id"] = visit_id
-                                    st.rerun()
-                
-                # Display medical notes
-                if results["medical_notes"]:
-                    st.subheader("🏥 Notes Médicales Correspondantes")
-                    for result in results["medical_notes"]:
-                        with st.expander(f"{result['metadata'].get('note_type', 'Note').title()} - Score: {1 - result.get('distance', 0):.2f}"):
-                            st.write("**Contenu:**")
-                            st.write(result["document"])
-                            st.write("**Métadonnées:**")
-                            st.json(result["metadata"])
+                # Kept across reruns so further pages can be appended
+                st.session_state["semantic_search"] = {
+                    "query": search_query,
+                    "patient_id": selected_patient_id,
+                    "n_results": n_results,
+                    "results": results["results"],
+                    "next_cursor": results["next_cursor"]
+                }
             
             elif search_type == "Conversations Seulement":
                 results = services["vector_store"].search_conversations(
@@ -944,6 +1061,9 @@ elif page == "Recherche Sémantique":
                 st.subheader(f"📝 {len(results)} Conversations Trouvées")
                 for result in results:
                     with st.expander(f"ID Consultation: {result['metadata'].get('visit_id', 'N/A')} - Score: {1 - result.get('distance', 0):.2f}"):
+                        if result.get("passage_start") is not None:
+                            start = int(result["passage_start"])
+                            st.caption(f"⏱️ Passage à {start // 60:02d}:{start % 60:02d} de l'enregistrement")
                         st.write("**Document:**")
                         st.write(result["document"][:500] + "..." if len(result["document"]) > 500 else result["document"])
                         st.write("**Métadonnées:**")
@@ -965,6 +1085,42 @@ elif page == "Recherche Sémantique":
                         st.write("**Metadata:**")
                         st.json(result["metadata"])
     
+    # Merged results of "Tout", ranked across conversations and notes
+    search_state = st.session_state.get("semantic_search")
+    if search_type == "Tout" and search_state and search_state["query"] == search_query and search_state["patient_id"] == selected_patient_id:
+        st.subheader(f"🔎 {len(search_state['results'])} Résultats")
+        for i, result in enumerate(search_state["results"]):
+            if result["metadata"].get("type") == "conversation":
+                label = f"📝 Consultation {result['metadata'].get('visit_id', 'N/A')}"
+            else:
+                label = f"🏥 {result['metadata'].get('note_type', 'Note').title()}"
+            with st.expander(f"{label} - Score: {result['score']:.2f}"):
+                if result.get("passage_start") is not None:
+                    start = int(result["passage_start"])
+                    st.caption(f"⏱️ Passage à {start // 60:02d}:{start % 60:02d} de l'enregistrement")
+                st.write("**Document:**")
+                st.write(result["document"][:500] + "..." if len(result["document"]) > 500 else result["document"])
+                st.write("**Métadonnées:**")
+                st.json(result["metadata"])
+                
+                # Link to visit
+                visit_id = result["metadata"].get("visit_id")
+                if visit_id and result["metadata"].get("type") == "conversation":
+                    if st.button(f"Voir Détails Consultation", key=f"view_{visit_id}_{i}"):
+                        st.session_state["view_visit_id"] = visit_id
+                        st.rerun()
+        
+        if search_state["next_cursor"] is not None and st.button("Plus de résultats"):
+            more = services["vector_store"].search_all(
+                query=search_state["query"],
+                patient_id=search_state["patient_id"],
+                n_results=search_state["n_results"],
+                cursor=search_state["next_cursor"]
+            )
+            search_state["results"].extend(more["results"])
+            search_state["next_cursor"] = more["next_cursor"]
+            st.rerun()
+    
     # Example queries
     st.sidebar.markdown("### 💡 Example Queries")
     example_queries = [